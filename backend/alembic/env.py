@@ -3,7 +3,7 @@
 import asyncio
 from logging.config import fileConfig
 
-from sqlalchemy import pool
+from sqlalchemy import pool, text
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
@@ -16,7 +16,7 @@ if config.config_file_name is not None:
 
 # 导入模型元数据
 from app.database import Base
-from app.models import Account, MemberKey, TaskLog  # noqa: F401
+from app.models import Account, AccountTopic, CheckinJob, CheckinQueueItem, CheckinRecord, CheckinRun, MemberKey, TaskLog  # noqa: F401
 from app.config import settings
 
 target_metadata = Base.metadata
@@ -38,9 +38,16 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+# 迁移互斥锁: 与签到单飞锁 (0x5742) / 调度 leader 锁 (0x5743) 使用不同的命名空间
+_MIGRATION_LOCK_NS = 0x5744
+
+
 def do_run_migrations(connection) -> None:
     context.configure(connection=connection, target_metadata=target_metadata)
     with context.begin_transaction():
+        if connection.dialect.name == "postgresql":
+            # 多个容器同时启动时串行执行迁移, 后到者在锁释放后读取到已是最新版本
+            connection.execute(text("SELECT pg_advisory_xact_lock(:ns, 0)"), {"ns": _MIGRATION_LOCK_NS})
         context.run_migrations()
 
 
@@ -0,0 +1,34 @@
+"""为 accounts 增加并发签到与令牌桶速率字段
+
+Revision ID: 003_add_checkin_concurrency
+Revises: 002_add_member_key_plain
+Create Date: 2026-10-18 09:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "003_add_checkin_concurrency"
+down_revision: Union[str, None] = "002_add_member_key_plain"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "accounts",
+        sa.Column("checkin_concurrency", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.add_column(
+        "accounts",
+        sa.Column("checkin_rate", sa.Float(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("accounts", "checkin_rate")
+    op.drop_column("accounts", "checkin_concurrency")
@@ -0,0 +1,37 @@
+"""新增 account_topics 超话列表缓存表
+
+Revision ID: 004_add_account_topics
+Revises: 003_add_checkin_concurrency
+Create Date: 2026-10-18 10:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "004_add_account_topics"
+down_revision: Union[str, None] = "003_add_checkin_concurrency"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "account_topics",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("account_id", sa.Integer(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("provider", sa.String(20), nullable=False),
+        sa.Column("container_id", sa.String(100), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False, server_default=""),
+        sa.Column("scheme", sa.Text(), nullable=True),
+        sa.Column("last_seen", sa.DateTime(), server_default=sa.func.now()),
+        sa.UniqueConstraint("account_id", "provider", "container_id", name="uq_account_topics_account_provider_cid"),
+    )
+    op.create_index("ix_account_topics_account_id", "account_topics", ["account_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("account_topics")
@@ -0,0 +1,42 @@
+"""新增 checkin_results 签到明细表
+
+Revision ID: 005_add_checkin_results
+Revises: 004_add_account_topics
+Create Date: 2026-10-18 14:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "005_add_checkin_results"
+down_revision: Union[str, None] = "004_add_account_topics"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "checkin_results",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("run_id", sa.String(32), nullable=False),
+        sa.Column("account_id", sa.Integer(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("container_id", sa.String(100), nullable=False, server_default=""),
+        sa.Column("topic_title", sa.String(200), nullable=False, server_default=""),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("failure", sa.String(20), nullable=True),
+        sa.Column("detail", sa.String(500), nullable=True),
+        sa.Column("latency_ms", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_index("ix_checkin_results_run_id", "checkin_results", ["run_id"])
+    op.create_index("ix_checkin_results_account_cid", "checkin_results", ["account_id", "container_id"])
+    op.create_index("ix_checkin_results_created_at", "checkin_results", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("checkin_results")
@@ -0,0 +1,40 @@
+"""新增 checkin_runs 签到运行记录表 (支持中断续签)
+
+Revision ID: 006_add_checkin_runs
+Revises: 005_add_checkin_results
+Create Date: 2026-10-18 16:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "006_add_checkin_runs"
+down_revision: Union[str, None] = "005_add_checkin_results"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "checkin_runs",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("account_id", sa.Integer(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("run_date", sa.String(10), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="running"),
+        sa.Column("source", sa.String(20), nullable=False, server_default="manual"),
+        sa.Column("provider", sa.String(20), nullable=True),
+        sa.Column("resumes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("summary", sa.JSON(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_checkin_runs_account_date", "checkin_runs", ["account_id", "run_date"])
+    op.create_index("ix_checkin_runs_status", "checkin_runs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_table("checkin_runs")
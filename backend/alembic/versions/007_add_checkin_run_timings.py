@@ -0,0 +1,26 @@
+"""checkin_runs 新增 timings 耗时分解字段
+
+Revision ID: 007_add_checkin_run_timings
+Revises: 006_add_checkin_runs
+Create Date: 2026-10-18 18:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "007_add_checkin_run_timings"
+down_revision: Union[str, None] = "006_add_checkin_runs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("checkin_runs", sa.Column("timings", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("checkin_runs", "timings")
@@ -0,0 +1,46 @@
+"""新增 checkin_queue 持久化签到队列表 (多进程认领执行)
+
+Revision ID: 008_add_checkin_queue
+Revises: 007_add_checkin_run_timings
+Create Date: 2026-10-18 20:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "008_add_checkin_queue"
+down_revision: Union[str, None] = "007_add_checkin_run_timings"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "checkin_queue",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("account_id", sa.Integer(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("source", sa.String(20), nullable=False, server_default="schedule"),
+        sa.Column("dedupe_key", sa.String(40), nullable=True),
+        sa.Column("status", sa.String(20), nullable=False, server_default="queued"),
+        sa.Column("run_at", sa.DateTime(), nullable=False),
+        sa.Column("lease_owner", sa.String(64), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("run_id", sa.String(32), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_checkin_queue_status_run_at", "checkin_queue", ["status", "run_at"])
+    op.create_index(
+        "uq_checkin_queue_account_dedupe", "checkin_queue", ["account_id", "dedupe_key"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("checkin_queue")
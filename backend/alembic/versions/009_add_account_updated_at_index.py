@@ -0,0 +1,25 @@
+"""accounts.updated_at 新增索引 (定时索引按 updated_at 增量同步)
+
+Revision ID: 009_add_account_updated_at_index
+Revises: 008_add_checkin_queue
+Create Date: 2026-10-18 22:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "009_add_account_updated_at_index"
+down_revision: Union[str, None] = "008_add_checkin_queue"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_accounts_updated_at", "accounts", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_accounts_updated_at", table_name="accounts")
@@ -0,0 +1,29 @@
+"""checkin_results 新增 elapsed_ms (含限速等待与重试退避的总耗时), latency_ms 改为只记上游请求耗时
+
+Revision ID: 010_add_checkin_result_elapsed
+Revises: 009_add_account_updated_at_index
+Create Date: 2026-10-19 10:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "010_add_checkin_result_elapsed"
+down_revision: Union[str, None] = "009_add_account_updated_at_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "checkin_results",
+        sa.Column("elapsed_ms", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("checkin_results", "elapsed_ms")
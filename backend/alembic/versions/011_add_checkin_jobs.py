@@ -0,0 +1,38 @@
+"""新增 checkin_jobs 后台签到任务表 (多副本/重启后仍可查询任务进度)
+
+Revision ID: 011_add_checkin_jobs
+Revises: 010_add_checkin_result_elapsed
+Create Date: 2026-10-19 12:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "011_add_checkin_jobs"
+down_revision: Union[str, None] = "010_add_checkin_result_elapsed"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "checkin_jobs",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("kind", sa.String(20), nullable=False),
+        sa.Column("source", sa.String(20), nullable=False, server_default="manual"),
+        sa.Column("status", sa.String(20), nullable=False, server_default="running"),
+        sa.Column("accounts", sa.JSON(), nullable=False),
+        sa.Column("owner", sa.String(64), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_checkin_jobs_created_at", "checkin_jobs", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_checkin_jobs_created_at", table_name="checkin_jobs")
+    op.drop_table("checkin_jobs")
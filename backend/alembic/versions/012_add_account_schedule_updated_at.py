@@ -0,0 +1,37 @@
+"""accounts 新增 schedule_updated_at (定时索引按此增量同步), 移除不再使用的 updated_at 索引
+
+签到每次写回 last_checkin_at 都会更新 updated_at, 按 updated_at 增量同步会反复读取刚签到的账号;
+schedule_updated_at 只在启停定时或修改定时时间时更新。
+
+Revision ID: 012_add_account_schedule_updated_at
+Revises: 011_add_checkin_jobs
+Create Date: 2026-10-19 15:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "012_add_account_schedule_updated_at"
+down_revision: Union[str, None] = "011_add_checkin_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "accounts",
+        sa.Column("schedule_updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.execute("UPDATE accounts SET schedule_updated_at = updated_at")
+    op.create_index("ix_accounts_schedule_updated_at", "accounts", ["schedule_updated_at"])
+    op.drop_index("ix_accounts_updated_at", table_name="accounts")
+
+
+def downgrade() -> None:
+    op.create_index("ix_accounts_updated_at", "accounts", ["updated_at"])
+    op.drop_index("ix_accounts_schedule_updated_at", table_name="accounts")
+    op.drop_column("accounts", "schedule_updated_at")
@@ -73,4 +73,6 @@ async def delete_account(
     ok = await account_service.delete_account(db, account_id)
     if not ok:
         raise HTTPException(status_code=404, detail="账号不存在")
+    # 从定时索引中移除
+    await apply_account_schedule(account_id)
     return {"ok": True, "message": "账号已删除"}
@@ -1,22 +1,40 @@
 """管理后台 — 任务与签到路由"""
 
 import logging
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import get_db
 from app.middleware.auth import require_admin
 from app.models.account import Account
+from app.models.checkin_result import CheckinRecord
+from app.models.checkin_run import CheckinRun
 from app.models.task_log import TaskLog
 from app.schemas.external import TaskLogResponse
-from app.services import account_service, checkin_service, cookie_service
+from app.services import (
+    account_service,
+    checkin_service,
+    circuit_breaker,
+    cookie_service,
+    job_service,
+    provider_stats,
+    run_queue,
+    run_timing,
+    scheduler_leader,
+)
 from app.services.scheduler_service import (
     apply_account_schedule,
     apply_all_schedules,
+    delayed_status,
     get_scheduler_status,
+    last_reconcile,
+    scheduled_account_count,
+    sync_schedule_changes,
 )
 from app.utils.time import to_tz_iso
 
@@ -34,31 +52,46 @@ async def manual_checkin(
     account_id: int,
     db: AsyncSession = Depends(get_db),
 ):
-    """手动触发单个账号签到"""
+    """手动触发单个账号签到 (后台执行, 立即返回 job_id, 通过 /jobs/{job_id} 查询进度)"""
     account = await account_service.get_account_by_id(db, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="账号不存在")
 
-    try:
-        result = await checkin_service.run_checkin(db, account)
-        return {"ok": True, "message": "签到完成", "result": result}
-    except Exception as e:
-        logger.error(f"手动签到异常: {e}")
-        return {"ok": False, "message": f"签到异常: {str(e)}"}
+    job = await job_service.create_job("checkin", [(account.id, account.account_name)], source="manual")
+    return {"ok": True, "message": "签到任务已提交", "job_id": job["id"]}
 
 
 @router.post("/checkin-all")
 async def manual_checkin_all(db: AsyncSession = Depends(get_db)):
-    """手动触发所有启用账号签到"""
+    """手动触发所有启用账号签到 (经全局执行引擎并发执行, 立即返回 job_id)"""
     accounts = await account_service.get_all_scheduled_accounts(db)
-    results = []
-    for account in accounts:
-        try:
-            result = await checkin_service.run_checkin(db, account)
-            results.append({"account": account.account_name, "ok": True, "result": result})
-        except Exception as e:
-            results.append({"account": account.account_name, "ok": False, "error": str(e)})
-    return {"ok": True, "message": f"已执行 {len(results)} 个账号", "results": results}
+    job = await job_service.create_job(
+        "checkin-all", [(account.id, account.account_name) for account in accounts], source="manual-all"
+    )
+    return {"ok": True, "message": f"已提交 {len(accounts)} 个账号签到", "job_id": job["id"]}
+
+
+@router.get("/jobs")
+async def api_list_jobs(limit: int = Query(20, ge=1, le=100)):
+    """最近的后台签到任务"""
+    return {"ok": True, "jobs": await job_service.list_jobs(limit)}
+
+
+@router.get("/jobs/{job_id}")
+async def api_get_job(
+    job_id: str,
+    account_id: Optional[int] = Query(None, description="返回该账号的逐超话明细"),
+    since: int = Query(0, ge=0, description="逐超话明细起始序号 (上次返回的 topics_next)"),
+):
+    """后台签到任务进度: 各账号状态、实时计数与最终结果 (任意副本均可查询)"""
+    job = await job_service.get_job(job_id, account_id=account_id, since=since)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"任务 {job_id} 不存在或已过期 (任务结束 {settings.CHECKIN_JOB_RETENTION_MINUTES} 分钟后清理), "
+                   "签到结果请在日志中查看",
+        )
+    return {"ok": True, "job": job}
 
 
 @router.post("/validate-cookie/{account_id}")
@@ -74,9 +107,12 @@ async def validate_cookie(
     if not account.cookie_sub:
         return {"ok": False, "message": "账号未配置 Cookie"}
 
+    # 手动校验总是请求上游, 并刷新缓存
     is_valid, info = await cookie_service.validate_cookie(
-        account.cookie_sub, account.cookie_subp, account.cookie_twm
+        account.cookie_sub, account.cookie_subp, account.cookie_twm, use_cache=False
     )
+    if is_valid is None:
+        return {"ok": False, "message": "无法连接微博校验 Cookie, 请稍后重试", "user_info": None}
     return {
         "ok": is_valid,
         "message": "Cookie 有效" if is_valid else "Cookie 已失效",
@@ -85,10 +121,21 @@ async def validate_cookie(
 
 
 @router.post("/apply-schedules")
-async def api_apply_schedules():
-    """重新加载所有定时任务"""
-    count = await apply_all_schedules()
-    return {"ok": True, "message": f"已应用 {count} 个定时任务"}
+async def api_apply_schedules(full: bool = Query(False, description="全量对账 (默认按 schedule_updated_at 增量同步)")):
+    """重新加载定时任务: 只应用与数据库有差异的账号"""
+    if full:
+        await apply_all_schedules()
+        changes = last_reconcile()
+    else:
+        changes = await sync_schedule_changes()
+    return {
+        "ok": True,
+        "message": (
+            f"已应用 {scheduled_account_count()} 个定时任务 "
+            f"(新增 {changes['added']}, 移动 {changes['moved']}, 移除 {changes['removed']})"
+        ),
+        "changes": changes,
+    }
 
 
 @router.post("/apply-schedule/{account_id}")
@@ -100,9 +147,54 @@ async def api_apply_schedule(account_id: int):
 
 @router.get("/scheduler-status")
 async def api_scheduler_status():
-    """获取调度器状态"""
+    """获取调度器状态: 各分钟桶的账号数与下次执行时间, 本进程是否为调度 leader"""
     jobs = get_scheduler_status()
-    return {"ok": True, "jobs": jobs, "total": len(jobs)}
+    return {
+        "ok": True,
+        "jobs": jobs,
+        "total": len(jobs),
+        "accounts": scheduled_account_count(),
+        "delayed": delayed_status(),
+        "leader": scheduler_leader.status(),
+        "reconcile": last_reconcile(),
+    }
+
+
+@router.get("/run-engine")
+async def api_run_engine_status():
+    """获取签到执行引擎状态 (全局并发、执行中与排队中的账号)"""
+    return {"ok": True, **checkin_service.run_engine.status()}
+
+
+@router.get("/run-queue")
+async def api_run_queue_status():
+    """获取持久化签到队列状态 (各状态条数、各进程持有的租约与本进程消费者统计)"""
+    return {"ok": True, **await run_queue.queue_status()}
+
+
+@router.get("/provider-stats")
+async def api_provider_stats(account_id: Optional[int] = Query(None)):
+    """获取 Provider 计分板 (成功率/中位延迟/失败原因/降级状态)"""
+    return {
+        "ok": True,
+        "default": settings.CHECKIN_PROVIDER,
+        "chosen": provider_stats.choose_provider(account_id or provider_stats.GLOBAL),
+        "providers": provider_stats.get_stats(account_id),
+        "races": provider_stats.get_race_stats(),
+    }
+
+
+@router.get("/circuit-breakers")
+async def api_circuit_breakers():
+    """获取各上游 host 的熔断状态"""
+    return {"ok": True, "enabled": settings.CIRCUIT_BREAKER_ENABLED, "hosts": circuit_breaker.get_states()}
+
+
+@router.post("/circuit-breakers/reset")
+async def api_reset_circuit_breakers(host: Optional[str] = Query(None)):
+    """手动关闭熔断器 (不指定 host 时重置全部)"""
+    count = circuit_breaker.reset(host)
+    return {"ok": True, "message": f"已重置 {count} 个熔断器"}
 
 
 @router.get("/logs", response_model=list[TaskLogResponse])
@@ -147,3 +239,122 @@ async def get_task_logs(
         response.append(r)
 
     return response
+
+
+def _record_to_dict(r: CheckinRecord) -> dict:
+    return {
+        "run_id": r.run_id,
+        "account_id": r.account_id,
+        "container_id": r.container_id,
+        "name": r.topic_title,
+        "status": r.status,
+        "failure": r.failure,
+        "detail": r.detail,
+        "latency_ms": r.latency_ms,
+        "elapsed_ms": r.elapsed_ms,
+        "attempts": r.attempts,
+        "created_at": to_tz_iso(r.created_at),
+    }
+
+
+@router.get("/logs/{log_id}/results")
+async def get_task_log_results(
+    log_id: int,
+    status: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """按需读取一次签到的逐超话明细"""
+    log = await db.get(TaskLog, log_id)
+    if not log:
+        raise HTTPException(status_code=404, detail="日志不存在")
+
+    detail = log.detail or {}
+    run_id = detail.get("run_id")
+    if not run_id:
+        # 旧日志的明细直接存在 detail 中
+        return {"ok": True, "run_id": None, "results": detail.get("checkin_details", [])}
+
+    query = select(CheckinRecord).where(CheckinRecord.run_id == run_id).order_by(CheckinRecord.id)
+    if status:
+        query = query.where(CheckinRecord.status == status)
+    result = await db.execute(query)
+    return {"ok": True, "run_id": run_id, "results": [_record_to_dict(r) for r in result.scalars().all()]}
+
+
+@router.get("/checkin-results")
+async def get_checkin_results(
+    account_id: Optional[int] = Query(None),
+    container_id: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    failure: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """按账号/超话/状态查询签到明细 (最新在前)"""
+    query = select(CheckinRecord).order_by(desc(CheckinRecord.id))
+    if account_id is not None:
+        query = query.where(CheckinRecord.account_id == account_id)
+    if container_id:
+        query = query.where(CheckinRecord.container_id == container_id)
+    if status:
+        query = query.where(CheckinRecord.status == status)
+    if failure:
+        query = query.where(CheckinRecord.failure == failure)
+
+    result = await db.execute(query.offset(skip).limit(limit))
+    return {"ok": True, "results": [_record_to_dict(r) for r in result.scalars().all()]}
+
+
+@router.get("/run-timings")
+async def get_run_timings(
+    account_id: Optional[int] = Query(None),
+    days: int = Query(14, ge=1, le=90),
+    recent: int = Query(10, ge=0, le=100, description="每个账号返回的最近运行条数"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    各账号签到耗时历史: 总耗时与各阶段 (cookie/setup/topics/checkin/finish/push) 的 p50/p95 与趋势
+
+    趋势为时间窗内后一半运行相对前一半的 p50 变化比例, 按账号 + Provider 分组统计。
+    """
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+    query = (
+        select(CheckinRun, Account.account_name)
+        .join(Account, Account.id == CheckinRun.account_id)
+        .where(CheckinRun.started_at >= since, CheckinRun.timings.is_not(None))
+        .order_by(CheckinRun.started_at)
+    )
+    if account_id is not None:
+        query = query.where(CheckinRun.account_id == account_id)
+    rows = (await db.execute(query)).all()
+
+    groups: dict[tuple, list] = {}
+    names: dict[int, str] = {}
+    for run, account_name in rows:
+        groups.setdefault((run.account_id, run.provider or ""), []).append(run)
+        names[run.account_id] = account_name
+
+    accounts = []
+    for (acc_id, provider), runs in groups.items():
+        accounts.append({
+            "account_id": acc_id,
+            "account_name": names[acc_id],
+            "provider": provider,
+            **run_timing.summarize_history(runs),
+            "recent": [
+                {
+                    "run_id": r.id,
+                    "run_date": r.run_date,
+                    "source": r.source,
+                    "started_at": to_tz_iso(r.started_at),
+                    "total_ms": r.timings["total_ms"],
+                    "phases": {name: p["ms"] for name, p in r.timings.get("phases", {}).items()},
+                    "requests": r.timings.get("requests", 0),
+                }
+                for r in (runs[-recent:] if recent else [])[::-1]
+            ],
+        })
+    # 最慢 (p95 总耗时) 的在前
+    accounts.sort(key=lambda a: a["total_ms"]["p95"], reverse=True)
+    return {"ok": True, "days": days, "accounts": accounts}
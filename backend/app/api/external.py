@@ -1,10 +1,14 @@
 """外部 API 路由 — 供 GUI 客户端调用"""
 
+import asyncio
+import json
 import logging
+import time
 from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
@@ -71,6 +75,14 @@ async def update_cookie(
         payload.SUB, payload.SUBP, payload.T_WM
     )
 
+    if is_valid is None:
+        return ExternalResponse(
+            ok=False,
+            message="暂时无法验证 Cookie (微博接口不可达), 请稍后重试",
+            account=account_name,
+            account_name=account_name,
+        )
+
     if not is_valid:
         return ExternalResponse(
             ok=False,
@@ -180,6 +192,118 @@ async def external_push_test(
 class CheckinTriggerRequest(BaseModel):
     account_name: Optional[str] = None
     sendkey: Optional[str] = None
+    # 为 True 时以 NDJSON 流式返回: 每个超话一行, 最后一行为汇总
+    stream: bool = False
+
+
+# 流式模式下无新结果时的心跳间隔 (秒), 需小于客户端读超时
+_STREAM_HEARTBEAT_SECONDS = 5.0
+_STREAM_POLL_SECONDS = 0.5
+
+
+def _build_checkin_detail(stats: dict) -> str:
+    """签到结果的文本明细 (汇总 + 逐超话状态 + 失败项)"""
+    total = stats.get('total', 0)
+    success = stats.get('success', 0)
+    already = stats.get('already', 0)
+    failed = stats.get('failed', 0)
+    summary = f"总计 {total}, 成功 {success}, 已签 {already}, 失败 {failed}"
+
+    detail_lines = [summary, ""]
+
+    # 列出每个超话的签到状态
+    checkin_details = stats.get("checkin_details", [])
+    if checkin_details:
+        detail_lines.append("超话签到明细：")
+        for i, item in enumerate(checkin_details, 1):
+            icon = {"success": "✅", "already": "☑️", "failed": "❌"}.get(item["status"], "?")
+            detail_lines.append(f"  {i}. {icon} {item['name']}: {item['detail']}")
+    elif total == 0:
+        detail_lines.append("⚠️ 未获取到任何关注的超话。")
+        detail_lines.append("可能原因：Cookie过期、未关注超话、或微博API参数未配置。")
+
+    if stats.get("failed_items"):
+        detail_lines.append("")
+        detail_lines.append("失败项详情：")
+        for item in stats["failed_items"]:
+            detail_lines.append(f"  - {item}")
+
+    return "\n".join(detail_lines)
+
+
+def _ndjson(obj: dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _stream_checkin(account_id: int, account_name: str, sendkey: Optional[str]):
+    """
+    NDJSON 流式签到进度
+
+    依次输出: start → 每个超话一行 topic (按完成顺序) / 阶段变化时的 progress → summary。
+    长时间没有新结果时输出 heartbeat, 避免客户端与代理读超时断开。
+    """
+    yield _ndjson({"type": "start", "account": account_name})
+
+    future = checkin_service.run_engine.submit(account_id, source="external", sendkey=sendkey)
+    progress = None
+    sent = 0
+    phase = None
+    last_output = time.monotonic()
+
+    def drain():
+        nonlocal sent
+        topics = progress["topics"] if progress else []
+        lines = [
+            _ndjson({"type": "topic", "index": sent + i + 1, **item})
+            for i, item in enumerate(topics[sent:])
+        ]
+        sent = len(topics)
+        return lines
+
+    while True:
+        done = future.done()
+        # 持有进度对象的引用: 运行结束后引擎不再登记它, 但其中的明细仍完整
+        progress = progress or checkin_service.get_live_progress(account_id)
+        lines = drain()
+        if progress and progress["phase"] != phase:
+            phase = progress["phase"]
+            lines.append(_ndjson({
+                "type": "progress", "phase": phase, "run_id": progress["run_id"],
+                "done": progress["done"], "total": progress["total"],
+            }))
+        if not lines and time.monotonic() - last_output >= _STREAM_HEARTBEAT_SECONDS:
+            lines.append(_ndjson({"type": "heartbeat", "done": sent}))
+        for line in lines:
+            yield line
+        if lines:
+            last_output = time.monotonic()
+        if done:
+            break
+        await asyncio.sleep(_STREAM_POLL_SECONDS)
+
+    try:
+        stats = future.result()
+    except Exception as e:
+        logger.error(f"External checkin trigger failed: {e}")
+        yield _ndjson({"type": "summary", "ok": False, "message": f"签到执行出错: {str(e)}"})
+        return
+    if stats is None:
+        yield _ndjson({"type": "summary", "ok": False, "message": "账号不存在"})
+        return
+
+    # 未观察到实时进度 (复用了其他进程的结果等) 时, 以最终明细补齐
+    if progress is None:
+        for i, item in enumerate(stats.get("checkin_details", []), 1):
+            yield _ndjson({"type": "topic", "index": i, **item})
+
+    yield _ndjson({
+        "type": "summary",
+        "ok": True,
+        "message": "签到完成",
+        "detail": _build_checkin_detail(stats),
+        "account": account_name,
+        "stats": {k: stats.get(k, 0) for k in ("total", "success", "already", "failed")},
+    })
 
 
 @router.post("/checkin/trigger")
@@ -193,6 +317,7 @@ async def external_trigger_checkin(
     - 如果 Key 绑定了账号，优先使用绑定的账号
     - 否则使用 payload 中的 account_name
     - 可选：携带 sendkey 用于本次签到结果推送测试
+    - 可选：stream=true 时返回 application/x-ndjson 流, 逐超话输出签到结果
     """
     # 确定目标账号
     target_account = None
@@ -204,54 +329,27 @@ async def external_trigger_checkin(
     if not target_account:
         return {"ok": False, "message": "无法确定目标账号: Key 未绑定账号且请求中未提供 account_name"}
 
-    # 临时覆盖 sendkey 用于测试本次推送
-    original_sendkey = target_account.sendkey
-    if payload.sendkey:
-        target_account.sendkey = payload.sendkey
+    if payload.stream:
+        return StreamingResponse(
+            _stream_checkin(target_account.id, target_account.account_name, payload.sendkey or None),
+            media_type="application/x-ndjson",
+        )
 
     try:
-        # 执行签到
-        # run_checkin 返回 stats 字典
-        stats = await checkin_service.run_checkin(db, target_account)
-
-        # 构建返回消息
-        total = stats.get('total', 0)
-        success = stats.get('success', 0)
-        already = stats.get('already', 0)
-        failed = stats.get('failed', 0)
-        summary = f"总计 {total}, 成功 {success}, 已签 {already}, 失败 {failed}"
-        
-        detail_lines = [summary, ""]
-
-        # 列出每个超话的签到状态
-        checkin_details = stats.get("checkin_details", [])
-        if checkin_details:
-            detail_lines.append("超话签到明细：")
-            for i, item in enumerate(checkin_details, 1):
-                icon = {"success": "✅", "already": "☑️", "failed": "❌"}.get(item["status"], "?")
-                detail_lines.append(f"  {i}. {icon} {item['name']}: {item['detail']}")
-        elif total == 0:
-            detail_lines.append("⚠️ 未获取到任何关注的超话。")
-            detail_lines.append("可能原因：Cookie过期、未关注超话、或微博API参数未配置。")
-
-        if stats.get("failed_items"):
-            detail_lines.append("")
-            detail_lines.append("失败项详情：")
-            for item in stats["failed_items"]:
-                detail_lines.append(f"  - {item}")
-
-        detail_msg = "\n".join(detail_lines)
+        # 经执行引擎签到: 该账号已在签到时直接复用其结果
+        # payload.sendkey 仅用于本次推送, 不修改账号配置
+        stats = await checkin_service.run_engine.run(
+            target_account.id, source="external", sendkey=payload.sendkey or None
+        )
+        if stats is None:
+            return {"ok": False, "message": "账号不存在"}
 
         return {
             "ok": True,
             "message": "签到完成",
-            "detail": detail_msg,
+            "detail": _build_checkin_detail(stats),
             "account": target_account.account_name,
         }
     except Exception as e:
         logger.error(f"External checkin trigger failed: {e}")
         return {"ok": False, "message": f"签到执行出错: {str(e)}"}
-    finally:
-        # 恢复 sendkey (虽然是在 session 中改的对象没 commit 应该没事，但还是小心)
-        if payload.sendkey:
-            target_account.sendkey = original_sendkey
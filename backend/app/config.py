@@ -7,6 +7,10 @@ from typing import Optional
 class Settings(BaseSettings):
     # 数据库
     DATABASE_URL: str = "postgresql+asyncpg://weibo:weibo_password@db:5432/weibo"
+    # 连接池: 每个执行中的签到最多占用 3 个连接 (advisory lock + 运行会话 + 检查点),
+    # 不足 CHECKIN_GLOBAL_CONCURRENCY * 3 + 5 时自动扩大 max_overflow
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
 
     # 管理员 API Key
     ADMIN_API_KEY: str = "change-me-to-a-strong-random-key"
@@ -17,9 +21,79 @@ class Settings(BaseSettings):
     # 签到策略: cardlist / topicsub / mweibo
     CHECKIN_PROVIDER: str = "cardlist"
 
+    # Cookie 校验结果缓存 (分钟): 期间内签到不再请求 m.weibo.cn/api/config; 0 表示每次都校验
+    COOKIE_VALIDATION_TTL_MINUTES: float = 30
+
+    # 全局同时签到的账号数 (手动全部签到与定时任务共用)
+    CHECKIN_GLOBAL_CONCURRENCY: int = 8
+    # 同一账号正在其他进程签到时, 轮询其结果的间隔 (秒)
+    CHECKIN_SINGLE_FLIGHT_POLL: float = 2.0
+    # 后台签到任务结束后保留多久供查询 (分钟)
+    CHECKIN_JOB_RETENTION_MINUTES: int = 60
+
+    # 定时签到队列: memory (进程内延迟队列, 单进程) / postgres (checkin_queue 表, 多进程/多容器认领执行)
+    RUN_QUEUE_BACKEND: str = "memory"
+    # 认领到期项的轮询间隔 (秒)、租约时长 (秒, 执行期间每 1/3 租约续期一次)
+    RUN_QUEUE_POLL_SECONDS: float = 2.0
+    RUN_QUEUE_LEASE_SECONDS: int = 120
+    # 同一项最多认领次数 (租约过期或执行异常后重新投递), 超过后标记为 failed
+    RUN_QUEUE_MAX_ATTEMPTS: int = 3
+    # 已完成/失败的队列项保留天数
+    RUN_QUEUE_RETENTION_DAYS: int = 7
+    # 每个容器的 uvicorn worker 进程数 (Dockerfile 启动命令读取); 大于 1 时需 PostgreSQL 且 RUN_QUEUE_BACKEND=postgres,
+    # 各进程各自最多 CHECKIN_GLOBAL_CONCURRENCY 个账号同时签到, 总吞吐随进程/容器数增加
+    UVICORN_WORKERS: int = 1
+    # 多副本部署时调度 leader 选举 (PostgreSQL advisory lock) 的检查间隔 (秒), leader 退出后备用副本在此时间内接管
+    SCHEDULER_LEADER_POLL_SECONDS: float = 3.0
+    # 签到进度检查点: 每完成多少个超话写入一次 checkin_results (中断后据此续签)
+    CHECKIN_CHECKPOINT_BATCH: int = 20
+
+    # Provider 计分板: 统计窗口、最少样本、最低成功率、连续失败降级阈值、降级时长(秒)
+    PROVIDER_STATS_WINDOW: int = 50
+    PROVIDER_MIN_SAMPLES: int = 10
+    PROVIDER_MIN_SUCCESS_RATE: float = 0.5
+    PROVIDER_DEMOTE_FAILURES: int = 5
+    PROVIDER_DEMOTE_SECONDS: int = 600
+
+    # 超话列表竞速: off / hedge (主 Provider 超过 TOPIC_HEDGE_DELAY 秒未返回再启动回退) / parallel
+    TOPIC_RACE_MODE: str = "off"
+    TOPIC_HEDGE_DELAY: float = 3.0
+
+    # 签到重试退避: 首次重试等待(秒)与上限(秒), 之后按 2 倍指数增长并加随机抖动;
+    # 未关注/参数错误/Cookie 失效等不可重试的失败不会重试
+    CHECKIN_RETRY_BASE_DELAY: float = 1.0
+    CHECKIN_RETRY_MAX_DELAY: float = 30.0
+
     # 微博 API 抓包参数 (JSON 字符串)
     WEIBO_API_PARAMS: str = "{}"
 
+    # 关注超话列表缓存有效期 (小时), 过期后后台刷新; 0 表示不使用缓存
+    TOPIC_CACHE_TTL_HOURS: float = 24
+
+    # 上游 HTTP 连接池 (weibo / Server酱 共享)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    # HTTP/2 多路复用, 需要额外安装 h2 (pip install httpx[http2])
+    HTTP2_ENABLED: bool = False
+
+    # 上游流量录制/回放: off / record / replay
+    HTTP_CAPTURE_MODE: str = "off"
+    HTTP_CAPTURE_PATH: str = "logs/http_capture.jsonl.gz"
+    # 回放时按录制耗时的倍数等待, 0 表示不等待
+    HTTP_REPLAY_LATENCY_SCALE: float = 1.0
+
+    # 上游熔断 (按 host): 统计窗口(秒)、最少请求数、错误率/慢请求比例阈值、慢请求耗时(秒)、
+    # 打开时长(秒)、半开状态并发探测数
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_WINDOW_SECONDS: float = 60.0
+    CIRCUIT_MIN_REQUESTS: int = 10
+    CIRCUIT_ERROR_RATE: float = 0.5
+    CIRCUIT_SLOW_SECONDS: float = 8.0
+    CIRCUIT_SLOW_RATE: float = 0.8
+    CIRCUIT_OPEN_SECONDS: float = 30.0
+    CIRCUIT_HALF_OPEN_PROBES: int = 1
+
     # 时区
     TZ: str = "Asia/Shanghai"
 
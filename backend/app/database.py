@@ -5,7 +5,21 @@ from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False, pool_pre_ping=True)
+# 每个执行中的签到最多同时占用 3 个连接: advisory lock 连接、运行会话、检查点写入会话;
+# 另为 API 请求、调度 leader 与签到队列消费者保留若干连接。配置的连接池不足时自动扩大 max_overflow
+_CONNECTIONS_PER_RUN = 3
+_RESERVED_CONNECTIONS = 5
+_min_connections = settings.CHECKIN_GLOBAL_CONCURRENCY * _CONNECTIONS_PER_RUN + _RESERVED_CONNECTIONS
+
+_pool_options = (
+    {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": max(settings.DB_MAX_OVERFLOW, _min_connections - settings.DB_POOL_SIZE),
+    }
+    if settings.DATABASE_URL.startswith("postgresql")
+    else {}
+)
+engine = create_async_engine(settings.DATABASE_URL, echo=False, pool_pre_ping=True, **_pool_options)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -7,11 +7,17 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
+from app.database import engine as db_engine
+from app.services import run_queue, scheduler_leader
 from app.services.scheduler_service import (
     apply_all_schedules,
+    on_leader_elected,
     start_scheduler,
     shutdown_scheduler,
 )
+from app.services.checkin_service import run_engine
+from app.services.run_queue import start_consumer, stop_consumer
+from app.services.weibo_client import close_http_client
 
 # 日志配置
 logging.basicConfig(
@@ -21,16 +27,34 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _check_worker_settings():
+    """多 worker 部署的配置检查"""
+    if settings.UVICORN_WORKERS <= 1:
+        return
+    if db_engine.dialect.name != "postgresql":
+        logger.error("UVICORN_WORKERS>1 需要 PostgreSQL: 其他数据库下每个进程都会分发定时签到, 造成重复签到")
+    elif not run_queue.enabled():
+        logger.warning("UVICORN_WORKERS>1 但 RUN_QUEUE_BACKEND=memory: 定时签到只在 leader 进程执行, 其他进程不分担")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     logger.info("微博签到系统启动中...")
     start_scheduler()
     await apply_all_schedules()
+    # 只有 leader 分发定时签到与续签中断的运行, 其他副本只提供 API 与消费签到队列
+    await scheduler_leader.start(on_elected=on_leader_elected)
+    start_consumer(run_engine)
+    _check_worker_settings()
     logger.info("启动完成")
     yield
     logger.info("微博签到系统关闭中...")
+    await scheduler_leader.stop()
     shutdown_scheduler()
+    await stop_consumer()
+    await run_engine.shutdown()
+    await close_http_client()
     logger.info("关闭完成")
 
 
@@ -1,7 +1,12 @@
 """ORM 模型包"""
 
 from app.models.account import Account
+from app.models.account_topic import AccountTopic
+from app.models.checkin_job import CheckinJob
+from app.models.checkin_queue import CheckinQueueItem
+from app.models.checkin_result import CheckinRecord
+from app.models.checkin_run import CheckinRun
 from app.models.member_key import MemberKey
 from app.models.task_log import TaskLog
 
-__all__ = ["Account", "MemberKey", "TaskLog"]
+__all__ = ["Account", "AccountTopic", "CheckinJob", "CheckinQueueItem", "CheckinRecord", "CheckinRun", "MemberKey", "TaskLog"]
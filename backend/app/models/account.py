@@ -22,10 +22,18 @@ class Account(Base):
     schedule_enabled: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     schedule_time: Mapped[str] = mapped_column(String(10), default="08:00", nullable=False)
     schedule_random_delay: Mapped[int] = mapped_column(Integer, default=300, nullable=False)
+    # schedule_enabled / schedule_time 最近一次变化的时间, 定时索引按此增量同步 (签到结果写回不影响)
+    schedule_updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False, index=True,
+    )
 
     # 运行参数
     retry_count: Mapped[int] = mapped_column(Integer, default=3, nullable=False)
     request_interval: Mapped[float] = mapped_column(Float, default=2.0, nullable=False)
+    # 同时在途的签到请求数
+    checkin_concurrency: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    # 令牌桶速率 (次/秒), 0 表示按 1 / request_interval 换算
+    checkin_rate: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
 
     # 推送
     sendkey: Mapped[str | None] = mapped_column(String(200), nullable=True)
@@ -37,7 +45,7 @@ class Account(Base):
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), onupdate=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False
+        DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), onupdate=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False,
     )
 
     member_keys = relationship("MemberKey", back_populates="bound_account", lazy="selectin")
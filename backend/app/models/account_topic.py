@@ -0,0 +1,29 @@
+"""账号关注超话缓存 ORM 模型"""
+
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class AccountTopic(Base):
+    __tablename__ = "account_topics"
+    __table_args__ = (
+        UniqueConstraint("account_id", "provider", "container_id", name="uq_account_topics_account_provider_cid"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    account_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+
+    # 获取该超话的 Provider: cardlist / topicsub
+    provider: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    container_id: Mapped[str] = mapped_column(String(100), nullable=False)
+    title: Mapped[str] = mapped_column(String(200), nullable=False, default="")
+    # cardlist 为 scheme, topicsub 为 request_url
+    scheme: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # 最近一次在关注列表中出现的时间
+    last_seen: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False)
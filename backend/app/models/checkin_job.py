@@ -0,0 +1,34 @@
+"""后台签到任务 ORM 模型"""
+
+from datetime import datetime, timezone
+from sqlalchemy import String, DateTime, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class CheckinJob(Base):
+    """
+    手动签到/全部签到的后台任务登记 (见 job_service)
+
+    创建任务的进程在内存中跟踪实时进度; 其他副本或重启后按 accounts 中的账号
+    从 checkin_runs / checkin_results 还原进度, 任务结束时写回各账号最终结果。
+    """
+
+    __tablename__ = "checkin_jobs"
+
+    # uuid hex, 即接口返回的 job_id
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # checkin / checkin-all
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    source: Mapped[str] = mapped_column(String(20), nullable=False, default="manual")
+    # running / completed
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="running")
+
+    # [{account_id, account_name, status, error, result}], 任务结束前 status 均为 queued
+    accounts: Mapped[list] = mapped_column(JSON, nullable=False, default=list)
+
+    # 创建任务的进程 (主机名:pid)
+    owner: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False, index=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
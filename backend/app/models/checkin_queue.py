@@ -0,0 +1,47 @@
+"""持久化签到队列 ORM 模型"""
+
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Index, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class CheckinQueueItem(Base):
+    """
+    待执行的账号签到 (RUN_QUEUE_BACKEND=postgres 时定时签到经此分发)
+
+    各进程以 SELECT ... FOR UPDATE SKIP LOCKED 认领到期项并持有租约, 执行期间定期续租;
+    租约过期 (进程崩溃等) 的项会被其他进程重新认领, 由 run_checkin 续签剩余超话。
+    """
+
+    __tablename__ = "checkin_queue"
+    __table_args__ = (
+        Index("ix_checkin_queue_status_run_at", "status", "run_at"),
+        # 同一账号同一去重键只入队一次 (如 schedule:2026-10-18), 多进程重复分发时幂等
+        Index("uq_checkin_queue_account_dedupe", "account_id", "dedupe_key", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    account_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False
+    )
+    source: Mapped[str] = mapped_column(String(20), nullable=False, default="schedule")
+    dedupe_key: Mapped[str | None] = mapped_column(String(40), nullable=True)
+
+    # queued / leased / done / failed
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")
+    # 最早开始时间 (已含 schedule_random_delay 随机延迟)
+    run_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    # 租约: 认领的进程与到期时间, 执行期间由心跳续期
+    lease_owner: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # 完成后对应的 checkin_runs.id 与失败原因
+    run_id: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,37 @@
+"""超话签到明细 ORM 模型"""
+
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class CheckinRecord(Base):
+    """单次签到中每个超话的结果, 同一次签到共享 run_id (TaskLog.detail 中只保留汇总)"""
+
+    __tablename__ = "checkin_results"
+    __table_args__ = (
+        Index("ix_checkin_results_account_cid", "account_id", "container_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    run_id: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    account_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False
+    )
+
+    container_id: Mapped[str] = mapped_column(String(100), nullable=False, default="")
+    topic_title: Mapped[str] = mapped_column(String(200), nullable=False, default="")
+
+    # success / already / failed
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    # 失败类型: transient / rate_limited / auth / permanent / unknown / circuit_open
+    failure: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    detail: Mapped[str | None] = mapped_column(String(500), nullable=True)
+
+    # 最后一次签到请求的上游耗时、含限速等待与重试退避的总耗时、尝试次数 (列表显示已签的超话为 0)
+    latency_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    elapsed_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False, index=True)
@@ -0,0 +1,43 @@
+"""签到运行记录 ORM 模型"""
+
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class CheckinRun(Base):
+    """一次账号签到的运行状态, 逐超话进度见 checkin_results (run_id 关联)"""
+
+    __tablename__ = "checkin_runs"
+    __table_args__ = (
+        Index("ix_checkin_runs_account_date", "account_id", "run_date"),
+    )
+
+    # uuid hex, 与 checkin_results.run_id / TaskLog.detail.run_id 一致
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    account_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False
+    )
+
+    # 本地日期 (settings.TZ), 中断的运行只在当天续签
+    run_date: Mapped[str] = mapped_column(String(10), nullable=False)
+
+    # running / completed / interrupted
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="running", index=True)
+
+    # 触发来源: schedule / manual / manual-all / external / resume
+    source: Mapped[str] = mapped_column(String(20), nullable=False, default="manual")
+    provider: Mapped[str | None] = mapped_column(String(20), nullable=True)
+
+    # 被续签的次数
+    resumes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # 完成后的汇总 (与 TaskLog.detail 相同)
+    summary: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    # 耗时分解: 各阶段耗时/请求数、翻页耗时、单超话签到耗时分位数 (见 run_timing)
+    timings: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -13,6 +13,8 @@ class AccountCreate(BaseModel):
     schedule_random_delay: int = Field(300, ge=0, le=86400)
     retry_count: int = Field(3, ge=1, le=10)
     request_interval: float = Field(2.0, ge=0.5, le=30.0)
+    checkin_concurrency: int = Field(1, ge=1, le=20)
+    checkin_rate: float = Field(0.0, ge=0.0, le=20.0)
     sendkey: Optional[str] = None
 
 
@@ -27,6 +29,8 @@ class AccountUpdate(BaseModel):
     schedule_random_delay: Optional[int] = Field(None, ge=0, le=86400)
     retry_count: Optional[int] = Field(None, ge=1, le=10)
     request_interval: Optional[float] = Field(None, ge=0.5, le=30.0)
+    checkin_concurrency: Optional[int] = Field(None, ge=1, le=20)
+    checkin_rate: Optional[float] = Field(None, ge=0.0, le=20.0)
     sendkey: Optional[str] = None
 
 
@@ -42,6 +46,8 @@ class AccountResponse(BaseModel):
     schedule_random_delay: int
     retry_count: int
     request_interval: float
+    checkin_concurrency: int
+    checkin_rate: float
     sendkey: Optional[str] = None
     last_checkin_at: Optional[datetime] = None
     last_checkin_status: Optional[str] = None
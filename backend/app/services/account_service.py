@@ -48,9 +48,14 @@ async def update_account(db: AsyncSession, account_id: int, data: AccountUpdate)
         return None
 
     update_data = data.model_dump(exclude_unset=True)
+    schedule_before = (account.schedule_enabled, account.schedule_time)
     for key, value in update_data.items():
         setattr(account, key, value)
-    account.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    account.updated_at = now
+    if (account.schedule_enabled, account.schedule_time) != schedule_before:
+        # 其他副本的定时索引按此增量同步
+        account.schedule_updated_at = now
     await db.commit()
     await db.refresh(account)
     return account
@@ -2,38 +2,302 @@
 
 import asyncio
 import logging
+import uuid
+from collections import OrderedDict, deque
 from datetime import datetime, timezone
+from typing import List, Optional, Tuple
 
+from sqlalchemy import delete, desc, insert, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.database import async_session, engine as db_engine
 from app.models.account import Account
+from app.models.checkin_result import CheckinRecord
+from app.models.checkin_run import CheckinRun
 from app.models.task_log import TaskLog
-from app.services.cookie_service import validate_cookie
+from app.services import provider_stats, run_queue, run_timing, topic_cache_service
+from app.services.cookie_service import CookieCheckUnavailable, invalidate_cookie, validate_cookie
 from app.services.push_service import (
     push_event,
     build_checkin_message,
     build_cookie_invalid_message,
 )
-from app.services.weibo_client import get_provider
+from app.services.weibo_client import (
+    BaseProvider,
+    CheckinResult,
+    Topic,
+    get_provider,
+    is_unknown_topic,
+)
+from app.utils import retry
+from app.utils.rate_limit import TokenBucket
+from app.utils.time import local_date_str
 
 logger = logging.getLogger(__name__)
 
 
-async def run_checkin(db: AsyncSession, account: Account) -> dict:
+def _schedule_topic_refresh(account: Account, provider_name: str):
+    topic_cache_service.schedule_refresh(
+        account.id,
+        provider_name,
+        account.cookie_sub or "",
+        account.cookie_subp or "",
+        account.cookie_twm or "",
+    )
+
+
+async def _race_topics(
+    primary: BaseProvider, secondary: BaseProvider, hedge_delay: float
+) -> Tuple[BaseProvider, List[Topic]]:
+    """
+    对冲/竞速获取超话列表
+
+    先启动主 Provider; hedge_delay 秒后仍未返回 (或已返回空列表) 时启动副 Provider,
+    取最先返回非空列表的一方并取消另一方。两者都为空时返回 (primary, [])。
+    """
+    tasks: dict[asyncio.Task, BaseProvider] = {asyncio.create_task(primary.get_topics()): primary}
+    secondary_started = False
+
+    def start_secondary():
+        nonlocal secondary_started
+        secondary_started = True
+        tasks[asyncio.create_task(secondary.get_topics())] = secondary
+
+    if hedge_delay <= 0:
+        start_secondary()
+
+    try:
+        while tasks:
+            timeout = None if secondary_started else hedge_delay
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # 主 Provider 超过对冲延迟仍未返回
+                start_secondary()
+                continue
+
+            for task in done:
+                prov = tasks.pop(task)
+                try:
+                    topics = task.result()
+                except Exception as e:
+                    logger.warning(f"竞速获取超话失败: {prov.name}: {e}")
+                    topics = []
+                if topics:
+                    loser = secondary if prov is primary else primary
+                    provider_stats.record_race(prov.name, loser.name if secondary_started else "")
+                    return prov, topics
+
+            if not secondary_started:
+                start_secondary()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return primary, []
+
+
+RUN_RUNNING = "running"
+RUN_COMPLETED = "completed"
+RUN_INTERRUPTED = "interrupted"
+
+# TaskLog.detail 只保留的汇总字段, 逐超话明细写入 checkin_results
+_SUMMARY_KEYS = (
+    "run_id", "total", "success", "already", "failed", "skipped", "resumed",
+    "failure_classes", "provider", "cookie_valid",
+)
+
+
+def _summary(stats: dict) -> dict:
+    return {k: stats[k] for k in _SUMMARY_KEYS if k in stats}
+
+
+def _detail_item(topic: Topic, result: CheckinResult) -> dict:
+    """单个超话的签到明细 (stats["checkin_details"] 与实时进度共用)"""
+    item = {"name": topic.title, "status": result.status, "detail": result.detail}
+    if result.failure:
+        item["failure"] = result.failure
+    return item
+
+
+# 执行引擎中各账号的实时进度 {account_id: progress}, 供后台任务接口轮询
+_live_progress: dict[int, dict] = {}
+
+
+def _new_progress() -> dict:
+    return {
+        "run_id": None, "phase": "queued", "total": None, "done": 0, "resumed": 0,
+        "success": 0, "already": 0, "failed": 0, "topics": [],
+    }
+
+
+def _set_progress(account_id: int, **fields):
+    progress = _live_progress.get(account_id)
+    if progress is not None:
+        progress.update(fields)
+
+
+def _add_progress(account_id: int, topic: Topic, result: CheckinResult):
+    progress = _live_progress.get(account_id)
+    if progress is None:
+        return
+    progress["done"] += 1
+    progress[result.status] = progress.get(result.status, 0) + 1
+    progress["topics"].append(_detail_item(topic, result))
+
+
+def get_live_progress(account_id: int) -> Optional[dict]:
+    """账号正在执行的签到进度 (phase/计数/逐超话明细), 未在执行时返回 None"""
+    return _live_progress.get(account_id)
+
+
+def _record_row(run_id: str, account_id: int, topic: Topic, result: CheckinResult) -> dict:
+    return {
+        "run_id": run_id,
+        "account_id": account_id,
+        "container_id": topic.container_id or "",
+        "topic_title": topic.title[:200],
+        "status": result.status,
+        "failure": result.failure or None,
+        "detail": (result.detail or "")[:500] or None,
+        "latency_ms": result.latency_ms,
+        "elapsed_ms": result.elapsed_ms,
+        "attempts": result.attempts,
+    }
+
+
+def _resume_key(topic: Topic) -> str:
+    return topic.container_id or topic.title
+
+
+class _Checkpoint:
+    """
+    逐超话进度检查点
+
+    每完成 CHECKIN_CHECKPOINT_BATCH 个超话, 用独立会话批量写入 checkin_results 并提交,
+    进程重启或任务被取消后可据此只续签剩余超话。
+    """
+
+    def __init__(self, run_id: str, account_id: int):
+        self.run_id = run_id
+        self.account_id = account_id
+        self.batch = max(settings.CHECKIN_CHECKPOINT_BATCH, 1)
+        self._buffer: list[dict] = []
+        self._lock = asyncio.Lock()
+
+    async def add(self, topic: Topic, result: CheckinResult):
+        self._buffer.append(_record_row(self.run_id, self.account_id, topic, result))
+        if len(self._buffer) >= self.batch:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            async with async_session() as session:
+                await session.execute(insert(CheckinRecord), rows)
+                await session.commit()
+
+
+async def _start_run(
+    db: AsyncSession, account: Account, source: str
+) -> Tuple[CheckinRun, List[Tuple[Topic, CheckinResult]]]:
+    """
+    创建本次运行记录; 当天有未完成 (中断) 的运行时续用其 run_id
+
+    返回 (run, done) — done 为已成功/已签的超话结果, 本次不再签到
+    """
+    result = await db.execute(
+        select(CheckinRun)
+        .where(
+            CheckinRun.account_id == account.id,
+            CheckinRun.run_date == local_date_str(),
+            CheckinRun.status.in_((RUN_RUNNING, RUN_INTERRUPTED)),
+        )
+        .order_by(desc(CheckinRun.started_at))
+        .limit(1)
+    )
+    run = result.scalar_one_or_none()
+    if run is None:
+        run = CheckinRun(id=uuid.uuid4().hex, account_id=account.id, run_date=local_date_str(), source=source[:20])
+        db.add(run)
+        await db.commit()
+        return run, []
+
+    records = await db.execute(
+        select(CheckinRecord)
+        .where(CheckinRecord.run_id == run.id, CheckinRecord.status.in_(("success", "already")))
+        .order_by(CheckinRecord.id)
+    )
+    done = [
+        (
+            Topic(title=r.topic_title, container_id=r.container_id),
+            CheckinResult(topic_title=r.topic_title, status=r.status, detail=r.detail or "",
+                          attempts=r.attempts, latency_ms=r.latency_ms, elapsed_ms=r.elapsed_ms),
+        )
+        for r in records.scalars().all()
+    ]
+    # 失败的超话本次重新签到, 删除其旧进度避免明细重复
+    await db.execute(
+        delete(CheckinRecord).where(
+            CheckinRecord.run_id == run.id, CheckinRecord.status.notin_(("success", "already"))
+        )
+    )
+    run.status = RUN_RUNNING
+    run.resumes += 1
+    await db.commit()
+    logger.info(f"续签中断的运行: {account.account_name}, run_id={run.id}, 已完成 {len(done)} 个超话")
+    return run, done
+
+
+async def _mark_interrupted(run_id: str, checkpoint: "_Checkpoint"):
+    """运行被取消时保存已完成的进度"""
+    try:
+        await checkpoint.flush()
+        async with async_session() as session:
+            run = await session.get(CheckinRun, run_id)
+            if run and run.status == RUN_RUNNING:
+                run.status = RUN_INTERRUPTED
+                await session.commit()
+    except Exception as e:
+        logger.error(f"保存中断进度失败: run_id={run_id}: {e}")
+
+
+async def run_checkin(
+    db: AsyncSession, account: Account, source: str = "manual", sendkey: Optional[str] = None
+) -> dict:
     """
     执行一个账号的超话签到任务
 
+    每次运行有持久化的 run_id 与逐超话检查点; 当天存在中断的运行时续用它, 只签剩余超话。
+    sendkey: 仅本次推送使用的 SendKey (不修改账号配置)
     返回签到统计结果（含每个超话明细）
+
+    手动/定时/外部触发请经 run_engine 调用, 以保证同一账号不会并发签到。
     """
     account_name = account.account_name
     logger.info(f"开始签到: {account_name}")
 
     # 1. Cookie 有效性校验
-    is_valid, user_info = await validate_cookie(
-        account.cookie_sub or "",
-        account.cookie_subp or "",
-        account.cookie_twm or "",
-    )
+    _set_progress(account.id, phase="cookie")
+    with run_timing.phase("cookie"):
+        is_valid, user_info = await validate_cookie(
+            account.cookie_sub or "",
+            account.cookie_subp or "",
+            account.cookie_twm or "",
+        )
+
+    if is_valid is None:
+        # 上游故障期间 (熔断打开等) 不改动账号的 Cookie 状态, 也不推送失效告警; 由调用方按失败处理或稍后重试
+        db.add(TaskLog(
+            account_id=account.id,
+            event_type="checkin",
+            status="fail",
+            message=f"Cookie 校验请求失败 (微博接口不可达), 本次未签到: {account_name}",
+        ))
+        await db.commit()
+        raise CookieCheckUnavailable(f"微博接口不可达, 无法校验 Cookie: {account_name}")
 
     if not is_valid:
         logger.warning(f"Cookie 无效: {account_name}")
@@ -54,47 +318,177 @@ async def run_checkin(db: AsyncSession, account: Account) -> dict:
 
         # 推送告警
         title, desp = build_cookie_invalid_message(account_name)
-        await push_event(db, "cookie_invalid", title, desp, account)
+        await push_event(db, "cookie_invalid", title, desp, account, sendkey=sendkey)
 
         return {"total": 0, "success": 0, "already": 0, "failed": 0, "cookie_valid": False}
 
+    with run_timing.phase("setup"):
+        run, done = await _start_run(db, account, source)
+    _set_progress(account.id, phase="topics", run_id=run.id, resumed=len(done))
+    for topic, result in done:
+        _add_progress(account.id, topic, result)
+    checkpoint = _Checkpoint(run.id, account.id)
+    try:
+        return await _run_topics(db, account, run, done, checkpoint, sendkey)
+    except BaseException:
+        # 被取消 (应用退出) 或异常中断: 保存已完成进度, 下次触发或重启后只续签剩余超话
+        await asyncio.shield(_mark_interrupted(run.id, checkpoint))
+        raise
+
+
+def _finish_run(run: CheckinRun, stats: dict):
+    run.status = RUN_COMPLETED
+    run.summary = _summary(stats)
+    run.finished_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def _push_and_save_timings(db: AsyncSession, run: CheckinRun, account: Account, stats: dict, **push_kwargs):
+    """推送签到结果, 之后把本次运行的耗时分解 (含推送) 写入运行记录"""
+    with run_timing.phase("push"):
+        title, desp = build_checkin_message(account, stats)
+        await push_event(db, "checkin", title, desp, account, **push_kwargs)
+
+    timings = run_timing.current()
+    if timings is not None:
+        run.timings = timings.as_dict()
+        await db.commit()
+
+
+async def _run_topics(
+    db: AsyncSession,
+    account: Account,
+    run: CheckinRun,
+    done: List[Tuple[Topic, CheckinResult]],
+    checkpoint: _Checkpoint,
+    sendkey: Optional[str] = None,
+) -> dict:
+    """获取超话并签到 (跳过 done 中已完成的), 汇总后写日志并推送"""
+    account_name = account.account_name
+
     # 2. 获取超话列表
+    # 按计分板选择当前最优 Provider (默认 settings.CHECKIN_PROVIDER, 故障时自动降级)
+    provider_name = provider_stats.choose_provider(account.id)
+    if provider_name != settings.CHECKIN_PROVIDER:
+        logger.info(f"Provider 自适应切换: {account_name}, {settings.CHECKIN_PROVIDER} -> {provider_name}")
     provider = get_provider(
         account.cookie_sub or "",
         account.cookie_subp or "",
         account.cookie_twm or "",
+        provider_name=provider_name,
+        account_id=account.id,
     )
 
-    try:
-        topics = await provider.get_topics()
-    except Exception as e:
-        logger.error(f"获取超话列表失败: {account_name}: {e}")
-        topics = []
+    topics = []
+    use_cache = provider.cacheable and topic_cache_service.cache_enabled()
+    if use_cache:
+        # 优先使用缓存的关注列表, 过期时后台刷新, 本次仍直接签到
+        with run_timing.phase("topics"):
+            topics, refreshed_at = await topic_cache_service.load_topics(db, account.id, provider.name)
+        if topics:
+            signed = topic_cache_service.apply_signed(account.id, topics)
+            logger.info(
+                f"使用缓存超话列表: {account_name}, topics={len(topics)}, 今日已签={signed}, 刷新于 {refreshed_at}"
+            )
+            if not topic_cache_service.is_fresh(refreshed_at):
+                _schedule_topic_refresh(account, provider.name)
 
-    # 回退策略：主 Provider 获取为空时，尝试 m.weibo.cn 网页接口
-    if not topics:
-        try:
-            fallback_provider = get_provider(
-                account.cookie_sub or "",
-                account.cookie_subp or "",
-                account.cookie_twm or "",
-                provider_name="mweibo",
+    # 回退 Provider：主 Provider 获取为空时尝试 m.weibo.cn 网页接口
+    # (若自适应选择的已是 mweibo, 则回退到配置的默认 Provider)
+    fallback_name = "mweibo" if provider.name != "mweibo" else settings.CHECKIN_PROVIDER
+    fallback_provider = get_provider(
+        account.cookie_sub or "",
+        account.cookie_subp or "",
+        account.cookie_twm or "",
+        provider_name=fallback_name,
+        account_id=account.id,
+    )
+
+    concurrency = max(account.checkin_concurrency or 1, 1)
+    rate = account.checkin_rate or (1 / account.request_interval if account.request_interval else 0)
+    limiter = TokenBucket(rate, capacity=concurrency)
+
+    async def on_result(idx: int, topic: Topic, result: CheckinResult):
+        logger.info(f"  [{idx + 1}] [{result.status}] {topic.title}: {result.detail}")
+        _add_progress(account.id, topic, result)
+        await checkpoint.add(topic, result)
+
+    # 续签时跳过本次运行中已完成的超话
+    done_keys = {_resume_key(t) for t, _ in done}
+
+    async def skip_done(source):
+        async for topic in source:
+            if _resume_key(topic) not in done_keys:
+                yield topic
+
+    # 流水线模式下翻到的全部超话 (含续签时跳过的), 用于写入缓存
+    enumerated: List[Topic] = []
+
+    async def collect(source):
+        async for topic in source:
+            enumerated.append(topic)
+            yield topic
+
+    async def sign(prov: BaseProvider, source) -> List[Tuple[Topic, CheckinResult]]:
+        _set_progress(account.id, phase="checkin")
+        if done_keys:
+            source = [t for t in source if _resume_key(t) not in done_keys] if isinstance(source, list) else skip_done(source)
+        # 流水线模式下翻页请求由 run_timing.page() 计入 topics 阶段
+        with run_timing.phase("checkin"):
+            return await prov.checkin_many(
+                source,
+                concurrency=concurrency,
+                limiter=limiter,
+                retry_count=account.retry_count,
+                on_result=on_result,
             )
-            fallback_topics = await fallback_provider.get_topics()
-            if fallback_topics:
-                logger.info(
-                    f"主Provider未获取到超话，mweibo回退成功: {account_name}, topics={len(fallback_topics)}"
-                )
-                provider = fallback_provider
-                topics = fallback_topics
-        except Exception as e:
-            logger.warning(f"mweibo 回退获取超话失败: {account_name}: {e}")
-
-    if not topics:
+
+    raced = False
+    if not topics and settings.TOPIC_RACE_MODE in ("hedge", "parallel"):
+        raced = True
+        # 竞速模式: 主 Provider 超过对冲延迟未返回 (或 parallel 模式直接) 启动回退 Provider, 取先返回非空者
+        hedge_delay = settings.TOPIC_HEDGE_DELAY if settings.TOPIC_RACE_MODE == "hedge" else 0
+        with run_timing.phase("topics"):
+            provider, topics = await _race_topics(provider, fallback_provider, hedge_delay)
+        if topics:
+            logger.info(f"超话列表竞速完成: {account_name}, 胜出={provider.name}, topics={len(topics)}")
+            if provider.cacheable and topic_cache_service.cache_enabled():
+                await topic_cache_service.save_topics(db, account.id, provider.name, topics)
+
+    # 3. 签到 (并发 + 令牌桶限速)
+    logger.info(f"开始签到: {account_name} (并发={concurrency}, 速率={rate:.2f}次/秒)")
+    if topics:
+        logger.info(f"获取到 {len(topics)} 个超话: {account_name}")
+        _set_progress(account.id, total=len(topics))
+        pairs = await sign(provider, topics)
+    elif raced:
+        pairs = []
+    else:
+        # 流水线: 边翻页边签到, 第 1 页的超话在拉取第 2 页时即开始签到
+        pairs = await sign(provider, collect(provider.iter_topics()))
+        # 续签时 pairs 只含剩余超话, 缓存须写入完整列表, 否则中断前已签的超话会从缓存中被删除;
+        # 翻页中途失败 (listing_complete 为 False) 时列表被截断, 不写入缓存
+        if enumerated and use_cache:
+            if provider.listing_complete:
+                await topic_cache_service.save_topics(db, account.id, provider.name, enumerated)
+            else:
+                logger.warning(f"超话列表未完整获取, 本次不更新缓存: {account_name}, 已获取 {len(enumerated)} 个")
+
+    if not pairs and not raced and not done:
+        pairs = await sign(fallback_provider, fallback_provider.iter_topics())
+        if pairs:
+            logger.info(f"主Provider未获取到超话，{fallback_name}回退成功: {account_name}, topics={len(pairs)}")
+            provider = fallback_provider
+
+    run.provider = provider.name
+    if not pairs and not done:
         logger.info(f"无可签到超话: {account_name}")
+        # 列表为空可能是 Cookie 刚失效, 下次签到重新校验
+        invalidate_cookie(account.cookie_sub or "", account.cookie_subp or "", account.cookie_twm or "")
         stats = {
+            "run_id": run.id,
             "total": 0, "success": 0, "already": 0, "failed": 0,
             "cookie_valid": True, "checkin_details": [],
+            "provider": provider.name,
         }
 
         log = TaskLog(
@@ -102,50 +496,63 @@ async def run_checkin(db: AsyncSession, account: Account) -> dict:
             event_type="checkin",
             status="success",
             message="无可签到超话 (未获取到关注的超话列表，请检查Cookie或API参数)",
-            detail=stats,
+            detail=_summary(stats),
         )
         db.add(log)
+        _finish_run(run, stats)
         account.last_checkin_at = datetime.now(timezone.utc).replace(tzinfo=None)
         account.last_checkin_status = "success"
         await db.commit()
 
         # 即使没有超话也推送通知，方便排查
-        title, desp = build_checkin_message(account, stats)
-        await push_event(db, "checkin", title, desp, account, force=True)
+        await _push_and_save_timings(db, run, account, stats, force=True, sendkey=sendkey)
 
         return stats
 
-    # 3. 遍历签到
+    if done:
+        logger.info(f"续签完成: {account_name}, 此前已完成 {len(done)} 个, 本次签到 {len(pairs)} 个")
+    # 此前已完成的超话在前, 本次签到的在后
+    all_pairs = done + pairs
+
     stats = {
-        "total": len(topics), "success": 0, "already": 0, "failed": 0,
-        "failed_items": [], "checkin_details": [],
+        "run_id": run.id,
+        "total": len(all_pairs), "success": 0, "already": 0, "failed": 0,
+        "failed_items": [], "checkin_details": [], "failure_classes": {},
+        "provider": provider.name,
+        # 列表显示已签、未发签到请求的超话数
+        "skipped": sum(1 for t, _ in pairs if t.signed),
+        # 续签时此前已完成的超话数
+        "resumed": len(done),
     }
 
-    logger.info(f"获取到 {len(topics)} 个超话，开始逐一签到: {account_name}")
-    for idx, topic in enumerate(topics, 1):
-        result = None
-        for attempt in range(account.retry_count):
-            result = await provider.checkin(topic)
-            if result.status != "failed":
-                break
-            if attempt < account.retry_count - 1:
-                await asyncio.sleep(1)
-
-        if result:
-            stats[result.status] = stats.get(result.status, 0) + 1
-            if result.status == "failed":
-                stats["failed_items"].append(f"{topic.title}: {result.detail}")
-
-            # 记录每个超话的详细结果
-            stats["checkin_details"].append({
-                "name": topic.title,
-                "status": result.status,
-                "detail": result.detail,
-            })
-            logger.info(f"  [{idx}/{len(topics)}] [{result.status}] {topic.title}: {result.detail}")
-
-        # 请求间隔
-        await asyncio.sleep(account.request_interval)
+    # 按超话原始顺序汇总明细
+    unknown_topics = 0
+    for topic, result in all_pairs:
+        if is_unknown_topic(result):
+            unknown_topics += 1
+        stats[result.status] = stats.get(result.status, 0) + 1
+        if result.status == "failed":
+            stats["failed_items"].append(f"{topic.title}: {result.detail}")
+            failure_classes = stats["failure_classes"]
+            failure_classes[result.failure] = failure_classes.get(result.failure, 0) + 1
+
+        # 记录每个超话的详细结果
+        stats["checkin_details"].append(_detail_item(topic, result))
+
+    _set_progress(account.id, phase="finishing", total=stats["total"])
+    # 列表显示已签的超话未发请求, 不计入签到耗时
+    run_timing.record_checkins(r.latency_ms for t, r in pairs if not t.signed)
+    if stats["failure_classes"].get(retry.AUTH):
+        logger.warning(f"签到出现鉴权失败, Cookie 校验缓存失效: {account_name}")
+        invalidate_cookie(account.cookie_sub or "", account.cookie_subp or "", account.cookie_twm or "")
+
+    topic_cache_service.mark_signed(
+        account.id, (t.container_id for t, r in all_pairs if r.status in ("success", "already"))
+    )
+
+    # 出现已取关/不存在的超话, 说明缓存已过期, 后台刷新
+    if unknown_topics and provider.cacheable and topic_cache_service.cache_enabled():
+        _schedule_topic_refresh(account, provider.name)
 
     # 4. 汇总
     if stats["failed"] == 0:
@@ -167,17 +574,346 @@ async def run_checkin(db: AsyncSession, account: Account) -> dict:
         event_type="checkin",
         status=status,
         message=f"总计{stats['total']}, 成功{stats['success']}, 已签{stats['already']}, 失败{stats['failed']}",
-        detail=stats,
+        detail=_summary(stats),
     )
     db.add(log)
+    with run_timing.phase("finish"):
+        await checkpoint.flush()
+        _finish_run(run, stats)
 
-    account.last_checkin_at = datetime.now(timezone.utc).replace(tzinfo=None)
-    account.last_checkin_status = status
-    await db.commit()
+        account.last_checkin_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        account.last_checkin_status = status
+        await db.commit()
 
     # 5. 推送签到结果
-    title, desp = build_checkin_message(account, stats)
-    await push_event(db, "checkin", title, desp, account)
+    await _push_and_save_timings(db, run, account, stats, sendkey=sendkey)
 
     logger.info(f"签到完成: {account_name} - {log.message}\n{detail_text}")
     return stats
+
+
+# ─── 多账号执行引擎 ───
+
+# 跨进程单飞: pg advisory lock 的命名空间 (两段式 key 的第一段), 第二段为 account_id
+_ADVISORY_LOCK_NS = 0x5742
+
+
+async def _try_account_lock(conn, account_id: int) -> bool:
+    result = await conn.execute(
+        text("SELECT pg_try_advisory_lock(:ns, :account_id)"),
+        {"ns": _ADVISORY_LOCK_NS, "account_id": account_id},
+    )
+    return bool(result.scalar())
+
+
+async def _unlock_account(conn, account_id: int):
+    await conn.execute(
+        text("SELECT pg_advisory_unlock(:ns, :account_id)"),
+        {"ns": _ADVISORY_LOCK_NS, "account_id": account_id},
+    )
+
+
+async def _finished_run_summary(account_id: int, since: datetime) -> Optional[dict]:
+    """since 之后结束的最近一次运行的汇总 (其他进程执行的结果)"""
+    async with async_session() as db:
+        result = await db.execute(
+            select(CheckinRun)
+            .where(CheckinRun.account_id == account_id, CheckinRun.finished_at >= since)
+            .order_by(desc(CheckinRun.finished_at))
+            .limit(1)
+        )
+        run = result.scalar_one_or_none()
+        return {**(run.summary or {}), "attached": True} if run else None
+
+
+async def _run_account(account_id: int, source: str, sendkey: Optional[str] = None) -> Optional[dict]:
+    """在独立的数据库会话中执行一个账号的签到, 执行期间记录实时进度与耗时分解"""
+    _live_progress[account_id] = _new_progress()
+    try:
+        async with async_session() as db:
+            account = await db.get(Account, account_id)
+            if not account:
+                logger.warning(f"执行引擎: 账号 ID {account_id} 不存在, 跳过 ({source})")
+                return None
+            with run_timing.record():
+                return await run_checkin(db, account, source, sendkey=sendkey)
+    finally:
+        _live_progress.pop(account_id, None)
+
+
+async def _run_account_exclusive(account_id: int, source: str, sendkey: Optional[str] = None) -> Optional[dict]:
+    """
+    跨进程单飞执行
+
+    PostgreSQL 下以 pg_try_advisory_lock 保证同一账号在所有进程中只有一个运行;
+    锁被其他进程持有时轮询等待, 对方结束后直接返回其结果而不再重复签到。
+    其他数据库 (本地 SQLite 等) 只有进程内单飞。
+    """
+    if db_engine.dialect.name != "postgresql":
+        return await _run_account(account_id, source, sendkey)
+
+    wait_since = datetime.now(timezone.utc).replace(tzinfo=None)
+    waited = False
+    while True:
+        async with db_engine.connect() as conn:
+            acquired = await _try_account_lock(conn, account_id)
+            # 会话级 advisory lock 在提交后仍然持有; 立即结束事务, 避免连接在整个签到期间 idle in transaction
+            await conn.commit()
+            if acquired:
+                try:
+                    if waited:
+                        summary = await _finished_run_summary(account_id, wait_since)
+                        if summary is not None:
+                            logger.info(f"执行引擎: 账号 {account_id} 已由其他进程完成签到, 复用结果 ({source})")
+                            return summary
+                    return await _run_account(account_id, source, sendkey)
+                finally:
+                    try:
+                        await _unlock_account(conn, account_id)
+                        await conn.commit()
+                    except BaseException:
+                        # 解锁失败时断开连接, 锁随会话释放, 不能带着锁回到连接池
+                        await conn.invalidate()
+                        raise
+
+        if not waited:
+            logger.info(f"执行引擎: 账号 {account_id} 正在其他进程签到, 等待其结果 ({source})")
+            waited = True
+        await asyncio.sleep(settings.CHECKIN_SINGLE_FLIGHT_POLL)
+
+
+class RunEngine:
+    """
+    全局签到执行引擎
+
+    - 全局最多 concurrency 个账号同时签到 (CHECKIN_GLOBAL_CONCURRENCY)
+    - 单飞 (single-flight): 同一账号已在排队或执行时, 新的触发直接复用该次运行的结果, 不会重复签到;
+      PostgreSQL 下另以 advisory lock 保证跨进程互斥
+    - 公平调度: 待执行的账号按触发来源分队列。单账号的交互触发 (PRIORITY_SOURCES: 手动/外部接口)
+      优先执行, 不会排在整批定时签到之后; 批量来源 (schedule / manual-all / resume) 之间按来源轮转,
+      同一来源内按提交顺序
+    - 每次签到使用独立的数据库会话, 互不影响
+    """
+
+    # 优先执行的触发来源
+    PRIORITY_SOURCES = ("manual", "external")
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(concurrency, 1)
+        # {account_id: (future, source, sendkey)}, 仅包含排队中或执行中的账号
+        self._inflight: dict[int, tuple[asyncio.Future, str, Optional[str]]] = {}
+        # {source: 待执行的 account_id}, 批量来源的轮转顺序即字典顺序
+        self._queues: OrderedDict[str, deque] = OrderedDict()
+        # 待执行的账号数, worker 按此等待
+        self._ready: Optional[asyncio.Semaphore] = None
+        self._workers: list[asyncio.Task] = []
+        self._running: dict[int, str] = {}
+        self.completed = 0
+        self.attached = 0
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        self._ready = asyncio.Semaphore(0)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        logger.info(f"签到执行引擎已启动: 全局并发={self.concurrency}")
+
+    def submit(self, account_id: int, source: str = "manual", sendkey: Optional[str] = None) -> asyncio.Future:
+        """
+        提交一个账号的签到, 返回完成时得到 stats 的 Future
+
+        该账号已在排队或执行时返回同一个 Future (此时本次的 sendkey 不生效);
+        仍在排队的批量签到被手动/外部触发复用时提到优先队列。
+        """
+        self._ensure_started()
+        inflight = self._inflight.get(account_id)
+        if inflight is not None:
+            self.attached += 1
+            logger.info(f"执行引擎: 账号 {account_id} 已在签到 ({inflight[1]}), {source} 复用其结果")
+            if (
+                source in self.PRIORITY_SOURCES and inflight[1] not in self.PRIORITY_SOURCES
+                and account_id not in self._running
+            ):
+                self._queues[inflight[1]].remove(account_id)
+                self._queues.setdefault(source, deque()).append(account_id)
+                self._inflight[account_id] = (inflight[0], source, inflight[2])
+            return inflight[0]
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[account_id] = (future, source, sendkey)
+        self._queues.setdefault(source, deque()).append(account_id)
+        self._ready.release()
+        return future
+
+    def _next(self) -> int:
+        """按调度策略取出下一个待执行的账号 (调用前已确认有待执行的账号)"""
+        for source in self.PRIORITY_SOURCES:
+            queue = self._queues.get(source)
+            if queue:
+                return queue.popleft()
+        for source, queue in self._queues.items():
+            if queue and source not in self.PRIORITY_SOURCES:
+                # 本来源执行一个后排到最后, 各批量来源轮流执行
+                self._queues.move_to_end(source)
+                return queue.popleft()
+        raise RuntimeError("执行引擎队列为空")
+
+    async def run(self, account_id: int, source: str = "manual", sendkey: Optional[str] = None) -> Optional[dict]:
+        """提交并等待完成; 多个等待者共享同一 Future, 用 shield 避免一方取消影响其他人"""
+        return await asyncio.shield(self.submit(account_id, source, sendkey))
+
+    def submit_background(self, account_id: int, source: str):
+        """提交但不等待结果 (异常已由 worker 记录日志)"""
+        future = self.submit(account_id, source)
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def is_active(self, account_id: int) -> bool:
+        return account_id in self._inflight
+
+    def free_slots(self) -> int:
+        """还能立即开始执行的账号数 (持久化队列按此认领, 不在本地积压)"""
+        return max(self.concurrency - len(self._inflight), 0)
+
+    def is_running(self, account_id: int) -> bool:
+        return account_id in self._running
+
+    async def _worker(self):
+        while True:
+            await self._ready.acquire()
+            account_id = self._next()
+            future, source, sendkey = self._inflight[account_id]
+            self._running[account_id] = source
+            try:
+                result = await _run_account_exclusive(account_id, source, sendkey)
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"执行引擎: 账号 {account_id} 签到异常 ({source}): {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._running.pop(account_id, None)
+                self._inflight.pop(account_id, None)
+                self.completed += 1
+
+    def status(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "running": [{"account_id": a, "source": s} for a, s in self._running.items()],
+            "queued": len(self._inflight) - len(self._running),
+            "queued_by_source": {s: len(q) for s, q in self._queues.items() if q},
+            "completed": self.completed,
+            "attached": self.attached,
+        }
+
+    async def shutdown(self):
+        """取消所有执行中/排队中的签到 (应用退出时调用)"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for future, _, _ in self._inflight.values():
+            future.cancel()
+        self._inflight.clear()
+        self._queues.clear()
+        self._running.clear()
+
+
+run_engine = RunEngine(settings.CHECKIN_GLOBAL_CONCURRENCY)
+
+
+async def _mark_orphaned_runs() -> int:
+    """
+    把已无进程在执行的 running 运行标记为 interrupted, 返回标记的条数
+
+    执行中的签到持有账号 advisory lock (见 _run_account_exclusive): 取锁失败说明其他副本
+    (或本进程) 仍在执行, 不做改动; 取锁成功说明执行进程已退出, 持锁期间标记后立即释放,
+    避免与刚开始续签的进程相互覆盖。本进程执行引擎中排队的账号同样跳过。
+    非 PostgreSQL 只支持单进程, 执行引擎之外的 running 运行都已中断。
+    """
+    async with async_session() as db:
+        rows = (await db.execute(
+            select(CheckinRun.id, CheckinRun.account_id).where(CheckinRun.status == RUN_RUNNING)
+        )).all()
+    rows = [(run_id, account_id) for run_id, account_id in rows if not run_engine.is_active(account_id)]
+    if not rows:
+        return 0
+
+    def mark(run_id: str):
+        return (
+            update(CheckinRun)
+            .where(CheckinRun.id == run_id, CheckinRun.status == RUN_RUNNING)
+            .values(status=RUN_INTERRUPTED)
+        )
+
+    marked = 0
+    async with db_engine.connect() as conn:
+        if db_engine.dialect.name != "postgresql":
+            for run_id, _ in rows:
+                await conn.execute(mark(run_id))
+            await conn.commit()
+            return len(rows)
+
+        try:
+            for run_id, account_id in rows:
+                acquired = await _try_account_lock(conn, account_id)
+                await conn.commit()
+                if not acquired:
+                    continue
+                try:
+                    await conn.execute(mark(run_id))
+                    await conn.commit()
+                    marked += 1
+                finally:
+                    await _unlock_account(conn, account_id)
+                    await conn.commit()
+        except BaseException:
+            # 锁可能仍被持有, 不能回到连接池
+            await conn.invalidate()
+            raise
+    if marked < len(rows):
+        logger.info(f"续签中断的运行: {len(rows) - marked} 个运行仍在其他进程执行, 不做改动")
+    return marked
+
+
+async def recover_interrupted_runs() -> int:
+    """
+    启动或当选调度 leader 时恢复中断的签到
+
+    已无进程在执行的 running 运行标记为 interrupted (见 _mark_orphaned_runs, 其他副本仍在执行的不受影响);
+    当天中断的账号重新提交到执行引擎, run_checkin 会续用原 run_id, 只签剩余超话。返回提交的账号数。
+
+    使用持久化队列时不改动 running 的运行 (崩溃进程的队列项租约过期后会被重新认领);
+    当天中断的运行按 run_id 去重入队, 多个进程同时启动也只续签一次。
+    """
+    today = local_date_str()
+    queued = run_queue.enabled()
+    if not queued:
+        await _mark_orphaned_runs()
+    async with async_session() as db:
+        result = await db.execute(
+            select(CheckinRun.account_id, CheckinRun.id)
+            .where(CheckinRun.status == RUN_INTERRUPTED, CheckinRun.run_date == today)
+        )
+        rows = result.all()
+        await db.commit()
+
+    if queued:
+        now = run_queue.utcnow()
+        added = await run_queue.enqueue_many(
+            [(account_id, now, f"resume:{run_id}") for account_id, run_id in rows], source="resume"
+        )
+        if added:
+            logger.info(f"续签中断的运行: {added} 个账号已加入签到队列")
+        return added
+
+    account_ids = list(dict.fromkeys(account_id for account_id, _ in rows))
+    for account_id in account_ids:
+        run_engine.submit_background(account_id, source="resume")
+    if account_ids:
+        logger.info(f"续签中断的运行: {len(account_ids)} 个账号已重新排队")
+    return len(account_ids)
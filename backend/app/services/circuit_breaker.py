@@ -0,0 +1,200 @@
+"""上游熔断器 — 按 host 统计错误率/慢请求, 故障期间快速失败
+
+作为共享连接池的 transport 包装层, 所有 Provider、Cookie 校验与 Server酱推送都会经过:
+- closed:    正常放行, 记录最近 CIRCUIT_WINDOW_SECONDS 秒内的请求结果
+- open:      错误率或慢请求比例超过阈值后打开, CIRCUIT_OPEN_SECONDS 内直接抛 CircuitOpenError
+- half_open: 冷却结束后放行少量探测请求, 探测成功则关闭, 失败则重新打开
+
+计入失败的情况: 超时/连接失败等传输异常、HTTP 5xx 与 429; 其他 4xx 说明上游仍在正常响应。
+"""
+
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.TransportError):
+    """上游 host 处于熔断状态, 请求未发出"""
+
+    def __init__(self, host: str, retry_after: float, request: Optional[httpx.Request] = None):
+        super().__init__(f"上游 {host} 熔断中, {retry_after:.0f}s 后重试", request=request)
+        self.host = host
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Call:
+    ts: float
+    ok: bool
+    slow: bool
+
+
+@dataclass
+class HostBreaker:
+    """单个上游 host 的熔断状态"""
+    host: str
+    state: str = CLOSED
+    calls: deque = field(default_factory=deque)
+    open_until: float = 0.0
+    probes_in_flight: int = 0
+    trips: int = 0
+    last_reason: str = ""
+    changed_at: float = field(default_factory=time.time)
+
+    def _prune(self, now: float):
+        horizon = now - settings.CIRCUIT_WINDOW_SECONDS
+        while self.calls and self.calls[0].ts < horizon:
+            self.calls.popleft()
+
+    def _transition(self, state: str, reason: str = ""):
+        if state == self.state:
+            return
+        logger.warning(f"熔断器 {self.host}: {self.state} -> {state}{f' ({reason})' if reason else ''}")
+        self.state = state
+        self.changed_at = time.time()
+        if reason:
+            self.last_reason = reason
+
+    def _trip(self, reason: str):
+        self.open_until = time.monotonic() + settings.CIRCUIT_OPEN_SECONDS
+        self.trips += 1
+        self.probes_in_flight = 0
+        self._transition(OPEN, reason)
+
+    def before_request(self) -> bool:
+        """请求发出前调用; 熔断中抛 CircuitOpenError, 返回值表示本次是否为半开探测"""
+        if self.state == OPEN:
+            remaining = self.open_until - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.host, remaining)
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= settings.CIRCUIT_HALF_OPEN_PROBES:
+                raise CircuitOpenError(self.host, 1.0)
+            self.probes_in_flight += 1
+            return True
+        return False
+
+    def after_request(self, ok: bool, latency: float, probe: bool):
+        now = time.monotonic()
+        slow = latency >= settings.CIRCUIT_SLOW_SECONDS
+
+        if probe:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            if self.state != HALF_OPEN:
+                return
+            if ok and not slow:
+                self.calls.clear()
+                self._transition(CLOSED, "探测成功")
+            else:
+                self._trip("探测失败" if not ok else f"探测耗时 {latency:.1f}s")
+            return
+
+        if self.state != CLOSED:
+            return
+        self.calls.append(_Call(ts=now, ok=ok, slow=slow))
+        self._prune(now)
+
+        total = len(self.calls)
+        if total < settings.CIRCUIT_MIN_REQUESTS:
+            return
+        error_rate = sum(1 for c in self.calls if not c.ok) / total
+        slow_rate = sum(1 for c in self.calls if c.slow) / total
+        if error_rate >= settings.CIRCUIT_ERROR_RATE:
+            self._trip(f"错误率 {error_rate:.0%} ({total} 次请求)")
+        elif slow_rate >= settings.CIRCUIT_SLOW_RATE:
+            self._trip(f"慢请求比例 {slow_rate:.0%} (≥{settings.CIRCUIT_SLOW_SECONDS}s)")
+
+    def reset(self):
+        self.calls.clear()
+        self.open_until = 0.0
+        self.probes_in_flight = 0
+        self._transition(CLOSED, "手动重置")
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        self._prune(now)
+        total = len(self.calls)
+        return {
+            "host": self.host,
+            "state": self.state,
+            "requests": total,
+            "error_rate": round(sum(1 for c in self.calls if not c.ok) / total, 3) if total else None,
+            "slow_rate": round(sum(1 for c in self.calls if c.slow) / total, 3) if total else None,
+            "retry_after_s": max(0, round(self.open_until - now)) if self.state == OPEN else 0,
+            "trips": self.trips,
+            "last_reason": self.last_reason,
+            "changed_at": self.changed_at,
+        }
+
+
+_breakers: dict[str, HostBreaker] = {}
+
+
+def get_breaker(host: str) -> HostBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = HostBreaker(host)
+    return breaker
+
+
+def _is_failure(response: httpx.Response) -> bool:
+    return response.status_code >= 500 or response.status_code == 429
+
+
+class CircuitBreakerTransport(httpx.AsyncBaseTransport):
+    """熔断 transport: 包在共享连接池最外层, 按请求 host 放行或快速失败"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        breaker = get_breaker(request.url.host)
+        try:
+            probe = breaker.before_request()
+        except CircuitOpenError as e:
+            e.request = request
+            raise
+
+        start = time.monotonic()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except httpx.TransportError:
+            breaker.after_request(False, time.monotonic() - start, probe)
+            raise
+        except BaseException:
+            # 取消等非上游原因, 不计入统计, 只释放探测名额
+            if probe:
+                breaker.probes_in_flight = max(0, breaker.probes_in_flight - 1)
+            raise
+        breaker.after_request(not _is_failure(response), time.monotonic() - start, probe)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+def get_states() -> list[dict]:
+    """所有已访问过的上游 host 的熔断状态"""
+    return [_breakers[host].snapshot() for host in sorted(_breakers)]
+
+
+def reset(host: Optional[str] = None) -> int:
+    """手动关闭熔断器 (指定 host 或全部), 返回重置数量"""
+    targets = [_breakers[host]] if host in _breakers else ([] if host else list(_breakers.values()))
+    for breaker in targets:
+        breaker.reset()
+    return len(targets)
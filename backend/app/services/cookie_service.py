@@ -1,9 +1,12 @@
 """Cookie 有效性校验服务"""
 
+import hashlib
 import logging
+import time
 from typing import Tuple, Optional
 
-import httpx
+from app.config import settings
+from app.services.weibo_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -15,18 +18,59 @@ MOBILE_UA = (
 )
 
 
-async def validate_cookie(sub: str, subp: str, twm: str = "") -> Tuple[bool, Optional[dict]]:
+# 校验结果缓存: {sha256(SUB|SUBP|_T_WM): (is_valid, user_info, checked_at)}
+# 只缓存上游明确给出的结论 (已登录/未登录), 网络异常不缓存
+_validation_cache: dict[str, tuple[bool, Optional[dict], float]] = {}
+
+
+class CookieCheckUnavailable(Exception):
+    """上游不可达 (网络异常/熔断/非 200), 无法确定 Cookie 是否有效"""
+
+
+def _cache_key(sub: str, subp: str, twm: str = "") -> str:
+    return hashlib.sha256(f"{sub}|{subp}|{twm}".encode("utf-8")).hexdigest()
+
+
+def _get_cached(key: str) -> Optional[tuple[bool, Optional[dict]]]:
+    entry = _validation_cache.get(key)
+    if not entry:
+        return None
+    is_valid, user_info, checked_at = entry
+    if time.monotonic() - checked_at > settings.COOKIE_VALIDATION_TTL_MINUTES * 60:
+        _validation_cache.pop(key, None)
+        return None
+    return is_valid, user_info
+
+
+def invalidate_cookie(sub: str, subp: str, twm: str = ""):
+    """清除 Cookie 校验缓存 (签到遇到鉴权失败时调用, 下次签到重新校验)"""
+    if _validation_cache.pop(_cache_key(sub, subp, twm), None):
+        logger.info("Cookie 校验缓存已失效")
+
+
+async def validate_cookie(
+    sub: str, subp: str, twm: str = "", use_cache: bool = True
+) -> Tuple[Optional[bool], Optional[dict]]:
     """
     校验微博 Cookie 是否有效
 
+    同一 Cookie 在 COOKIE_VALIDATION_TTL_MINUTES 内直接返回缓存结果;
+    use_cache=False 时强制请求上游并刷新缓存。
+
     返回:
         (is_valid, user_info)
-        - is_valid: Cookie 是否有效
-        - user_info: 有效时返回用户信息 dict, 无效时返回 None
+        - is_valid: Cookie 是否有效; 上游不可达 (网络异常、熔断、非 200) 时为 None, 表示无法确定
+        - user_info: 有效时返回用户信息 dict, 否则返回 None
     """
     if not sub or not subp:
         return False, None
 
+    key = _cache_key(sub, subp, twm)
+    if use_cache and settings.COOKIE_VALIDATION_TTL_MINUTES > 0:
+        cached = _get_cached(key)
+        if cached is not None:
+            return cached
+
     cookie_str = f"SUB={sub}; SUBP={subp}"
     if twm:
         cookie_str += f"; _T_WM={twm}"
@@ -37,10 +81,10 @@ async def validate_cookie(sub: str, subp: str, twm: str = "") -> Tuple[bool, Opt
     }
 
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(WEIBO_CONFIG_URL, headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
+        client = get_http_client()
+        resp = await client.get(WEIBO_CONFIG_URL, headers=headers, timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
 
         config_data = data.get("data", {})
         is_login = config_data.get("login", False)
@@ -50,10 +94,13 @@ async def validate_cookie(sub: str, subp: str, twm: str = "") -> Tuple[bool, Opt
                 "uid": config_data.get("uid", ""),
                 "nick": config_data.get("user", {}).get("screen_name", ""),
             }
+            _validation_cache[key] = (True, user_info, time.monotonic())
             return True, user_info
         else:
+            _validation_cache[key] = (False, None, time.monotonic())
             return False, None
 
     except Exception as e:
-        logger.error(f"Cookie 校验失败: {e}")
-        return False, None
+        # 不是 Cookie 失效的结论, 不缓存; 调用方不应据此标记账号 Cookie 失效
+        logger.error(f"Cookie 校验请求失败, 无法确定是否有效: {e}")
+        return None, None
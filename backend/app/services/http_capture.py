@@ -0,0 +1,228 @@
+"""上游 HTTP 流量录制/回放
+
+用于离线复现线上慢请求与解析问题:
+- record: 包装真实 transport, 把每个请求/响应对 (含耗时) 追加写入 gzip JSONL 语料
+- replay: 不联网, 按请求匹配语料中的响应并按原始 (或缩放后的) 耗时返回
+
+所有 weibo_client Provider、cookie_service.validate_cookie 与 push_service.send_push
+都经过共享连接池, 由 HTTP_CAPTURE_MODE 统一开启。
+
+录制时的脱敏范围:
+- 不保存请求头 (含 Cookie) 与请求体 (只保存摘要用于匹配); 响应头只保留 content-type (不含 Set-Cookie)
+- URL: gsid/uid 等凭据参数 (REDACTED_PARAMS) 与 Server酱 SendKey
+- 响应正文 (UTF-8 文本): REDACTED_BODY_FIELDS 中的 JSON 字段 (uid、st、screen_name 等) 与
+  $CONFIG['uid'] 形式的页面变量, 以及正文内链接中的凭据参数
+未脱敏: 超话名称/container_id、签到结果文案等解析所需内容, 以及非 UTF-8 的二进制正文 (按 base64 原样保存)。
+语料仍应按内部数据对待, 不要公开分享。
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict, deque
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 需要脱敏的 query 参数 (微博客户端凭据与账号标识)
+REDACTED_PARAMS = {"gsid", "aid", "s", "sub", "subp", "uid", "st"}
+# 需要脱敏的响应正文字段 (账号标识、昵称头像、XSRF token 与凭据)
+REDACTED_BODY_FIELDS = {
+    "uid", "st", "screen_name", "nick", "gsid", "sub", "subp", "cookie", "token", "access_token",
+    "profile_image_url", "avatar_large", "avatar_hd",
+}
+REDACTED = "***"
+
+_BODY_FIELDS = "|".join(sorted(REDACTED_BODY_FIELDS))
+# JSON / JS 对象字段: "uid": 123 / "st": "abc" / 'uid': '123'
+_BODY_FIELD_RE = re.compile(
+    rf"""(["'])({_BODY_FIELDS})\1(\s*:\s*)(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|-?\d+)"""
+)
+# 页面内的配置变量: $CONFIG['uid'] = '123';
+_CONFIG_VAR_RE = re.compile(rf"""(\[["']({_BODY_FIELDS})["']\]\s*=\s*)(["'])[^"']*\3""")
+# 正文内链接 (scheme、跳转地址) 中的凭据参数
+_BODY_PARAM_RE = re.compile(rf"""([?&](?:{'|'.join(sorted(REDACTED_PARAMS))})=)[^&"'\s\\]+""")
+
+# Server酱 URL 路径中的 SendKey
+_SENDKEY_PATH_RE = re.compile(r"^/[^/]+\.send$")
+
+# 录制时保留的响应头
+_KEPT_RESPONSE_HEADERS = ("content-type",)
+
+
+def redact_url(url: httpx.URL) -> str:
+    """脱敏并规范化 URL (query 参数排序), 同时作为回放匹配的 key"""
+    path = url.path
+    if _SENDKEY_PATH_RE.match(path):
+        path = f"/{REDACTED}.send"
+
+    params = sorted(
+        (k, REDACTED if k.lower() in REDACTED_PARAMS else v)
+        for k, v in parse_qsl(url.query.decode(), keep_blank_values=True)
+    )
+    query = f"?{urlencode(params)}" if params else ""
+    return f"{url.scheme}://{url.host}{path}{query}"
+
+
+def redact_body(text: str) -> str:
+    """脱敏响应正文中的账号标识与凭据 (字段值替换为 "***", JSON 结构保持有效)"""
+    text = _BODY_FIELD_RE.sub(lambda m: f'{m.group(1)}{m.group(2)}{m.group(1)}{m.group(3)}"{REDACTED}"', text)
+    text = _CONFIG_VAR_RE.sub(lambda m: f"{m.group(1)}{m.group(3)}{REDACTED}{m.group(3)}", text)
+    return _BODY_PARAM_RE.sub(lambda m: f"{m.group(1)}{REDACTED}", text)
+
+
+def _body_digest(content: bytes) -> str:
+    return hashlib.sha1(content).hexdigest()[:12] if content else ""
+
+
+def _request_key(method: str, url: str, body_digest: str) -> str:
+    return f"{method} {url} {body_digest}"
+
+
+def _encode_body(content: bytes) -> dict:
+    try:
+        return {"text": redact_body(content.decode("utf-8"))}
+    except UnicodeDecodeError:
+        return {"b64": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_body(record: dict) -> bytes:
+    if "b64" in record:
+        return base64.b64decode(record["b64"])
+    return record.get("text", "").encode("utf-8")
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """录制 transport: 透传请求并把请求/响应对追加写入语料文件"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, path: str):
+        self.inner = inner
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        logger.info(f"HTTP 录制已开启: {path}")
+
+    def _write(self, request: httpx.Request, latency_ms: float, **fields):
+        record = {
+            "ts": round(time.time(), 3),
+            "method": request.method,
+            "url": redact_url(request.url),
+            "req_digest": _body_digest(request.content),
+            "latency_ms": latency_ms,
+            **fields,
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.monotonic()
+        try:
+            response = await self.inner.handle_async_request(request)
+            content = await response.aread()
+        except httpx.TransportError as e:
+            # 超时/连接失败也录制下来, 回放时按原耗时抛出同类异常
+            self._write(request, round((time.monotonic() - start) * 1000, 1), error=type(e).__name__)
+            raise
+        latency_ms = round((time.monotonic() - start) * 1000, 1)
+        await response.aclose()
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() in _KEPT_RESPONSE_HEADERS}
+        self._write(
+            request,
+            latency_ms,
+            status=response.status_code,
+            headers=headers,
+            **_encode_body(content),
+        )
+
+        # 已解压的正文重新构造响应, 去掉 content-encoding 避免二次解压
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=[(k, v) for k, v in response.headers.items()
+                     if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")],
+            content=content,
+            request=request,
+            extensions={"http_version": response.extensions.get("http_version", b"HTTP/1.1")},
+        )
+
+    async def aclose(self):
+        self._file.close()
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    回放 transport: 按 (method, 脱敏 URL, 请求体摘要) 匹配录制的响应
+
+    - 同一请求多次录制时按录制顺序依次返回, 用尽后循环
+    - 精确匹配不到时退回到 (method, host+path) 匹配
+    - latency_scale: 原始耗时的缩放系数, 0 表示不等待
+    """
+
+    def __init__(self, path: str, latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+        self._exact: dict[str, deque] = defaultdict(deque)
+        self._by_path: dict[str, deque] = defaultdict(deque)
+        self.hits = 0
+        self.misses = 0
+
+        count = 0
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._exact[_request_key(record["method"], record["url"], record.get("req_digest", ""))].append(record)
+                self._by_path[self._path_key(record["method"], record["url"])].append(record)
+                count += 1
+        logger.info(f"HTTP 回放已开启: {path}, 记录数={count}, 延迟缩放={latency_scale}")
+
+    @staticmethod
+    def _path_key(method: str, url: str) -> str:
+        return f"{method} {url.split('?', 1)[0]}"
+
+    @staticmethod
+    def _next(records: deque) -> dict:
+        record = records[0]
+        records.rotate(-1)
+        return record
+
+    def match(self, request: httpx.Request) -> Optional[dict]:
+        url = redact_url(request.url)
+        records = self._exact.get(_request_key(request.method, url, _body_digest(request.content)))
+        if not records:
+            records = self._by_path.get(self._path_key(request.method, url))
+        return self._next(records) if records else None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        record = self.match(request)
+        if record is None:
+            self.misses += 1
+            raise httpx.ConnectError(f"回放语料中无匹配请求: {request.method} {redact_url(request.url)}", request=request)
+
+        self.hits += 1
+        if self.latency_scale > 0:
+            await asyncio.sleep(record.get("latency_ms", 0) / 1000 * self.latency_scale)
+
+        if record.get("error"):
+            error_cls = getattr(httpx, record["error"], httpx.TransportError)
+            if not (isinstance(error_cls, type) and issubclass(error_cls, httpx.TransportError)):
+                error_cls = httpx.TransportError
+            raise error_cls(f"回放录制的异常: {record['error']}", request=request)
+
+        return httpx.Response(
+            status_code=record["status"],
+            headers=record.get("headers", {}),
+            content=_decode_body(record),
+            request=request,
+        )
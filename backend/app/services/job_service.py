@@ -0,0 +1,367 @@
+"""后台签到任务 — 手动签到/全部签到立即返回 job_id, 前端轮询进度
+
+任务只是对执行引擎 Future 的登记与汇总, 实际签到仍由 checkin_service.run_engine 执行
+(同一账号已在签到时直接复用该次运行)。
+
+- 创建任务的进程在内存中跟踪实时进度 (含尚未写入检查点的逐超话明细)
+- 任务同时登记到 checkin_jobs 表, 结束时写回各账号最终结果。多副本部署时查询落到其他副本,
+  或创建任务的进程已重启, 按 checkin_runs / checkin_results 还原各账号进度
+  (计数与逐超话明细为已写入检查点的部分, 见 CHECKIN_CHECKPOINT_BATCH)
+- 任务结束后保留 CHECKIN_JOB_RETENTION_MINUTES 分钟供查询
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, desc, func, or_, select, update
+
+from app.config import settings
+from app.database import async_session
+from app.models.checkin_job import CheckinJob
+from app.models.checkin_result import CheckinRecord
+from app.models.checkin_run import CheckinRun
+from app.services import checkin_service
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+
+# 账号在任务中的状态
+ACCOUNT_QUEUED = "queued"
+ACCOUNT_RUNNING = "running"
+ACCOUNT_COMPLETED = "completed"
+ACCOUNT_FAILED = "failed"
+
+_COUNT_KEYS = ("success", "already", "failed")
+# 账号结果中不随汇总返回的明细字段 (逐超话明细单独放在 topics)
+_DETAIL_KEYS = ("checkin_details", "failed_items")
+# 写入 checkin_jobs.accounts 的账号字段
+_STORED_KEYS = ("account_id", "account_name", "status", "error", "result")
+# 创建进程退出、未能写回结果的任务最长保留时间 (秒)
+_STALE_JOB_SECONDS = 86400
+
+_OWNER = f"{socket.gethostname()[:40]}:{os.getpid()}"
+
+# {job_id: job}, 本进程创建的任务, 按创建顺序
+_jobs: dict[str, dict] = {}
+# 写回任务结果的后台写入
+_pending_writes: set[asyncio.Task] = set()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _timestamp(dt: Optional[datetime]) -> Optional[float]:
+    """数据库中的 naive UTC 时间转为与内存任务一致的 Unix 时间戳"""
+    return dt.replace(tzinfo=timezone.utc).timestamp() if dt else None
+
+
+async def _prune():
+    horizon = time.time() - settings.CHECKIN_JOB_RETENTION_MINUTES * 60
+    for job_id in [j for j, job in _jobs.items() if job["finished_at"] and job["finished_at"] < horizon]:
+        del _jobs[job_id]
+
+    now = _utcnow()
+    async with async_session() as db:
+        await db.execute(
+            delete(CheckinJob).where(or_(
+                CheckinJob.finished_at < now - timedelta(minutes=settings.CHECKIN_JOB_RETENTION_MINUTES),
+                CheckinJob.created_at < now - timedelta(
+                    seconds=max(_STALE_JOB_SECONDS, settings.CHECKIN_JOB_RETENTION_MINUTES * 60)
+                ),
+            ))
+        )
+        await db.commit()
+
+
+async def _save_result(job: dict):
+    """任务结束时写回各账号最终结果, 之后任意副本都按此返回"""
+    try:
+        async with async_session() as db:
+            await db.execute(
+                update(CheckinJob)
+                .where(CheckinJob.id == job["id"])
+                .values(
+                    status=job["status"],
+                    finished_at=datetime.fromtimestamp(job["finished_at"], timezone.utc).replace(tzinfo=None),
+                    accounts=[{k: e[k] for k in _STORED_KEYS} for e in job["accounts"]],
+                )
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"后台签到任务 {job['id']} 结果写回失败: {e}")
+
+
+def _on_account_done(job: dict, entry: dict, future):
+    if future.cancelled():
+        entry.update(status=ACCOUNT_FAILED, error="已取消")
+    elif future.exception() is not None:
+        entry.update(status=ACCOUNT_FAILED, error=str(future.exception()))
+    elif future.result() is None:
+        entry.update(status=ACCOUNT_FAILED, error="账号不存在")
+    else:
+        stats = future.result()
+        entry.update(
+            status=ACCOUNT_COMPLETED,
+            result={k: v for k, v in stats.items() if k not in _DETAIL_KEYS},
+            topics=stats.get("checkin_details", []),
+        )
+    entry["finished_at"] = time.time()
+
+    if all(e["status"] in (ACCOUNT_COMPLETED, ACCOUNT_FAILED) for e in job["accounts"]):
+        job["status"] = JOB_COMPLETED
+        job["finished_at"] = time.time()
+        logger.info(f"后台签到任务完成: {job['id']} ({job['kind']}, {len(job['accounts'])} 个账号)")
+        task = asyncio.create_task(_save_result(job))
+        _pending_writes.add(task)
+        task.add_done_callback(_pending_writes.discard)
+
+
+async def create_job(kind: str, accounts: list, source: str = "manual") -> dict:
+    """
+    为一组账号提交签到并登记为后台任务
+
+    accounts: [(account_id, account_name), ...]
+    """
+    await _prune()
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "source": source,
+        "status": JOB_RUNNING if accounts else JOB_COMPLETED,
+        "created_at": time.time(),
+        "finished_at": None if accounts else time.time(),
+        "accounts": [
+            {
+                "account_id": account_id,
+                "account_name": account_name,
+                "status": ACCOUNT_QUEUED,
+                "result": None,
+                "error": None,
+                "topics": None,
+                "finished_at": None,
+            }
+            for account_id, account_name in accounts
+        ],
+    }
+
+    # 先登记再提交, 其他副本立即可查询
+    async with async_session() as db:
+        db.add(CheckinJob(
+            id=job["id"], kind=kind, source=source, status=job["status"], owner=_OWNER,
+            accounts=[{k: e[k] for k in _STORED_KEYS} for e in job["accounts"]],
+            created_at=datetime.fromtimestamp(job["created_at"], timezone.utc).replace(tzinfo=None),
+            finished_at=datetime.fromtimestamp(job["finished_at"], timezone.utc).replace(tzinfo=None)
+            if job["finished_at"] else None,
+        ))
+        await db.commit()
+    _jobs[job["id"]] = job
+
+    for entry in job["accounts"]:
+        future = checkin_service.run_engine.submit(entry["account_id"], source=source)
+        future.add_done_callback(lambda f, e=entry: _on_account_done(job, e, f))
+
+    logger.info(f"后台签到任务已提交: {job['id']} ({kind}, {len(accounts)} 个账号)")
+    return job
+
+
+def _account_snapshot(entry: dict, with_topics: bool, since: int) -> dict:
+    snapshot = {k: entry[k] for k in ("account_id", "account_name", "status", "error")}
+    topics = entry["topics"]
+
+    if entry["status"] == ACCOUNT_COMPLETED:
+        result = entry["result"] or {}
+        snapshot.update(
+            phase="done", run_id=result.get("run_id"), total=result.get("total", 0),
+            done=result.get("total", 0), resumed=result.get("resumed", 0), result=result,
+            **{k: result.get(k, 0) for k in _COUNT_KEYS},
+        )
+    else:
+        progress = None
+        if entry["status"] != ACCOUNT_FAILED:
+            progress = checkin_service.get_live_progress(entry["account_id"])
+            if progress is not None or checkin_service.run_engine.is_running(entry["account_id"]):
+                entry["status"] = snapshot["status"] = ACCOUNT_RUNNING
+        progress = progress or {}
+        topics = progress.get("topics")
+        snapshot.update(
+            phase=progress.get("phase", entry["status"]), run_id=progress.get("run_id"),
+            total=progress.get("total"), done=progress.get("done", 0), resumed=progress.get("resumed", 0),
+            result=None, **{k: progress.get(k, 0) for k in _COUNT_KEYS},
+        )
+
+    if with_topics:
+        topics = topics or []
+        snapshot["topics"] = topics[since:]
+        snapshot["topics_next"] = len(topics)
+    return snapshot
+
+
+def _topics_for(entries: list, account_id: Optional[int]) -> Optional[int]:
+    """返回逐超话明细的账号: account_id 指定的账号, 未指定时单账号任务默认返回"""
+    if account_id is None and len(entries) == 1:
+        return entries[0]["account_id"]
+    return account_id
+
+
+def _job_snapshot(job: dict, accounts: list, live: bool) -> dict:
+    totals = {k: sum(a[k] for a in accounts) for k in _COUNT_KEYS}
+    finished = sum(1 for a in accounts if a["status"] in (ACCOUNT_COMPLETED, ACCOUNT_FAILED))
+    return {
+        **{k: job[k] for k in ("id", "kind", "source", "status", "created_at", "finished_at")},
+        # False: 由其他副本创建或创建进程已重启, 进度按数据库检查点还原
+        "live": live,
+        "accounts_total": len(accounts),
+        "accounts_finished": finished,
+        "topics_done": sum(a["done"] for a in accounts),
+        **totals,
+        "accounts": accounts,
+    }
+
+
+def _run_snapshot(entry: dict, run: Optional[CheckinRun], counts: dict) -> dict:
+    """按账号在任务创建后的签到运行还原进度 (未写回结果的任务)"""
+    snapshot = {k: entry[k] for k in ("account_id", "account_name", "error")}
+    if run is not None and run.status == checkin_service.RUN_COMPLETED:
+        result = run.summary or {}
+        snapshot.update(
+            status=ACCOUNT_COMPLETED, phase="done", run_id=run.id, total=result.get("total", 0),
+            done=result.get("total", 0), resumed=result.get("resumed", 0), result=result,
+            **{k: result.get(k, 0) for k in _COUNT_KEYS},
+        )
+        return snapshot
+
+    if run is None:
+        status, phase = ACCOUNT_QUEUED, ACCOUNT_QUEUED
+    elif run.status == checkin_service.RUN_RUNNING:
+        status, phase = ACCOUNT_RUNNING, "checkin"
+    else:
+        # 执行进程中断, 等待续签
+        status, phase = ACCOUNT_QUEUED, checkin_service.RUN_INTERRUPTED
+    snapshot.update(
+        status=status, phase=phase, run_id=run.id if run else None, total=None,
+        done=sum(counts.values()), resumed=0, result=None, **{k: counts.get(k, 0) for k in _COUNT_KEYS},
+    )
+    return snapshot
+
+
+async def _stored_topics(db, run_id: Optional[str], since: int) -> tuple[list, int]:
+    """已写入检查点的逐超话明细 (与实时进度的 topics 格式一致)"""
+    if run_id is None:
+        return [], since
+    rows = (await db.execute(
+        select(CheckinRecord).where(CheckinRecord.run_id == run_id).order_by(CheckinRecord.id).offset(since)
+    )).scalars().all()
+    topics = []
+    for row in rows:
+        item = {"name": row.topic_title, "status": row.status, "detail": row.detail}
+        if row.failure:
+            item["failure"] = row.failure
+        topics.append(item)
+    return topics, since + len(topics)
+
+
+async def _stored_snapshot(db, row: CheckinJob, topics_for: Optional[int], since: int) -> dict:
+    """其他副本创建 (或创建进程已重启) 的任务快照"""
+    job = {
+        "id": row.id, "kind": row.kind, "source": row.source, "status": row.status,
+        "created_at": _timestamp(row.created_at), "finished_at": _timestamp(row.finished_at),
+    }
+    entries = row.accounts or []
+
+    if row.status == JOB_COMPLETED:
+        accounts = [_account_snapshot({**e, "topics": None}, with_topics=False, since=since) for e in entries]
+    else:
+        ids = [e["account_id"] for e in entries]
+        runs = (await db.execute(
+            select(CheckinRun)
+            .where(
+                CheckinRun.account_id.in_(ids),
+                or_(
+                    CheckinRun.started_at >= row.created_at,
+                    CheckinRun.finished_at >= row.created_at,
+                    CheckinRun.status == checkin_service.RUN_RUNNING,
+                ),
+            )
+            .order_by(CheckinRun.started_at)
+        )).scalars().all() if ids else []
+        latest = {run.account_id: run for run in runs}
+
+        counts: dict[str, dict] = {}
+        unfinished = [run.id for run in latest.values() if run.status != checkin_service.RUN_COMPLETED]
+        if unfinished:
+            for run_id, status, n in (await db.execute(
+                select(CheckinRecord.run_id, CheckinRecord.status, func.count())
+                .where(CheckinRecord.run_id.in_(unfinished))
+                .group_by(CheckinRecord.run_id, CheckinRecord.status)
+            )).all():
+                counts.setdefault(run_id, {})[status] = n
+
+        accounts = []
+        for e in entries:
+            run = latest.get(e["account_id"])
+            accounts.append(_run_snapshot(e, run, counts.get(run.id, {}) if run else {}))
+        if accounts and all(a["status"] == ACCOUNT_COMPLETED for a in accounts):
+            job["status"] = JOB_COMPLETED
+            job["finished_at"] = max(_timestamp(latest[a["account_id"]].finished_at) or 0 for a in accounts)
+
+    for snapshot in accounts:
+        if snapshot["account_id"] == topics_for:
+            snapshot["topics"], snapshot["topics_next"] = await _stored_topics(db, snapshot["run_id"], since)
+    return _job_snapshot(job, accounts, live=False)
+
+
+async def get_job(job_id: str, account_id: Optional[int] = None, since: int = 0) -> Optional[dict]:
+    """
+    任务快照: 总体状态、各账号进度与汇总计数
+
+    逐超话明细只返回给 account_id 指定的账号 (单账号任务默认返回), 从第 since 条开始;
+    前端把返回的 topics_next 作为下一次的 since, 每次只取增量。
+    任务不存在或已过保留期时返回 None。
+    """
+    since = max(since, 0)
+    job = _jobs.get(job_id)
+    if job is not None:
+        topics_for = _topics_for(job["accounts"], account_id)
+        accounts = [
+            _account_snapshot(entry, with_topics=entry["account_id"] == topics_for, since=since)
+            for entry in job["accounts"]
+        ]
+        return _job_snapshot(job, accounts, live=True)
+
+    async with async_session() as db:
+        row = await db.get(CheckinJob, job_id)
+        if row is None:
+            return None
+        return await _stored_snapshot(db, row, _topics_for(row.accounts or [], account_id), since)
+
+
+async def list_jobs(limit: int = 20) -> list[dict]:
+    """最近的任务 (所有副本创建的, 不含各账号明细), 新的在前"""
+    await _prune()
+    async with async_session() as db:
+        rows = (await db.execute(
+            select(CheckinJob).order_by(desc(CheckinJob.created_at)).limit(limit)
+        )).scalars().all()
+        jobs = []
+        for row in rows:
+            if row.id in _jobs:
+                job = _jobs[row.id]
+                accounts = [_account_snapshot(e, with_topics=False, since=0) for e in job["accounts"]]
+                snapshot = _job_snapshot(job, accounts, live=True)
+            else:
+                snapshot = await _stored_snapshot(db, row, topics_for=None, since=0)
+            jobs.append({
+                k: snapshot[k]
+                for k in ("id", "kind", "source", "status", "created_at", "finished_at", "live",
+                          "accounts_total", "accounts_finished")
+            })
+    return jobs
@@ -0,0 +1,185 @@
+"""Provider 计分板 — 记录各签到策略的成功率/延迟, 自适应选择 Provider
+
+按 (provider, account_id) 与 provider 全局两个维度记录最近 N 次调用 (get_topics / checkin):
+- 连续失败或窗口成功率过低时降级 (demote) 一段时间
+- choose_provider() 为账号挑选当前最优且未降级的 Provider
+"""
+
+import logging
+import statistics
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_NAMES = ("cardlist", "topicsub", "mweibo")
+
+# account_id=0 表示 provider 全局维度
+GLOBAL = 0
+
+
+@dataclass
+class _Sample:
+    op: str  # get_topics / checkin
+    ok: bool
+    latency: float
+    reason: str = ""
+
+
+@dataclass
+class ProviderScore:
+    """单个 Provider (全局或某账号) 的滚动统计"""
+    samples: deque = field(default_factory=lambda: deque(maxlen=settings.PROVIDER_STATS_WINDOW))
+    consecutive_failures: int = 0
+    demoted_until: float = 0.0
+    demote_reason: str = ""
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        if not self.samples:
+            return None
+        return sum(1 for s in self.samples if s.ok) / len(self.samples)
+
+    @property
+    def median_latency(self) -> Optional[float]:
+        if not self.samples:
+            return None
+        return statistics.median(s.latency for s in self.samples)
+
+    @property
+    def demoted(self) -> bool:
+        return self.demoted_until > time.monotonic()
+
+    def record(self, sample: _Sample) -> bool:
+        """记录一次调用, 若因此触发降级则返回 True"""
+        if self.demoted_until and not self.demoted:
+            # 降级冷却结束, 清空历史重新评估
+            self.samples.clear()
+            self.demoted_until = 0.0
+            self.demote_reason = ""
+
+        self.samples.append(sample)
+        self.consecutive_failures = 0 if sample.ok else self.consecutive_failures + 1
+
+        if self.demoted:
+            return False
+
+        reason = ""
+        if self.consecutive_failures >= settings.PROVIDER_DEMOTE_FAILURES:
+            reason = f"连续失败 {self.consecutive_failures} 次"
+        elif (
+            len(self.samples) >= settings.PROVIDER_MIN_SAMPLES
+            and self.success_rate < settings.PROVIDER_MIN_SUCCESS_RATE
+        ):
+            reason = f"成功率 {self.success_rate:.0%} 低于阈值"
+
+        if reason:
+            self.demoted_until = time.monotonic() + settings.PROVIDER_DEMOTE_SECONDS
+            self.demote_reason = reason
+            return True
+        return False
+
+    def snapshot(self) -> dict:
+        failures = Counter(s.reason for s in self.samples if not s.ok)
+        rate = self.success_rate
+        latency = self.median_latency
+        return {
+            "samples": len(self.samples),
+            "success_rate": round(rate, 3) if rate is not None else None,
+            "median_latency_ms": round(latency * 1000) if latency is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "demoted": self.demoted,
+            "demoted_for_s": max(0, round(self.demoted_until - time.monotonic())) if self.demoted else 0,
+            "demote_reason": self.demote_reason if self.demoted else "",
+            "failure_reasons": dict(failures.most_common(5)),
+        }
+
+
+_scores: dict[tuple[str, int], ProviderScore] = {}
+
+# 超话列表竞速结果: {(winner, loser): 次数}, loser 为空表示副 Provider 未启动即胜出
+_race_results: Counter = Counter()
+
+
+def _get_score(provider: str, account_id: int) -> ProviderScore:
+    key = (provider, account_id)
+    score = _scores.get(key)
+    if score is None:
+        score = _scores[key] = ProviderScore()
+    return score
+
+
+def record(provider: str, account_id: int, op: str, ok: bool, latency: float, reason: str = ""):
+    """记录一次 Provider 调用结果 (同时计入账号维度与全局维度)"""
+    if not provider:
+        return
+    sample = _Sample(op=op, ok=ok, latency=latency, reason=reason[:60])
+    keys = {GLOBAL, account_id or GLOBAL}
+    for key in keys:
+        if _get_score(provider, key).record(sample):
+            scope = "全局" if key == GLOBAL else f"账号 {key}"
+            logger.warning(
+                f"Provider 降级: {provider} ({scope}) — {_get_score(provider, key).demote_reason}, "
+                f"{settings.PROVIDER_DEMOTE_SECONDS}s 内不再优先使用"
+            )
+
+
+def is_demoted(provider: str, account_id: int = GLOBAL) -> bool:
+    """Provider 在全局或该账号维度是否处于降级状态"""
+    for key in {GLOBAL, account_id or GLOBAL}:
+        score = _scores.get((provider, key))
+        if score and score.demoted:
+            return True
+    return False
+
+
+def _rank_key(provider: str, account_id: int, default: str) -> tuple:
+    # 账号样本足够时以账号维度为准, 否则参考全局
+    score = _scores.get((provider, account_id))
+    if not score or len(score.samples) < settings.PROVIDER_MIN_SAMPLES:
+        score = _scores.get((provider, GLOBAL))
+
+    rate = score.success_rate if score and score.samples else None
+    latency = score.median_latency if score and score.samples else None
+    # 成功率按 5% 分档, 避免小幅波动导致频繁切换; 同档优先配置的默认 Provider, 再比延迟
+    rate_bucket = round((rate if rate is not None else settings.PROVIDER_MIN_SUCCESS_RATE) * 20)
+    return (
+        is_demoted(provider, account_id),
+        -rate_bucket,
+        provider != default,
+        latency if latency is not None else float("inf"),
+    )
+
+
+def choose_provider(account_id: int, default: str = "") -> str:
+    """为账号选择当前最优的 Provider"""
+    default = default or settings.CHECKIN_PROVIDER
+    candidates = [default] + [p for p in PROVIDER_NAMES if p != default]
+    return min(candidates, key=lambda p: _rank_key(p, account_id, default))
+
+
+def record_race(winner: str, loser: str = ""):
+    """记录一次超话列表竞速的胜出方"""
+    _race_results[(winner, loser)] += 1
+    logger.info(f"超话列表竞速: 胜出={winner}, 对手={loser or '未启动'}")
+
+
+def get_race_stats() -> list[dict]:
+    return [
+        {"winner": winner, "loser": loser, "count": count}
+        for (winner, loser), count in _race_results.most_common()
+    ]
+
+
+def get_stats(account_id: Optional[int] = None) -> dict:
+    """计分板快照: 全局维度, 或指定账号维度"""
+    key = GLOBAL if account_id is None else account_id
+    return {
+        provider: _scores[(provider, key)].snapshot()
+        for provider in PROVIDER_NAMES
+        if (provider, key) in _scores
+    }
@@ -5,12 +5,13 @@ import asyncio
 from datetime import datetime, timezone
 from typing import Optional
 
-import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.models.account import Account
 from app.models.task_log import TaskLog
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.weibo_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -75,8 +76,8 @@ async def send_push(
 
     for attempt in range(max_retries):
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                resp = await client.post(url, data=data)
+            client = get_http_client()
+            resp = await client.post(url, data=data, timeout=15)
 
             logger.info(f"Server酱响应: status={resp.status_code}, body={resp.text[:200]}")
 
@@ -92,6 +93,11 @@ async def send_push(
             error_msg = body.get("message", "") or body.get("info", "") or f"HTTP {resp.status_code}"
             logger.warning(f"推送失败 (尝试 {attempt + 1}/{max_retries}): {error_msg}")
 
+        except CircuitOpenError as e:
+            # 熔断中重试也会立即失败, 不再等待退避
+            logger.warning(f"推送跳过: {e}")
+            error_msg = str(e)
+            break
         except Exception as e:
             logger.warning(f"推送异常 (尝试 {attempt + 1}/{max_retries}): {e}")
             error_msg = str(e)
@@ -109,6 +115,7 @@ async def push_event(
     desp: str,
     account: Optional[Account] = None,
     force: bool = False,
+    sendkey: Optional[str] = None,
 ) -> dict:
     """
     统一推送入口
@@ -119,6 +126,7 @@ async def push_event(
         desp: Markdown 正文
         account: 关联账号 (可选)
         force: 是否跳过去重
+        sendkey: 本次推送使用的 SendKey, 优先于账号与系统默认配置 (可选)
     """
     account_id = account.id if account else 0
 
@@ -129,7 +137,7 @@ async def push_event(
         logger.info(f"推送已去重: account={account_id}, event={event_type}")
         return {"ok": True, "message": "推送已去重（10分钟内重复事件）"}
 
-    sendkey = _get_sendkey(account)
+    sendkey = sendkey or _get_sendkey(account)
     if not sendkey:
         logger.warning(
             f"无可用 SendKey, 仅记录日志: {title}. "
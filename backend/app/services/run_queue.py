@@ -0,0 +1,315 @@
+"""持久化签到队列 — RUN_QUEUE_BACKEND=postgres 时定时签到经 checkin_queue 表分发
+
+- enqueue_many(): 调度器把到期账号 (run_at 已含随机延迟) 批量写入, 按 dedupe_key 幂等,
+  多个进程同时分发同一分钟桶也只入队一次
+- 每个进程运行一个 QueueConsumer: 本地执行引擎有空闲名额时, 以 SELECT ... FOR UPDATE SKIP LOCKED
+  认领到期项并持有租约, 交给本地执行引擎; 执行期间心跳续租
+- 进程崩溃或卡死时租约过期, 其他进程重新认领, run_checkin 续用原运行只签剩余超话;
+  认领超过 RUN_QUEUE_MAX_ATTEMPTS 次仍未完成的项标记为 failed
+
+同一账号的并发执行仍由执行引擎的单飞与 advisory lock 保证。
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config import settings
+from app.database import async_session, engine as db_engine
+from app.models.checkin_queue import CheckinQueueItem
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# 批量入队每条 INSERT 的行数
+_INSERT_CHUNK = 1000
+# 清理过期队列项的间隔 (秒)
+_CLEANUP_INTERVAL = 3600
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enabled() -> bool:
+    """是否使用持久化队列 (需要 PostgreSQL, 其他数据库回退到进程内延迟队列)"""
+    return settings.RUN_QUEUE_BACKEND == "postgres" and db_engine.dialect.name == "postgresql"
+
+
+async def enqueue_many(items: list[tuple[int, datetime, str]], source: str = "schedule") -> int:
+    """
+    批量入队 [(account_id, run_at, dedupe_key)], run_at 为 UTC naive 时间
+
+    返回实际新增的条数 (dedupe_key 已存在的跳过)。
+    """
+    added = 0
+    async with async_session() as db:
+        for i in range(0, len(items), _INSERT_CHUNK):
+            stmt = (
+                pg_insert(CheckinQueueItem)
+                .values([
+                    {"account_id": account_id, "run_at": run_at, "dedupe_key": dedupe_key,
+                     "source": source, "status": QUEUED, "attempts": 0}
+                    for account_id, run_at, dedupe_key in items[i:i + _INSERT_CHUNK]
+                ])
+                .on_conflict_do_nothing(index_elements=["account_id", "dedupe_key"])
+            )
+            result = await db.execute(stmt)
+            added += max(result.rowcount or 0, 0)
+        await db.commit()
+    return added
+
+
+class QueueConsumer:
+    """本进程的队列消费者: 认领到期项、续租、回写结果"""
+
+    def __init__(self, run_engine):
+        self.run_engine = run_engine
+        self.worker_id = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        # {队列项 id: account_id}, 本进程认领且尚未结束的项
+        self._inflight: dict[int, int] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._pending_writes: set[asyncio.Task] = set()
+        self._stopping = False
+        self._last_cleanup = 0.0
+        self.claimed = 0
+        self.redelivered = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._claim_loop()),
+            asyncio.create_task(self._heartbeat_loop()),
+        ]
+        logger.info(f"签到队列消费者已启动: {self.worker_id}")
+
+    async def stop(self):
+        """停止认领并释放本进程持有的租约, 让其他进程立即接手 (应用退出时在执行引擎关闭前调用)"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.gather(*self._pending_writes, return_exceptions=True)
+
+        if self._inflight:
+            async with async_session() as db:
+                await db.execute(
+                    update(CheckinQueueItem)
+                    .where(
+                        CheckinQueueItem.id.in_(list(self._inflight)),
+                        CheckinQueueItem.lease_owner == self.worker_id,
+                    )
+                    .values(status=QUEUED, lease_owner=None, lease_expires_at=None, run_at=utcnow())
+                )
+                await db.commit()
+            logger.info(f"签到队列: 已释放 {len(self._inflight)} 个执行中的租约")
+            self._inflight.clear()
+
+    # ─── 认领 ───
+
+    async def _claim(self, limit: int) -> list:
+        now = utcnow()
+        lease_until = now + timedelta(seconds=settings.RUN_QUEUE_LEASE_SECONDS)
+        Q = CheckinQueueItem
+        async with async_session() as db:
+            # 租约反复过期 (进程多次崩溃/卡死) 的项不再投递
+            await db.execute(
+                update(Q)
+                .where(Q.status == LEASED, Q.lease_expires_at < now, Q.attempts >= settings.RUN_QUEUE_MAX_ATTEMPTS)
+                .values(status=FAILED, error="租约多次过期未完成", finished_at=now)
+            )
+            due = (
+                select(Q.id)
+                .where(or_(
+                    and_(Q.status == QUEUED, Q.run_at <= now),
+                    and_(Q.status == LEASED, Q.lease_expires_at < now),
+                ))
+                .order_by(Q.run_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            result = await db.execute(
+                update(Q)
+                .where(Q.id.in_(due))
+                .values(
+                    status=LEASED, lease_owner=self.worker_id, lease_expires_at=lease_until,
+                    heartbeat_at=now, attempts=Q.attempts + 1,
+                )
+                .returning(Q.id, Q.account_id, Q.source, Q.attempts)
+            )
+            rows = result.all()
+            await db.commit()
+        return rows
+
+    async def _claim_loop(self):
+        while True:
+            try:
+                free = self.run_engine.free_slots()
+                if free > 0:
+                    for item_id, account_id, source, attempts in await self._claim(free):
+                        self._dispatch(item_id, account_id, source, attempts)
+                if time.monotonic() - self._last_cleanup >= _CLEANUP_INTERVAL:
+                    await self._cleanup()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"签到队列认领失败: {e}")
+            await asyncio.sleep(settings.RUN_QUEUE_POLL_SECONDS)
+
+    def _dispatch(self, item_id: int, account_id: int, source: str, attempts: int):
+        self.claimed += 1
+        if attempts > 1:
+            self.redelivered += 1
+            logger.info(f"签到队列: 重新认领 #{item_id} (账号 {account_id}, 第 {attempts} 次)")
+        self._inflight[item_id] = account_id
+        future = self.run_engine.submit(account_id, source=source)
+        future.add_done_callback(lambda f: self._on_done(item_id, attempts, f))
+
+    # ─── 结果回写与续租 ───
+
+    def _on_done(self, item_id: int, attempts: int, future: asyncio.Future):
+        if self._stopping or future.cancelled():
+            # 应用退出: 租约由 stop() 释放, 或过期后由其他进程重新认领
+            return
+        self._inflight.pop(item_id, None)
+
+        error = None if future.exception() is None else str(future.exception())
+        if error is None:
+            stats = future.result()
+            values = {"status": DONE, "run_id": (stats or {}).get("run_id"), "finished_at": utcnow()}
+            if stats is None:
+                values["error"] = "账号不存在"
+            self.completed += 1
+        elif attempts < settings.RUN_QUEUE_MAX_ATTEMPTS:
+            # 执行异常: 稍后重新投递 (任何进程都可认领)
+            values = {
+                "status": QUEUED, "error": error[:1000], "lease_owner": None, "lease_expires_at": None,
+                "run_at": utcnow() + timedelta(seconds=settings.RUN_QUEUE_LEASE_SECONDS * attempts),
+            }
+        else:
+            values = {"status": FAILED, "error": error[:1000], "finished_at": utcnow()}
+            self.failed += 1
+
+        task = asyncio.create_task(self._write_result(item_id, values))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    async def _write_result(self, item_id: int, values: dict):
+        try:
+            async with async_session() as db:
+                # 租约已被其他进程接手时不覆盖其状态
+                await db.execute(
+                    update(CheckinQueueItem)
+                    .where(CheckinQueueItem.id == item_id, CheckinQueueItem.lease_owner == self.worker_id)
+                    .values(**values)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"签到队列: 回写 #{item_id} 结果失败: {e}")
+
+    async def _heartbeat_loop(self):
+        interval = max(settings.RUN_QUEUE_LEASE_SECONDS / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            if not self._inflight:
+                continue
+            now = utcnow()
+            try:
+                async with async_session() as db:
+                    await db.execute(
+                        update(CheckinQueueItem)
+                        .where(
+                            CheckinQueueItem.id.in_(list(self._inflight)),
+                            CheckinQueueItem.lease_owner == self.worker_id,
+                            CheckinQueueItem.status == LEASED,
+                        )
+                        .values(
+                            lease_expires_at=now + timedelta(seconds=settings.RUN_QUEUE_LEASE_SECONDS),
+                            heartbeat_at=now,
+                        )
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"签到队列续租失败: {e}")
+
+    async def _cleanup(self):
+        self._last_cleanup = time.monotonic()
+        horizon = utcnow() - timedelta(days=settings.RUN_QUEUE_RETENTION_DAYS)
+        async with async_session() as db:
+            result = await db.execute(
+                delete(CheckinQueueItem).where(
+                    CheckinQueueItem.status.in_((DONE, FAILED)), CheckinQueueItem.finished_at < horizon
+                )
+            )
+            await db.commit()
+        if result.rowcount:
+            logger.info(f"签到队列: 清理 {result.rowcount} 条过期记录")
+
+    def status(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "running": bool(self._tasks),
+            "inflight": len(self._inflight),
+            "claimed": self.claimed,
+            "redelivered": self.redelivered,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+consumer: Optional[QueueConsumer] = None
+
+
+def start_consumer(run_engine) -> Optional[QueueConsumer]:
+    """启用持久化队列时启动本进程的消费者"""
+    global consumer
+    if settings.RUN_QUEUE_BACKEND == "postgres" and not enabled():
+        logger.warning("RUN_QUEUE_BACKEND=postgres 需要 PostgreSQL, 回退到进程内延迟队列")
+    if not enabled():
+        return None
+    if consumer is None:
+        consumer = QueueConsumer(run_engine)
+    consumer.start()
+    return consumer
+
+
+async def stop_consumer():
+    if consumer is not None:
+        await consumer.stop()
+
+
+async def queue_status() -> dict:
+    """队列各状态条数、最早到期时间与各进程持有的租约数"""
+    if not enabled():
+        return {"backend": "memory"}
+    Q = CheckinQueueItem
+    async with async_session() as db:
+        counts = dict((await db.execute(select(Q.status, func.count()).group_by(Q.status))).all())
+        next_run_at = (await db.execute(select(func.min(Q.run_at)).where(Q.status == QUEUED))).scalar()
+        leases = dict((await db.execute(
+            select(Q.lease_owner, func.count()).where(Q.status == LEASED).group_by(Q.lease_owner)
+        )).all())
+    return {
+        "backend": "postgres",
+        "counts": counts,
+        "next_run_at": next_run_at.isoformat() if next_run_at else None,
+        "leases": leases,
+        "consumer": consumer.status() if consumer else None,
+    }
@@ -0,0 +1,170 @@
+"""签到运行耗时分解 — 按阶段记录耗时与上游请求数, 随运行记录保存到 checkin_runs.timings
+
+执行引擎在 with record(): 中执行 run_checkin, RunTimings 放在 contextvar 中, 之后:
+- with phase("cookie"): ...  记录阶段耗时; 阶段内经共享连接池发出的请求计入该阶段
+- with page(): ...           记录超话列表的单页请求耗时 (请求计入 topics 阶段)
+- 共享 HTTP 客户端的 request 事件钩子调用 count_request(), 按当前阶段计数
+
+签到阶段产生的子任务会继承 contextvar, 因此并发签到的请求同样计入。
+后台刷新超话缓存在空白 context 中运行 (topic_cache_service.schedule_refresh), 不计入触发它的运行。
+流水线模式下翻页与签到同时进行: checkin 阶段的耗时包含翻页时间, 翻页本身另见 pages。
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+import httpx
+
+# 运行中阶段之外发出的请求计入 other
+OTHER = "other"
+
+_current: ContextVar[Optional["RunTimings"]] = ContextVar("run_timings", default=None)
+_phase: ContextVar[str] = ContextVar("run_timing_phase", default=OTHER)
+
+
+def percentile(values: list, pct: float) -> float:
+    """线性插值百分位数, values 为空时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class RunTimings:
+    """一次签到运行的耗时分解"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.phases: dict[str, dict] = {}
+        self.pages: list[int] = []
+        self.checkin_latencies: list[int] = []
+
+    def _phase_entry(self, name: str) -> dict:
+        entry = self.phases.get(name)
+        if entry is None:
+            entry = self.phases[name] = {"ms": 0, "requests": 0}
+        return entry
+
+    def count_request(self):
+        self._phase_entry(_phase.get())["requests"] += 1
+
+    def as_dict(self) -> dict:
+        latencies = self.checkin_latencies
+        return {
+            "total_ms": round((time.monotonic() - self.started) * 1000),
+            "phases": self.phases,
+            "requests": sum(p["requests"] for p in self.phases.values()),
+            "pages": self.pages,
+            # 单个超话签到请求的上游耗时 (不含限速等待与重试退避), 仅本次实际签到的超话
+            "checkin": {
+                "count": len(latencies),
+                "p50_ms": round(percentile(latencies, 50)),
+                "p95_ms": round(percentile(latencies, 95)),
+                "max_ms": max(latencies, default=0),
+            },
+        }
+
+
+@contextmanager
+def record():
+    """在当前任务 (及其创建的子任务) 中记录一次运行的耗时"""
+    timings = RunTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[RunTimings]:
+    return _current.get()
+
+
+def record_checkins(latencies: Iterable[int]):
+    """记录本次实际签到的超话耗时 (未在记录中时忽略)"""
+    timings = _current.get()
+    if timings is not None:
+        timings.checkin_latencies.extend(latencies)
+
+
+@contextmanager
+def phase(name: str):
+    """记录阶段耗时, 期间发出的请求计入该阶段 (同一阶段多次进入时累加)"""
+    timings = _current.get()
+    token = _phase.set(name)
+    start_ts = time.monotonic()
+    try:
+        yield
+    finally:
+        _phase.reset(token)
+        if timings is not None:
+            timings._phase_entry(name)["ms"] += round((time.monotonic() - start_ts) * 1000)
+
+
+@contextmanager
+def page():
+    """记录超话列表单页请求耗时"""
+    timings = _current.get()
+    token = _phase.set("topics")
+    start_ts = time.monotonic()
+    try:
+        yield
+    finally:
+        _phase.reset(token)
+        if timings is not None:
+            timings.pages.append(round((time.monotonic() - start_ts) * 1000))
+
+
+async def on_request(request: httpx.Request):
+    """共享 HTTP 客户端的 request 事件钩子"""
+    timings = _current.get()
+    if timings is not None:
+        timings.count_request()
+
+
+# ─── 历史统计 ───
+
+def _dist(values: list) -> dict:
+    return {
+        "p50": round(percentile(values, 50)),
+        "p95": round(percentile(values, 95)),
+        "max": max(values, default=0),
+    }
+
+
+def _trend(values: list) -> Optional[float]:
+    """后一半运行相对前一半的 p50 变化比例 (0.2 表示变慢 20%), 样本不足 4 次时为 None"""
+    if len(values) < 4:
+        return None
+    half = len(values) // 2
+    before, after = percentile(values[:half], 50), percentile(values[-half:], 50)
+    return round((after - before) / before, 3) if before else None
+
+
+def summarize_history(runs: list) -> dict:
+    """
+    按时间先后排列的一组运行 (CheckinRun, 均带 timings) 的耗时统计
+
+    返回总耗时与各阶段耗时的 p50/p95/max、请求数、单超话签到 p95 及趋势。
+    """
+    totals = [r.timings["total_ms"] for r in runs]
+    phase_names = sorted({name for r in runs for name in r.timings.get("phases", {})})
+    phases = {}
+    for name in phase_names:
+        values = [r.timings["phases"].get(name, {}).get("ms", 0) for r in runs]
+        phases[name] = {**_dist(values), "trend": _trend(values)}
+
+    pages = [ms for r in runs for ms in r.timings.get("pages", [])]
+    checkin_p95 = [r.timings.get("checkin", {}).get("p95_ms", 0) for r in runs if r.timings.get("checkin", {}).get("count")]
+    return {
+        "runs": len(runs),
+        "total_ms": {**_dist(totals), "trend": _trend(totals)},
+        "phases": phases,
+        "requests": _dist([r.timings.get("requests", 0) for r in runs]),
+        "page_ms": _dist(pages),
+        "checkin_p95_ms": {**_dist(checkin_p95), "trend": _trend(checkin_p95)},
+    }
@@ -0,0 +1,167 @@
+"""调度 leader 选举 — 多副本部署时只有一个进程分发定时签到
+
+- 每个进程用一个专用数据库连接尝试 pg_try_advisory_lock, 拿到会话级锁的进程成为 leader
+- leader 每隔 SCHEDULER_LEADER_POLL_SECONDS 在该连接上执行一次检查; 连接失效时自动卸任
+- leader 进程退出或崩溃时连接断开, PostgreSQL 立即释放锁, 备用副本在下一次尝试时接管
+- 所有副本都继续提供 API、维护分钟桶索引与 (RUN_QUEUE_BACKEND=postgres 时) 消费签到队列
+
+非 PostgreSQL 数据库只支持单进程, 直接视为 leader。
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine as db_engine
+
+logger = logging.getLogger(__name__)
+
+# advisory lock 键: 与签到单飞锁 (0x5742, account_id) 使用不同的命名空间
+_LEADER_LOCK_NS = 0x5743
+_LEADER_LOCK_KEY = 0
+
+_conn = None
+_task: Optional[asyncio.Task] = None
+_on_elected: Optional[Callable[[], Awaitable[None]]] = None
+_leader_since: Optional[float] = None
+_elections = 0
+
+
+def is_leader() -> bool:
+    return _leader_since is not None
+
+
+async def _close_conn(discard: bool = False):
+    """归还持锁连接; discard 时直接断开 (锁可能仍被持有, 不能回到连接池被其他请求复用)"""
+    global _conn
+    if _conn is None:
+        return
+    try:
+        if discard:
+            await _conn.invalidate()
+        await _conn.close()
+    except Exception:
+        # 连接已断开, 锁已随会话释放
+        pass
+    _conn = None
+
+
+async def _try_acquire() -> bool:
+    global _conn
+    conn = await db_engine.connect()
+    try:
+        result = await conn.execute(
+            text("SELECT pg_try_advisory_lock(:ns, :key)"),
+            {"ns": _LEADER_LOCK_NS, "key": _LEADER_LOCK_KEY},
+        )
+        acquired = bool(result.scalar())
+        await conn.commit()
+    except BaseException:
+        await conn.close()
+        raise
+    if not acquired:
+        await conn.close()
+        return False
+    _conn = conn
+    return True
+
+
+async def _check_held() -> bool:
+    """leader 确认持锁的连接仍然可用"""
+    try:
+        await asyncio.wait_for(_conn.execute(text("SELECT 1")), settings.SCHEDULER_LEADER_POLL_SECONDS)
+        await _conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"调度 leader 连接失效, 卸任: {e}")
+        return False
+
+
+async def _become_leader():
+    global _leader_since, _elections
+    _leader_since = time.time()
+    _elections += 1
+    logger.info("本进程成为调度 leader")
+    if _on_elected is not None:
+        try:
+            await _on_elected()
+        except Exception as e:
+            logger.error(f"调度 leader 接管处理失败: {e}")
+
+
+async def _step_down():
+    global _leader_since
+    _leader_since = None
+    await _close_conn(discard=True)
+
+
+async def _elect_once():
+    if is_leader():
+        if not await _check_held():
+            await _step_down()
+        return
+    try:
+        acquired = await _try_acquire()
+    except Exception as e:
+        logger.error(f"调度 leader 选举失败: {e}")
+        return
+    if acquired:
+        await _become_leader()
+
+
+async def _loop():
+    while True:
+        await asyncio.sleep(settings.SCHEDULER_LEADER_POLL_SECONDS)
+        await _elect_once()
+
+
+async def start(on_elected: Optional[Callable[[], Awaitable[None]]] = None):
+    """
+    开始参与选举; 启动时先同步尝试一次, 当选时在返回前执行 on_elected
+
+    on_elected 在每次当选 (含故障接管) 时调用。
+    """
+    global _task, _on_elected
+    _on_elected = on_elected
+    if db_engine.dialect.name != "postgresql":
+        await _become_leader()
+        return
+    await _elect_once()
+    if not is_leader():
+        logger.info("调度 leader 由其他副本担任, 本进程待命")
+    _task = asyncio.create_task(_loop())
+
+
+async def stop():
+    """退出选举并释放锁, 让备用副本立即接管 (应用退出时调用)"""
+    global _task, _leader_since
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+    unlocked = False
+    if _conn is not None:
+        try:
+            await _conn.execute(
+                text("SELECT pg_advisory_unlock(:ns, :key)"),
+                {"ns": _LEADER_LOCK_NS, "key": _LEADER_LOCK_KEY},
+            )
+            await _conn.commit()
+            unlocked = True
+        except Exception:
+            pass
+    _leader_since = None
+    await _close_conn(discard=not unlocked)
+
+
+def status() -> dict:
+    since = None
+    if _leader_since is not None:
+        since = str(datetime.fromtimestamp(_leader_since, ZoneInfo(settings.TZ)).replace(microsecond=0))
+    return {"is_leader": is_leader(), "leader_since": since, "elections": _elections}
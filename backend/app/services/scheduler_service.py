@@ -1,136 +1,453 @@
-"""APScheduler 定时调度管理"""
+"""定时调度 — 按分钟桶分发到期账号
 
+APScheduler 只保留一个每分钟触发的 dispatcher 任务, 不再为每个账号注册 CronTrigger:
+- 内存索引按 schedule_time 把账号分到一天 1440 个分钟桶 (分钟 → 账号 ID 集合)
+- 每次 tick 取出到期分钟桶, 一次查询校验仍启用定时的账号, 按 schedule_random_delay 算出开始时间放入延迟队列
+- 延迟队列是一个最小堆, 由单个后台任务在开始时间到达时提交给全局执行引擎;
+  等待期间不占用任务、数据库会话或连接, 执行引擎开始执行时才打开会话
+- 启停定时或修改时间只更新索引中的一项; 重载全部与数据库对账, 只增删/移动有差异的账号, 不清空索引
+- leader 每次 tick 前按 accounts.schedule_updated_at 增量同步其他副本做的定时修改
+
+调度开销与账号数无关; tick 被延迟 (事件循环阻塞等) 时补发错过的分钟桶。
+RUN_QUEUE_BACKEND=postgres 时到期账号改为写入持久化队列 (run_queue), 由各进程的消费者认领执行。
+多副本部署时只有调度 leader (scheduler_leader) 分发到期账号, 其他副本只维护索引以便随时接管。
+"""
+
+import asyncio
+import heapq
+import itertools
 import logging
 import random
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import func, select
 
+from app.config import settings
 from app.database import async_session
 from app.models.account import Account
-from app.services import checkin_service
-from sqlalchemy import select
+from app.services import checkin_service, run_queue, scheduler_leader
+from app.utils.time import local_date_str
 
 logger = logging.getLogger(__name__)
 
-scheduler = AsyncIOScheduler(timezone="Asia/Shanghai")
+scheduler = AsyncIOScheduler(timezone=settings.TZ)
 
+_DISPATCHER_JOB_ID = "checkin_dispatcher"
+# 未配置或格式错误的 schedule_time 按 08:00 处理
+_DEFAULT_MINUTE = 8 * 60
+# tick 延迟时最多补发的分钟数
+_MAX_CATCHUP_MINUTES = 5
+# 到期账号校验查询的 IN 列表分批大小 (数据库绑定参数个数有上限)
+_QUERY_CHUNK = 5000
 
-async def _run_checkin_job(account_id: int):
-    """调度器执行的签到任务"""
-    async with async_session() as db:
-        result = await db.execute(select(Account).where(Account.id == account_id))
-        account = result.scalar_one_or_none()
+# 分钟桶索引: {一天中的第几分钟: {account_id}} 与反向索引 {account_id: 分钟}
+_buckets: dict[int, set[int]] = {}
+_account_minute: dict[int, int] = {}
+_last_tick: Optional[datetime] = None
+
+# 增量同步水位: 已同步到的最大 Account.schedule_updated_at; 回看一段时间以覆盖未按时间顺序提交的事务与副本间时钟差
+_synced_until: Optional[datetime] = None
+_SYNC_OVERLAP = timedelta(minutes=2)
+# 单账号更新的序号: 对账期间被单独更新过的账号以单账号更新为准, 不被对账开始时读到的旧状态覆盖
+_edit_seq = 0
+_edited: dict[int, int] = {}
+_last_reconcile: Optional[dict] = None
+
+# 延迟启动队列: 最小堆 [(开始时间 loop.time(), 序号, account_id)]
+# 与 {account_id: (账号名, 完成时得到签到结果的 Future)}, 同一账号只排一次
+_delayed: list[tuple[float, int, int]] = []
+_delayed_entries: dict[int, tuple[str, asyncio.Future]] = {}
+_delayed_seq = itertools.count()
+_delayed_wakeup: Optional[asyncio.Event] = None
+_delayed_task: Optional[asyncio.Task] = None
+
+
+def _parse_schedule_time(value: Optional[str]) -> int:
+    try:
+        hour, minute = (int(p) for p in (value or "").split(":")[:2])
+        if 0 <= hour < 24 and 0 <= minute < 60:
+            return hour * 60 + minute
+    except ValueError:
+        pass
+    return _DEFAULT_MINUTE
+
+
+def _format_minute(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def _index_remove(account_id: int):
+    minute = _account_minute.pop(account_id, None)
+    if minute is None:
+        return
+    bucket = _buckets.get(minute)
+    if bucket is not None:
+        bucket.discard(account_id)
+        if not bucket:
+            del _buckets[minute]
+
+
+def _index_add(account_id: int, minute: int):
+    _account_minute[account_id] = minute
+    _buckets.setdefault(minute, set()).add(account_id)
+
+
+def _index_set(account_id: int, enabled: bool, schedule_time: Optional[str]) -> Optional[str]:
+    """把账号在索引中的位置更新为给定状态, 返回 added/moved/removed, 无变化时返回 None"""
+    current = _account_minute.get(account_id)
+    if not enabled:
+        if current is None:
+            return None
+        _index_remove(account_id)
+        return "removed"
+    minute = _parse_schedule_time(schedule_time)
+    if current == minute:
+        return None
+    _index_remove(account_id)
+    _index_add(account_id, minute)
+    return "added" if current is None else "moved"
 
-        if not account:
-            logger.warning(f"定时任务: 账号 ID {account_id} 不存在, 跳过")
-            return
 
-        if not account.schedule_enabled:
-            logger.info(f"定时任务: 账号 {account.account_name} 已禁用, 跳过")
-            return
+def _mark_edited(account_id: int):
+    global _edit_seq
+    _edit_seq += 1
+    _edited[account_id] = _edit_seq
 
-        # 随机延迟
-        delay = random.randint(0, account.schedule_random_delay)
-        if delay > 0:
-            logger.info(f"定时任务: {account.account_name} 随机延迟 {delay}s")
-            import asyncio
-            await asyncio.sleep(delay)
 
-        logger.info(f"定时任务开始: {account.account_name}")
+def _chain_result(target: asyncio.Future, account_name: str, source: asyncio.Future):
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        logger.error(f"定时任务异常: {account_name}: {source.exception()}")
+        target.set_exception(source.exception())
+        # 定时任务通常无人等待结果, 避免 "exception was never retrieved" 警告
+        target.add_done_callback(lambda f: f.exception())
+    else:
+        target.set_result(source.result())
+
+
+def _start_delayed(account_id: int):
+    account_name, future = _delayed_entries.pop(account_id)
+    # 等待期间被禁用/删除的账号已从分钟桶索引中移除
+    if account_id not in _account_minute:
+        logger.info(f"定时任务: {account_name} 已禁用定时, 取消")
+        future.set_result(None)
+        return
+
+    logger.info(f"定时任务开始: {account_name}")
+    engine_future = checkin_service.run_engine.submit(account_id, source="schedule")
+    engine_future.add_done_callback(lambda f: _chain_result(future, account_name, f))
+
+
+async def _delayed_starter():
+    """延迟队列的唯一消费者: 按开始时间把账号提交给执行引擎"""
+    loop = asyncio.get_running_loop()
+    while True:
+        _delayed_wakeup.clear()
+        now = loop.time()
+        while _delayed and _delayed[0][0] <= now:
+            _, _, account_id = heapq.heappop(_delayed)
+            _start_delayed(account_id)
+
+        timeout = _delayed[0][0] - now if _delayed else None
         try:
-            await checkin_service.run_checkin(db, account)
-        except Exception as e:
-            logger.error(f"定时任务异常: {account.account_name}: {e}")
+            await asyncio.wait_for(_delayed_wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
 
 
-def _make_job_id(account_id: int) -> str:
-    return f"checkin_{account_id}"
+def _enqueue_delayed(account_id: int, account_name: str, max_delay: int) -> Optional[asyncio.Future]:
+    """按随机延迟计算开始时间并放入延迟队列; 账号已在队列中时返回 None"""
+    global _delayed_wakeup, _delayed_task
+    if account_id in _delayed_entries:
+        logger.warning(f"定时任务: {account_name} 上一次定时尚未开始, 跳过本次")
+        return None
 
+    loop = asyncio.get_running_loop()
+    if _delayed_task is None or _delayed_task.done():
+        _delayed_wakeup = asyncio.Event()
+        _delayed_task = asyncio.create_task(_delayed_starter())
 
-async def apply_account_schedule(account_id: int, account: Account = None):
-    """应用/更新单个账号的定时任务"""
-    job_id = _make_job_id(account_id)
+    delay = random.randint(0, max(max_delay or 0, 0))
+    if delay > 0:
+        logger.info(f"定时任务: {account_name} 随机延迟 {delay}s")
+    run_at = loop.time() + delay
+    future = loop.create_future()
+    _delayed_entries[account_id] = (account_name, future)
+    heapq.heappush(_delayed, (run_at, next(_delayed_seq), account_id))
+    if _delayed[0][2] == account_id:
+        _delayed_wakeup.set()
+    return future
+
+
+def delayed_status() -> dict:
+    """延迟队列中等待开始的账号数与最早开始时间"""
+    if not _delayed:
+        return {"pending": 0, "next_start": None}
+    wait = max(_delayed[0][0] - asyncio.get_running_loop().time(), 0)
+    next_start = datetime.fromtimestamp(time.time() + wait, ZoneInfo(settings.TZ))
+    return {"pending": len(_delayed_entries), "next_start": str(next_start.replace(microsecond=0))}
+
+
+async def dispatch_minute(minute: int) -> list[asyncio.Future]:
+    """
+    分发一个分钟桶内的到期账号到延迟队列, 返回各账号完成时得到签到结果的 Future
+
+    使用持久化队列时写入 checkin_queue 后返回空列表 (结果由认领的进程回写到队列项)。
+    """
+    due = list(_buckets.get(minute, ()))
+    if not due:
+        return []
+
+    # 以数据库为准再校验一次, 索引与数据库不一致时 (账号已删除/禁用) 不会误触发
+    rows = []
+    async with async_session() as db:
+        for i in range(0, len(due), _QUERY_CHUNK):
+            result = await db.execute(
+                select(Account.id, Account.account_name, Account.schedule_random_delay).where(
+                    Account.id.in_(due[i:i + _QUERY_CHUNK]),
+                    Account.schedule_enabled == True,
+                )
+            )
+            rows.extend(result.all())
+
+    skipped = len(due) - len(rows)
+    skipped_msg = f", 跳过 {skipped} 个已删除/禁用的账号" if skipped else ""
 
-    # 先移除旧任务
-    existing = scheduler.get_job(job_id)
-    if existing:
-        scheduler.remove_job(job_id)
-        logger.info(f"移除旧定时任务: {job_id}")
+    if run_queue.enabled():
+        # 按本地日期去重: 多个进程分发同一分钟桶或补发时只入队一次
+        now = run_queue.utcnow()
+        dedupe_key = f"schedule:{local_date_str()}"
+        added = await run_queue.enqueue_many([
+            (account_id, now + timedelta(seconds=random.randint(0, max(max_delay or 0, 0))), dedupe_key)
+            for account_id, _, max_delay in rows
+        ])
+        logger.info(f"定时分发 {_format_minute(minute)}: {added} 个账号加入签到队列{skipped_msg}")
+        return []
 
+    futures = []
+    for account_id, account_name, max_delay in rows:
+        future = _enqueue_delayed(account_id, account_name, max_delay)
+        if future is not None:
+            futures.append(future)
+
+    logger.info(f"定时分发 {_format_minute(minute)}: {len(futures)} 个账号{skipped_msg}")
+    return futures
+
+
+async def _dispatch_tick():
+    """dispatcher 每分钟执行: 分发当前分钟 (及 tick 延迟错过的分钟) 的账号"""
+    global _last_tick
+    if not scheduler_leader.is_leader():
+        return
+    now = datetime.now(ZoneInfo(settings.TZ)).replace(second=0, microsecond=0)
+    if _last_tick is not None and now <= _last_tick:
+        # 同一分钟重复触发 (时钟回拨等), 已分发过
+        return
+    if _last_tick is None:
+        minutes = [now]
+    else:
+        missed = int((now - _last_tick).total_seconds() // 60)
+        if missed > _MAX_CATCHUP_MINUTES:
+            logger.warning(f"调度 tick 延迟 {missed} 分钟, 只补发最近 {_MAX_CATCHUP_MINUTES} 分钟")
+            missed = _MAX_CATCHUP_MINUTES
+        minutes = [now - timedelta(minutes=i) for i in range(missed - 1, -1, -1)]
+    _last_tick = now
+
+    try:
+        await sync_schedule_changes()
+    except Exception as e:
+        # 同步失败不影响分发, 到期账号仍会按数据库校验
+        logger.error(f"定时索引增量同步失败: {e}")
+
+    for t in minutes:
+        await dispatch_minute(t.hour * 60 + t.minute)
+
+
+async def on_leader_elected():
+    """
+    当选调度 leader (启动或故障接管) 时调用
+
+    先与数据库对账索引 (待命期间其他副本的修改未同步到本进程);
+    下一次 tick 从当前分钟开始补发: 原 leader 可能在本分钟分发前退出, 且其进程内延迟队列已随之丢失;
+    RUN_QUEUE_BACKEND=postgres 时重复入队按 dedupe_key 忽略。随后续签中断的运行。
+    """
+    global _last_tick
+    await apply_all_schedules()
+    now = datetime.now(ZoneInfo(settings.TZ)).replace(second=0, microsecond=0)
+    _last_tick = now - timedelta(minutes=1)
+    await checkin_service.recover_interrupted_runs()
+
+
+async def apply_account_schedule(account_id: int, account: Account = None):
+    """应用/更新单个账号的定时 (只更新内存索引中的一项)"""
     if account is None:
         async with async_session() as db:
             result = await db.execute(select(Account).where(Account.id == account_id))
             account = result.scalar_one_or_none()
 
+    _mark_edited(account_id)
     if not account or not account.schedule_enabled:
+        _index_remove(account_id)
         logger.info(f"账号 {account_id} 未启用定时, 跳过")
         return
 
-    # 解析时间
-    try:
-        parts = account.schedule_time.split(":")
-        hour = int(parts[0])
-        minute = int(parts[1])
-    except Exception:
-        hour, minute = 8, 0
-
-    trigger = CronTrigger(hour=hour, minute=minute, timezone="Asia/Shanghai")
-    scheduler.add_job(
-        _run_checkin_job,
-        trigger=trigger,
-        id=job_id,
-        args=[account_id],
-        replace_existing=True,
-        name=f"签到-{account.account_name}",
+    _index_set(account_id, True, account.schedule_time)
+    logger.info(f"已应用定时任务: {account.account_name} -> {_format_minute(_account_minute[account_id])}")
+
+
+def _apply_diff(rows, start_seq: int) -> dict:
+    """按 [(id, schedule_enabled, schedule_time)] 更新索引, 跳过 start_seq 之后单独更新过的账号"""
+    changes = {"added": 0, "moved": 0, "removed": 0}
+    for account_id, enabled, schedule_time in rows:
+        if _edited.get(account_id, 0) > start_seq:
+            continue
+        change = _index_set(account_id, enabled, schedule_time)
+        if change:
+            changes[change] += 1
+    return changes
+
+
+def _forget_edits(start_seq: int):
+    for account_id in [a for a, seq in _edited.items() if seq <= start_seq]:
+        del _edited[account_id]
+
+
+async def apply_all_schedules() -> int:
+    """
+    与数据库对账分钟桶索引, 返回启用定时的账号数
+
+    只查询 (id, schedule_time) 两列, 与现有索引比较后只增删/移动有差异的账号;
+    索引不会被清空, 对账期间的 tick 照常分发。随机延迟在分发时从数据库读取, 不进入索引。
+    """
+    global _synced_until, _last_reconcile
+    start_ts = time.perf_counter()
+    start_seq = _edit_seq
+    async with async_session() as db:
+        result = await db.execute(
+            select(Account.id, Account.schedule_time).where(Account.schedule_enabled == True)
+        )
+        rows = result.all()
+        synced_until = (await db.execute(select(func.max(Account.schedule_updated_at)))).scalar()
+
+    desired = {account_id: schedule_time for account_id, schedule_time in rows}
+    stale = [(a, False, None) for a in _account_minute if a not in desired]
+    changes = _apply_diff(stale + [(a, True, t) for a, t in desired.items()], start_seq)
+    _forget_edits(start_seq)
+    _synced_until = synced_until
+
+    _last_reconcile = {
+        "scheduled": len(rows),
+        **changes,
+        "elapsed_ms": round((time.perf_counter() - start_ts) * 1000, 1),
+    }
+    logger.info(
+        f"已对账 {len(rows)} 个定时任务 ({len(_buckets)} 个分钟桶): "
+        f"新增 {changes['added']}, 移动 {changes['moved']}, 移除 {changes['removed']}"
     )
-    logger.info(f"已应用定时任务: {account.account_name} -> {hour:02d}:{minute:02d}")
+    return len(rows)
 
 
-async def apply_all_schedules():
-    """重新应用所有定时任务"""
-    # 清除所有现有签到任务
-    for job in scheduler.get_jobs():
-        if job.id.startswith("checkin_"):
-            scheduler.remove_job(job.id)
+async def sync_schedule_changes() -> dict:
+    """
+    按 schedule_updated_at 增量同步索引 (其他副本修改的启停定时与定时时间)
 
+    只在 schedule_enabled / schedule_time 变化时更新 (account_service.update_account), 签到写回
+    last_checkin_at 等字段不会让账号重新进入同步。直接改库时需同时更新该列或执行全量对账。
+    删除账号不会留下记录, 启用定时的账号数与索引不一致时改为全量对账。
+    """
+    global _synced_until
+    if _synced_until is None:
+        await apply_all_schedules()
+        return _last_reconcile
+
+    start_seq = _edit_seq
     async with async_session() as db:
         result = await db.execute(
-            select(Account).where(Account.schedule_enabled == True)
+            select(Account.id, Account.schedule_enabled, Account.schedule_time, Account.schedule_updated_at)
+            .where(Account.schedule_updated_at > _synced_until - _SYNC_OVERLAP)
+        )
+        rows = result.all()
+        enabled_count = (await db.execute(
+            select(func.count()).select_from(Account).where(Account.schedule_enabled == True)
+        )).scalar()
+
+    changes = _apply_diff([(a, enabled, t) for a, enabled, t, _ in rows], start_seq)
+    _forget_edits(start_seq)
+    if rows:
+        _synced_until = max(_synced_until, max(updated_at for *_, updated_at in rows))
+    if enabled_count != len(_account_minute):
+        logger.info(f"定时索引 {len(_account_minute)} 个账号与数据库 {enabled_count} 个不一致, 全量对账")
+        await apply_all_schedules()
+        return _last_reconcile
+    if any(changes.values()):
+        logger.info(
+            f"定时索引增量同步: 新增 {changes['added']}, 移动 {changes['moved']}, 移除 {changes['removed']}"
         )
-        accounts = result.scalars().all()
+    return changes
 
-        count = 0
-        for account in accounts:
-            await apply_account_schedule(account.id, account)
-            count += 1
 
-    logger.info(f"已应用 {count} 个定时任务")
-    return count
+def last_reconcile() -> Optional[dict]:
+    """最近一次全量对账的结果 (账号数、增删移动数与耗时)"""
+    return _last_reconcile
 
 
 def get_scheduler_status() -> list[dict]:
-    """获取所有定时任务状态"""
+    """各分钟桶的账号数与下次执行时间 (按下次执行时间排序)"""
+    now = datetime.now(ZoneInfo(settings.TZ))
     jobs = []
-    for job in scheduler.get_jobs():
+    for minute, account_ids in _buckets.items():
+        next_run = now.replace(hour=minute // 60, minute=minute % 60, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
         jobs.append({
-            "id": job.id,
-            "name": job.name,
-            "next_run_time": str(job.next_run_time) if job.next_run_time else None,
+            "id": f"bucket_{_format_minute(minute)}",
+            "name": f"签到 {_format_minute(minute)} ({len(account_ids)} 个账号)",
+            "accounts": len(account_ids),
+            "next_run_time": str(next_run),
         })
+    jobs.sort(key=lambda j: j["next_run_time"])
     return jobs
 
 
+def scheduled_account_count() -> int:
+    return len(_account_minute)
+
+
 def start_scheduler():
-    """启动调度器"""
+    """启动调度器并注册每分钟的 dispatcher"""
     if not scheduler.running:
+        scheduler.add_job(
+            _dispatch_tick,
+            trigger=CronTrigger(second=0, timezone=settings.TZ),
+            id=_DISPATCHER_JOB_ID,
+            name="签到分发",
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=30,
+        )
         scheduler.start()
         logger.info("调度器已启动")
 
 
 def shutdown_scheduler():
     """关闭调度器"""
+    global _delayed_task
     if scheduler.running:
         scheduler.shutdown(wait=False)
         logger.info("调度器已关闭")
+    if _delayed_task is not None:
+        _delayed_task.cancel()
+        _delayed_task = None
+    for _, future in _delayed_entries.values():
+        future.cancel()
+    _delayed_entries.clear()
+    _delayed.clear()
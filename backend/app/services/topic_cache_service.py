@@ -0,0 +1,175 @@
+"""关注超话列表缓存服务
+
+超话关注列表很少变化, 签到时优先使用 account_topics 表中的缓存,
+缓存超过 TOPIC_CACHE_TTL_HOURS 或签到发现未知超话时在后台刷新。
+"""
+
+import asyncio
+import contextvars
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.account_topic import AccountTopic
+from app.services.weibo_client import Topic, TopicListIncomplete, get_provider
+from app.utils.time import local_date_str
+
+logger = logging.getLogger(__name__)
+
+# 正在后台刷新的 (account_id, provider), 避免重复刷新; 同时持有 Task 引用防止被回收
+_refreshing: dict[tuple[int, str], asyncio.Task] = {}
+
+# 当日已签到的超话: {account_id: (本地日期, {container_id})}
+# 缓存的关注列表不含签到状态, 同一天重复触发 (手动/重试/GUI) 时据此跳过已签超话
+_signed_today: dict[int, tuple[str, set]] = {}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def cache_enabled() -> bool:
+    return settings.TOPIC_CACHE_TTL_HOURS > 0
+
+
+async def load_topics(
+    db: AsyncSession, account_id: int, provider_name: str
+) -> Tuple[List[Topic], Optional[datetime]]:
+    """
+    读取缓存的超话列表
+
+    返回:
+        (topics, refreshed_at) — refreshed_at 为最近一次刷新时间, 无缓存时为 None
+    """
+    result = await db.execute(
+        select(AccountTopic)
+        .where(AccountTopic.account_id == account_id, AccountTopic.provider == provider_name)
+        .order_by(AccountTopic.id)
+    )
+    rows = result.scalars().all()
+    if not rows:
+        return [], None
+
+    topics = [Topic(title=r.title, container_id=r.container_id, scheme=r.scheme or "") for r in rows]
+    return topics, max(r.last_seen for r in rows)
+
+
+def is_fresh(refreshed_at: Optional[datetime]) -> bool:
+    """缓存是否仍在 TTL 内"""
+    if refreshed_at is None:
+        return False
+    return _utcnow() - refreshed_at < timedelta(hours=settings.TOPIC_CACHE_TTL_HOURS)
+
+
+def mark_signed(account_id: int, container_ids: Iterable[str]):
+    """记录账号今天已签到 (或已签) 的超话"""
+    today = local_date_str()
+    day, signed = _signed_today.get(account_id, ("", set()))
+    if day != today:
+        signed = set()
+    signed.update(cid for cid in container_ids if cid)
+    _signed_today[account_id] = (today, signed)
+
+
+def apply_signed(account_id: int, topics: List[Topic]) -> int:
+    """把今天已签到的状态标记到 (缓存读取的) 超话上, 返回标记数量"""
+    day, signed = _signed_today.get(account_id, ("", set()))
+    if day != local_date_str() or not signed:
+        return 0
+    count = 0
+    for topic in topics:
+        if topic.container_id in signed:
+            topic.signed = True
+            count += 1
+    return count
+
+
+async def save_topics(db: AsyncSession, account_id: int, provider_name: str, topics: List[Topic]):
+    """
+    增量写入超话列表: 更新已有、新增缺失、删除已取关的超话
+
+    topics 必须是完整翻页得到的列表 (Provider.listing_complete): 不在其中的超话视为已取关并删除,
+    缓存的刷新时间前移。翻页中途失败的截断列表不能传入, 否则后续页的超话会在 TTL 内一直不签。
+    """
+    now = _utcnow()
+    result = await db.execute(
+        select(AccountTopic).where(
+            AccountTopic.account_id == account_id, AccountTopic.provider == provider_name
+        )
+    )
+    existing = {r.container_id: r for r in result.scalars().all()}
+
+    seen = set()
+    for topic in topics:
+        if not topic.container_id or topic.container_id in seen:
+            continue
+        seen.add(topic.container_id)
+
+        row = existing.get(topic.container_id)
+        if row:
+            row.title = topic.title
+            row.scheme = topic.scheme
+            row.last_seen = now
+        else:
+            db.add(AccountTopic(
+                account_id=account_id,
+                provider=provider_name,
+                container_id=topic.container_id,
+                title=topic.title,
+                scheme=topic.scheme,
+                last_seen=now,
+            ))
+
+    removed = [cid for cid in existing if cid not in seen]
+    if removed:
+        await db.execute(
+            delete(AccountTopic).where(
+                AccountTopic.account_id == account_id,
+                AccountTopic.provider == provider_name,
+                AccountTopic.container_id.in_(removed),
+            )
+        )
+
+    await db.commit()
+    logger.info(
+        f"超话缓存已更新: account={account_id}, provider={provider_name}, "
+        f"total={len(seen)}, removed={len(removed)}"
+    )
+
+
+async def _refresh(account_id: int, provider_name: str, sub: str, subp: str, twm: str):
+    try:
+        provider = get_provider(sub, subp, twm, provider_name=provider_name, account_id=account_id)
+        try:
+            topics = await provider.get_topics()
+        except TopicListIncomplete as e:
+            # 截断的列表不写入缓存, 旧缓存保持原刷新时间, 下次签到仍会触发刷新
+            logger.warning(f"后台刷新超话列表未完整获取, 保留旧缓存: account={account_id}: {e}")
+            return
+        if not topics:
+            # 获取失败时保留旧缓存, 等待下次刷新
+            logger.warning(f"后台刷新超话列表为空, 保留旧缓存: account={account_id}")
+            return
+        async with async_session() as db:
+            await save_topics(db, account_id, provider_name, topics)
+    except Exception as e:
+        logger.error(f"后台刷新超话列表失败: account={account_id}: {e}")
+    finally:
+        _refreshing.pop((account_id, provider_name), None)
+
+
+def schedule_refresh(account_id: int, provider_name: str, sub: str, subp: str, twm: str = ""):
+    """在后台刷新一个账号的超话列表缓存 (同一账号同时只刷新一次)"""
+    key = (account_id, provider_name)
+    if key in _refreshing:
+        return
+    logger.info(f"后台刷新超话列表: account={account_id}, provider={provider_name}")
+    # 在空白 context 中运行: 不继承触发它的签到运行的 run_timing 记录, 其请求不计入该次运行
+    _refreshing[key] = asyncio.create_task(
+        _refresh(account_id, provider_name, sub, subp, twm), context=contextvars.Context()
+    )
@@ -1,16 +1,24 @@
 """微博 API 请求适配层 - 双方案策略"""
 
+import asyncio
 import json
 import logging
 import re
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import List, Optional
-from urllib.parse import parse_qs, urlparse, unquote
+from functools import lru_cache
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Union
+from urllib.parse import unquote, unquote_plus
 
 import httpx
 
 from app.config import settings
+from app.services import circuit_breaker, http_capture, provider_stats, run_timing
+from app.utils import retry
+from app.utils.rate_limit import TokenBucket
+from app.utils.retry import RetryPolicy
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +35,8 @@ class Topic:
     title: str
     container_id: str
     scheme: str = ""
+    # 列表中已显示"已签/明日再来", 签到时直接记为 already 不再发请求 (当日状态, 不写入缓存)
+    signed: bool = False
 
 
 @dataclass
@@ -35,6 +45,92 @@ class CheckinResult:
     topic_title: str
     status: str  # success / already / failed
     detail: str = ""
+    # 失败类型 (仅 failed): transient / rate_limited / auth / permanent / unknown / circuit_open, 见 app.utils.retry
+    failure: str = ""
+    # 尝试次数、最后一次签到请求的上游耗时、含限速等待与重试退避的总耗时, 由 checkin_with_retry 填写
+    attempts: int = 0
+    latency_ms: int = 0
+    elapsed_ms: int = 0
+
+
+class TopicListIncomplete(Exception):
+    """超话列表翻页中途失败: 已 yield 的超话可以签到, 但列表不完整, 不能据此更新缓存"""
+
+
+# ─── 共享 HTTP 连接池 ───
+# 所有 Provider / Cookie 校验 / Server酱推送共用一个 AsyncClient,
+# 按 host 复用 keep-alive 连接, 避免每个超话都重新握手 TCP+TLS; 并共享按 host 的熔断状态。
+# Cookie 由各 Provider 通过请求头携带 (每账号独立), 客户端自身不保存任何 Cookie,
+# 防止 Set-Cookie 在不同账号之间串号。
+
+_http_client: Optional[httpx.AsyncClient] = None
+# 替换底层 transport (压测替身等工具使用), None 表示按配置创建
+_transport_override: Optional[httpx.AsyncBaseTransport] = None
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    http2 = settings.HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP2_ENABLED=true 但未安装 h2, 回退到 HTTP/1.1 (pip install httpx[http2])")
+            http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+    # allowed_domains=[] 拒绝保存任何响应 Cookie
+    cookie_jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+    transport: httpx.AsyncBaseTransport
+    if _transport_override is not None:
+        transport = _transport_override
+    elif settings.HTTP_CAPTURE_MODE == "replay":
+        transport = http_capture.ReplayTransport(
+            settings.HTTP_CAPTURE_PATH, latency_scale=settings.HTTP_REPLAY_LATENCY_SCALE
+        )
+    else:
+        transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+        if settings.HTTP_CAPTURE_MODE == "record":
+            transport = http_capture.RecordingTransport(transport, settings.HTTP_CAPTURE_PATH)
+    if settings.CIRCUIT_BREAKER_ENABLED:
+        # 熔断在最外层: 熔断中的请求既不发出也不录制
+        transport = circuit_breaker.CircuitBreakerTransport(transport)
+
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=15,
+        cookies=cookie_jar,
+        headers={"User-Agent": MOBILE_UA},
+        # 按签到阶段统计请求数 (见 run_timing)
+        event_hooks={"request": [run_timing.on_request]},
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取进程级共享 HTTP 客户端 (惰性创建)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _build_http_client()
+    return _http_client
+
+
+async def set_http_transport(transport: Optional[httpx.AsyncBaseTransport]):
+    """替换共享客户端的底层 transport (如本地压测替身), 传 None 恢复默认"""
+    global _transport_override
+    await close_http_client()
+    _transport_override = transport
+
+
+async def close_http_client():
+    """关闭共享 HTTP 客户端, 由应用 lifespan 在退出时调用"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
 
 
 def _build_cookies(sub: str, subp: str, twm: str = "") -> str:
@@ -53,10 +149,121 @@ def _get_api_params() -> dict:
         return {}
 
 
+# 签到失败信息中表示"超话未关注/不存在"的关键字, 命中时需刷新超话列表缓存
+UNKNOWN_TOPIC_HINTS = ("未关注", "请先关注", "不存在", "not follow")
+
+
+def is_unknown_topic(result: CheckinResult) -> bool:
+    """签到结果是否表明该超话已不在关注列表中"""
+    return result.status == "failed" and any(h in result.detail for h in UNKNOWN_TOPIC_HINTS)
+
+
+# 签到失败信息关键字 -> 失败类型 (按顺序匹配)
+_FAILURE_HINTS = (
+    (retry.RATE_LIMITED, ("频繁", "太快", "稍后再试", "too many", "rate limit")),
+    (retry.AUTH, ("登录", "login", "cookie", "gsid", "token")),
+    (retry.PERMANENT, UNKNOWN_TOPIC_HINTS + ("参数错误", "参数异常", "非法", "invalid", "无权限", "封禁")),
+    (retry.TRANSIENT, ("系统繁忙", "服务繁忙", "网络", "timeout", "超时")),
+)
+
+
+def classify_message(msg: str) -> str:
+    """按上游返回的失败信息判断失败类型"""
+    lowered = msg.lower()
+    for failure, hints in _FAILURE_HINTS:
+        if any(h in lowered for h in hints):
+            return failure
+    return retry.UNKNOWN
+
+
+def classify_exception(e: Exception) -> str:
+    """按请求异常判断失败类型"""
+    if isinstance(e, httpx.HTTPStatusError):
+        code = e.response.status_code
+        if code == 429:
+            return retry.RATE_LIMITED
+        if code in (401, 403):
+            return retry.AUTH
+        if code >= 500:
+            return retry.TRANSIENT
+        return retry.PERMANENT
+    if isinstance(e, circuit_breaker.CircuitOpenError):
+        return retry.CIRCUIT_OPEN
+    if isinstance(e, httpx.TransportError):
+        # 超时、连接失败等
+        return retry.TRANSIENT
+    return retry.UNKNOWN
+
+
+def failed_result(title: str, detail: str, failure: str = "") -> CheckinResult:
+    """构造失败结果; 未指定类型时按失败信息归类"""
+    return CheckinResult(
+        topic_title=title, status="failed", detail=detail, failure=failure or classify_message(detail)
+    )
+
+
+# ─── 列表解析 ───
+# 以下函数在每页的每个超话上调用, 避免逐个 urlparse/parse_qs:
+# 预编译正则直接定位参数, 并按 scheme/action 缓存结果 (关注列表每天基本不变)。
+# 改动后请用 perf/bench_parsers.py 对比基线耗时并校验结果一致。
+
+PARSE_CACHE_SIZE = 4096
+
+# query/fragment 中的 containerid 参数
+_CONTAINERID_PARAM_RE = re.compile(r"[?&#]containerid=([^&#]+)")
+# 兜底: scheme 任意位置的 containerid=
+_CONTAINERID_ANY_RE = re.compile(r"containerid=([^&]+)")
+_REQUEST_URL_PARAM_RE = re.compile(r"[?&]request_url=([^&#]+)")
+SIGNED_BUTTON_NAMES = frozenset(("已签", "已签到", "明日再来"))
+
+
+def has_signed_button(buttons) -> bool:
+    """列表项按钮是否显示今日已签到"""
+    return any(
+        isinstance(b, dict) and str(b.get("name", "")).strip() in SIGNED_BUTTON_NAMES
+        for b in buttons or ()
+    )
+
+
+def _qs_unquote(value: str) -> str:
+    """与 parse_qs 相同的参数值解码 (+ 视为空格)"""
+    return unquote_plus(value) if "%" in value or "+" in value else value
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def extract_containerid(scheme: str) -> Optional[str]:
+    """从 scheme URL 提取 containerid (query 优先, 其次 fragment, 最后任意位置)"""
+    if not scheme:
+        return None
+    match = _CONTAINERID_PARAM_RE.search(scheme)
+    if match:
+        return _qs_unquote(match.group(1))
+    match = _CONTAINERID_ANY_RE.search(scheme)
+    return match.group(1) if match else None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def extract_request_url(action: str) -> str:
+    """从 topicsub 按钮 action 中提取 request_url, 兼容直接/嵌套两种格式"""
+    if not action:
+        return ""
+    match = _REQUEST_URL_PARAM_RE.search(action)
+    if match:
+        return unquote(_qs_unquote(match.group(1)))
+    return action
+
+
 class BaseProvider(ABC):
     """签到策略基类"""
 
-    def __init__(self, sub: str, subp: str, twm: str = ""):
+    name: str = ""
+    # 超话列表是否可以跨天缓存 (不含当日签到状态)
+    cacheable: bool = True
+    # 最近一次 iter_topics 是否完整翻完所有页 (只有完整列表才能写入缓存)
+    listing_complete: bool = False
+
+    def __init__(self, sub: str, subp: str, twm: str = "", account_id: int = 0):
+        self.account_id = account_id
         self.cookie_str = _build_cookies(sub, subp, twm)
         self.api_params = _get_api_params()
         self.headers = {
@@ -64,16 +271,151 @@ class BaseProvider(ABC):
             "Cookie": self.cookie_str,
         }
 
+    async def _request(self, method: str, url: str, timeout: float = 10, **kwargs) -> httpx.Response:
+        """通过共享连接池发送请求, 携带本账号的 Cookie"""
+        client = get_http_client()
+        return await client.request(method, url, headers=self.headers, timeout=timeout, **kwargs)
+
+    async def _request_page(self, method: str, url: str, timeout: float = 15, **kwargs) -> httpx.Response:
+        """拉取超话列表的一页, 耗时计入本次运行的翻页记录"""
+        with run_timing.page():
+            return await self._request(method, url, timeout=timeout, **kwargs)
+
     @abstractmethod
-    async def get_topics(self) -> List[Topic]:
-        """获取所有关注的超话列表"""
+    def _iter_topics(self) -> AsyncIterator[Topic]:
+        """分页拉取关注的超话, 每解析完一页即逐个 yield (由各 Provider 实现)"""
         ...
 
+    async def iter_topics(self) -> AsyncIterator[Topic]:
+        """
+        流式获取关注的超话列表, 并把耗时与结果计入 Provider 计分板
+
+        翻页失败时抛出 TopicListIncomplete; 只有完整翻完时 listing_complete 才为 True。
+        """
+        start = time.monotonic()
+        count = 0
+        self.listing_complete = False
+        try:
+            async for topic in self._iter_topics():
+                count += 1
+                yield topic
+        except Exception as e:
+            provider_stats.record(
+                self.name, self.account_id, "get_topics", False, time.monotonic() - start, type(e).__name__
+            )
+            raise
+        self.listing_complete = True
+        provider_stats.record(
+            self.name, self.account_id, "get_topics", count > 0, time.monotonic() - start,
+            "" if count else "empty",
+        )
+
+    async def get_topics(self) -> List[Topic]:
+        """获取所有关注的超话列表 (翻页中途失败时抛出 TopicListIncomplete, 不返回截断的列表)"""
+        return [topic async for topic in self.iter_topics()]
+
     @abstractmethod
     async def checkin(self, topic: Topic) -> CheckinResult:
         """对一个超话执行签到"""
         ...
 
+    async def checkin_with_retry(
+        self,
+        topic: Topic,
+        retry_count: int = 1,
+        limiter: Optional[TokenBucket] = None,
+        policy: Optional[RetryPolicy] = None,
+    ) -> CheckinResult:
+        """
+        签到单个超话, 按失败类型决定是否重试, 每次请求前先从限速器取令牌
+
+        未关注/参数错误/Cookie 失效/上游熔断等不可重试的失败直接返回; 可重试的失败按 policy 指数退避 + 抖动。
+        列表已显示已签到的超话直接返回 already, 不占用令牌也不发请求。
+        """
+        if topic.signed:
+            return CheckinResult(topic_title=topic.title, status="already", detail="今日已签到 (列表状态)")
+
+        policy = policy or default_retry_policy(retry_count)
+        attempt = 0
+        first_start = time.monotonic()
+        while True:
+            if limiter:
+                await limiter.acquire()
+            start = time.monotonic()
+            result = await self.checkin(topic)
+            attempt += 1
+            result.attempts = attempt
+            result.latency_ms = round((time.monotonic() - start) * 1000)
+            result.elapsed_ms = round((time.monotonic() - first_start) * 1000)
+            if result.status == "failed" and not result.failure:
+                result.failure = classify_message(result.detail)
+            # 未关注/Cookie 失效与接口本身无关, 熔断时请求未发出, 均不计入 Provider 健康度
+            if result.failure not in (retry.PERMANENT, retry.AUTH, retry.CIRCUIT_OPEN):
+                provider_stats.record(
+                    self.name, self.account_id, "checkin", result.status != "failed",
+                    time.monotonic() - start, result.detail,
+                )
+            if result.status != "failed" or not policy.should_retry(result.failure, attempt):
+                return result
+            # Provider 已被降级时不再重试, 避免整轮都在重试一个故障接口
+            if provider_stats.is_demoted(self.name, self.account_id):
+                return result
+            delay = policy.delay(result.failure, attempt)
+            logger.debug(f"{self.name}: [{topic.title}] {result.failure} 失败, {delay:.1f}s 后第 {attempt + 1} 次尝试")
+            await asyncio.sleep(delay)
+
+    async def checkin_many(
+        self,
+        topics: Union[List[Topic], AsyncIterable[Topic]],
+        concurrency: int = 1,
+        limiter: Optional[TokenBucket] = None,
+        retry_count: int = 1,
+        policy: Optional[RetryPolicy] = None,
+        on_result: Optional[Callable[[int, Topic, CheckinResult], Awaitable[None]]] = None,
+    ) -> List[Tuple[Topic, CheckinResult]]:
+        """
+        批量签到: 同时保持 concurrency 个签到在途, 由令牌桶控制整体速率
+
+        topics 可以是列表, 也可以是 iter_topics() 这样的异步迭代器 —— 后者边翻页边签到。
+        返回按超话原始顺序排列的 (topic, result); on_result(idx, topic, result) 在每个超话完成时回调
+        """
+        workers = max(concurrency, 1)
+        # 有界队列: 签到跟不上时暂停翻页, 内存占用不随关注数增长
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+        results: dict[int, Tuple[Topic, CheckinResult]] = {}
+
+        async def producer():
+            try:
+                if isinstance(topics, list):
+                    for idx, topic in enumerate(topics):
+                        await queue.put((idx, topic))
+                else:
+                    idx = 0
+                    async for topic in topics:
+                        await queue.put((idx, topic))
+                        idx += 1
+            except Exception as e:
+                logger.error(f"{self.name}: 获取超话列表中断: {e}")
+            # 只在正常结束 (含翻页中断) 时通知 worker 退出; worker 或 on_result 异常时本任务被 TaskGroup 取消,
+            # 此时队列可能已满且无人消费, 不能再 put
+            for _ in range(workers):
+                await queue.put(None)
+
+        async def worker():
+            while (item := await queue.get()) is not None:
+                idx, topic = item
+                result = await self.checkin_with_retry(topic, retry_count, limiter, policy)
+                results[idx] = (topic, result)
+                if on_result:
+                    await on_result(idx, topic, result)
+
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(producer())
+            for _ in range(workers):
+                tg.create_task(worker())
+
+        return [results[idx] for idx in sorted(results)]
+
 
 class CardlistProvider(BaseProvider):
     """
@@ -81,63 +423,73 @@ class CardlistProvider(BaseProvider):
     - GET /2/cardlist -> 提取 scheme -> 构造 request_url -> GET /2/page/button
     """
 
+    name = "cardlist"
     CARDLIST_URL = "https://api.weibo.cn/2/cardlist"
     PAGE_BUTTON_URL = "https://api.weibo.cn/2/page/button"
 
-    async def get_topics(self) -> List[Topic]:
-        topics = []
+    async def _iter_topics(self) -> AsyncIterator[Topic]:
+        count = 0
+        page = 0
         since_id = ""
 
-        async with httpx.AsyncClient(timeout=15, headers=self.headers) as client:
-            while True:
-                params = {
-                    **self.api_params,
-                    "containerid": "100803_-_followsuper",
-                    "fid": "100803_-_followsuper",
-                    "page_type": "08",
-                    "since_id": since_id,
-                }
-                try:
-                    resp = await client.get(self.CARDLIST_URL, params=params)
-                    resp.raise_for_status()
-                    data = resp.json()
-                except Exception as e:
-                    logger.error(f"获取超话列表失败: {e}")
-                    break
-
-                cards = data.get("cards", [])
-                logger.info(f"CardlistProvider: 第{len(topics)//10+1}页, cards数量={len(cards)}")
-                if not cards:
-                    # 记录原始响应帮助排查
-                    logger.info(f"CardlistProvider: 无cards返回, 原始响应keys={list(data.keys())}, ok={data.get('ok')}, msg={data.get('msg', '')}")
-                    break
-
-                for card in cards:
-                    card_group = card.get("card_group", [])
-                    for item in card_group:
-                        card_type = item.get("card_type")
-                        # card_type 可能是 int 或 str
-                        if str(card_type) == "8":
-                            scheme = item.get("scheme", "")
-                            title = item.get("title_sub", "未知超话")
-                            # 从 scheme 提取 containerid
-                            cid = self._extract_containerid(scheme)
-                            if cid:
-                                topics.append(Topic(title=title, container_id=cid, scheme=scheme))
-                            else:
-                                logger.warning(f"CardlistProvider: 超话 [{title}] 无法提取containerid, scheme={scheme[:100]}")
-
-                # 分页
-                cardlist_info = data.get("cardlistInfo", {})
-                new_since_id = cardlist_info.get("since_id", "")
-                if not new_since_id or new_since_id == since_id:
-                    break
-                since_id = new_since_id
-
-        logger.info(f"CardlistProvider: 获取到 {len(topics)} 个超话")
-        return topics
+        while True:
+            params = {
+                **self.api_params,
+                "containerid": "100803_-_followsuper",
+                "fid": "100803_-_followsuper",
+                "page_type": "08",
+                "since_id": since_id,
+            }
+            try:
+                resp = await self._request_page("GET", self.CARDLIST_URL, params=params)
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                logger.error(f"获取超话列表失败: {e}")
+                raise TopicListIncomplete(f"第 {page + 1} 页获取失败 (已获取 {count} 个): {e}") from e
+
+            cards = data.get("cards", [])
+            page += 1
+            logger.info(f"CardlistProvider: 第{page}页, cards数量={len(cards)}")
+            if not cards:
+                # 记录原始响应帮助排查
+                logger.info(f"CardlistProvider: 无cards返回, 原始响应keys={list(data.keys())}, ok={data.get('ok')}, msg={data.get('msg', '')}")
+                if since_id and data.get("ok") == 0:
+                    # 翻页途中返回错误, 已获取的列表不完整
+                    raise TopicListIncomplete(f"第 {page} 页返回 ok=0 (已获取 {count} 个): {data.get('msg', '')}")
+                break
+
+            for card in cards:
+                card_group = card.get("card_group", [])
+                for item in card_group:
+                    # card_type 可能是 int 或 str
+                    if item.get("card_type") in (8, "8"):
+                        scheme = item.get("scheme", "")
+                        title = item.get("title_sub", "未知超话")
+                        # 从 scheme 提取 containerid
+                        cid = self._extract_containerid(scheme)
+                        if cid:
+                            count += 1
+                            yield Topic(
+                                title=title, container_id=cid, scheme=scheme,
+                                signed=has_signed_button(item.get("buttons")),
+                            )
+                        else:
+                            logger.warning(f"CardlistProvider: 超话 [{title}] 无法提取containerid, scheme={scheme[:100]}")
+
+            # 分页
+            cardlist_info = data.get("cardlistInfo", {})
+            new_since_id = cardlist_info.get("since_id", "")
+            if not new_since_id or new_since_id == since_id:
+                break
+            since_id = new_since_id
+
+        logger.info(f"CardlistProvider: 获取到 {count} 个超话")
 
     async def checkin(self, topic: Topic) -> CheckinResult:
+        if not topic.container_id:
+            return failed_result(topic.title, "缺少 containerid", retry.PERMANENT)
+
         request_url = (
             f"http://i.huati.weibo.com/mobile/super/active_fcheckin"
             f"?cardid=bottom_one_checkin"
@@ -153,38 +505,19 @@ class CardlistProvider(BaseProvider):
         }
 
         try:
-            async with httpx.AsyncClient(timeout=10, headers=self.headers) as client:
-                resp = await client.get(self.PAGE_BUTTON_URL, params=params)
-                resp.raise_for_status()
-                data = resp.json()
+            resp = await self._request("GET", self.PAGE_BUTTON_URL, params=params)
+            resp.raise_for_status()
+            data = resp.json()
 
             return self._parse_result(topic.title, data)
         except Exception as e:
             logger.error(f"签到失败 [{topic.title}]: {e}")
-            return CheckinResult(topic_title=topic.title, status="failed", detail=str(e))
+            return failed_result(topic.title, str(e), classify_exception(e))
 
     @staticmethod
     def _extract_containerid(scheme: str) -> Optional[str]:
         """从 scheme URL 提取 containerid"""
-        try:
-            parsed = urlparse(scheme)
-            qs = parse_qs(parsed.query)
-            cid_list = qs.get("containerid", [])
-            if cid_list:
-                return cid_list[0]
-            # 尝试从 fragment 提取
-            if parsed.fragment:
-                qs2 = parse_qs(parsed.fragment)
-                cid_list2 = qs2.get("containerid", [])
-                if cid_list2:
-                    return cid_list2[0]
-            # 尝试正则
-            match = re.search(r"containerid=([^&]+)", scheme)
-            if match:
-                return match.group(1)
-        except Exception:
-            pass
-        return None
+        return extract_containerid(scheme)
 
     @staticmethod
     def _parse_result(title: str, data: dict) -> CheckinResult:
@@ -197,7 +530,7 @@ class CardlistProvider(BaseProvider):
         elif result == 1 or "签到成功" in msg or "success" in msg:
             return CheckinResult(topic_title=title, status="success", detail=msg)
         else:
-            return CheckinResult(topic_title=title, status="failed", detail=msg or str(data))
+            return failed_result(title, msg or str(data))
 
 
 class TopicsubProvider(BaseProvider):
@@ -207,23 +540,14 @@ class TopicsubProvider(BaseProvider):
     - POST /2/page/button
     """
 
+    name = "topicsub"
     TOPICSUB_URL = "https://api.weibo.cn/2/statuses/container_timeline_topicsub"
     PAGE_BUTTON_URL = "https://api.weibo.cn/2/page/button"
 
     @staticmethod
     def _extract_request_url(action: str) -> str:
         """从 action 中提取 request_url，兼容直接/嵌套两种格式。"""
-        if not action:
-            return ""
-        try:
-            parsed = urlparse(action)
-            qs = parse_qs(parsed.query)
-            req = (qs.get("request_url") or [""])[0]
-            if req:
-                return unquote(req)
-        except Exception:
-            pass
-        return action
+        return extract_request_url(action)
 
     @staticmethod
     def _extract_container_id(item_data: dict, button: dict) -> str:
@@ -235,59 +559,64 @@ class TopicsubProvider(BaseProvider):
             or params.get("ext_uid", "")
         )
 
-    async def get_topics(self) -> List[Topic]:
-        topics = []
+    async def _iter_topics(self) -> AsyncIterator[Topic]:
+        count = 0
         since_id = ""
 
-        async with httpx.AsyncClient(timeout=15, headers=self.headers) as client:
-            while True:
-                params = {**self.api_params}
-                body = {
-                    "flowId": "232478_-_one_checkin",
-                    "since_id": since_id,
-                }
-                try:
-                    resp = await client.post(self.TOPICSUB_URL, params=params, json=body)
-                    resp.raise_for_status()
-                    data = resp.json()
-                except Exception as e:
-                    logger.error(f"获取超话列表失败: {e}")
-                    break
-
-                items = data.get("items", [])
-                logger.info(f"TopicsubProvider: items数量={len(items)}")
-                if not items:
-                    logger.info(f"TopicsubProvider: 无items返回, 原始响应keys={list(data.keys())}, ok={data.get('ok')}, msg={data.get('msg', '')}")
-                    break
-
-                for item_group in items:
-                    sub_items = item_group.get("items", [])
-                    for item in sub_items:
-                        item_data = item.get("data", {})
-                        buttons = item_data.get("buttons", [])
-                        title = item_data.get("title_sub", "未知超话")
-
-                        for btn in buttons:
-                            params = btn.get("params", {}) if isinstance(btn, dict) else {}
-                            action = btn.get("action", "") or params.get("action", "")
-                            cid = self._extract_container_id(item_data, btn)
-                            if action and cid:
-                                request_url = self._extract_request_url(action)
-                                topics.append(Topic(title=title, container_id=cid, scheme=request_url))
-                                break
-
-                # 分页
-                new_since_id = data.get("since_id", "")
-                if not new_since_id or new_since_id == since_id:
-                    break
-                since_id = new_since_id
-
-        logger.info(f"TopicsubProvider: 获取到 {len(topics)} 个超话")
-        return topics
+        while True:
+            params = {**self.api_params}
+            body = {
+                "flowId": "232478_-_one_checkin",
+                "since_id": since_id,
+            }
+            try:
+                resp = await self._request_page("POST", self.TOPICSUB_URL, params=params, json=body)
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                logger.error(f"获取超话列表失败: {e}")
+                raise TopicListIncomplete(f"翻页失败 (已获取 {count} 个): {e}") from e
+
+            items = data.get("items", [])
+            logger.info(f"TopicsubProvider: items数量={len(items)}")
+            if not items:
+                logger.info(f"TopicsubProvider: 无items返回, 原始响应keys={list(data.keys())}, ok={data.get('ok')}, msg={data.get('msg', '')}")
+                if since_id and data.get("ok") == 0:
+                    # 翻页途中返回错误, 已获取的列表不完整
+                    raise TopicListIncomplete(f"翻页返回 ok=0 (已获取 {count} 个): {data.get('msg', '')}")
+                break
+
+            for item_group in items:
+                sub_items = item_group.get("items", [])
+                for item in sub_items:
+                    item_data = item.get("data", {})
+                    buttons = item_data.get("buttons", [])
+                    title = item_data.get("title_sub", "未知超话")
+                    signed = has_signed_button(buttons)
+
+                    for btn in buttons:
+                        params = btn.get("params", {}) if isinstance(btn, dict) else {}
+                        action = btn.get("action", "") or params.get("action", "")
+                        cid = self._extract_container_id(item_data, btn)
+                        if action and cid:
+                            request_url = self._extract_request_url(action)
+                            count += 1
+                            yield Topic(title=title, container_id=cid, scheme=request_url, signed=signed)
+                            break
+
+            # 分页
+            new_since_id = data.get("since_id", "")
+            if not new_since_id or new_since_id == since_id:
+                break
+            since_id = new_since_id
+
+        logger.info(f"TopicsubProvider: 获取到 {count} 个超话")
 
     async def checkin(self, topic: Topic) -> CheckinResult:
         # 从 action/scheme 中提取 request_url
         request_url = topic.scheme
+        if not request_url or not topic.container_id:
+            return failed_result(topic.title, "缺少 request_url 或 container_id", retry.PERMANENT)
 
         # 兼容微博接口变更: 同时透传 query 与 body
         params = {
@@ -303,10 +632,9 @@ class TopicsubProvider(BaseProvider):
         }
 
         try:
-            async with httpx.AsyncClient(timeout=10, headers=self.headers) as client:
-                resp = await client.post(self.PAGE_BUTTON_URL, params=params, json=body)
-                resp.raise_for_status()
-                data = resp.json()
+            resp = await self._request("POST", self.PAGE_BUTTON_URL, params=params, json=body)
+            resp.raise_for_status()
+            data = resp.json()
 
             result = data.get("result")
             msg = str(data.get("msg", ""))
@@ -316,11 +644,11 @@ class TopicsubProvider(BaseProvider):
             elif result == 1:
                 return CheckinResult(topic_title=topic.title, status="success", detail=msg)
             else:
-                return CheckinResult(topic_title=topic.title, status="failed", detail=msg or str(data))
+                return failed_result(topic.title, msg or str(data))
 
         except Exception as e:
             logger.error(f"签到失败 [{topic.title}]: {e}")
-            return CheckinResult(topic_title=topic.title, status="failed", detail=str(e))
+            return failed_result(topic.title, str(e), classify_exception(e))
 
 
 class MWeiboProvider(BaseProvider):
@@ -331,11 +659,14 @@ class MWeiboProvider(BaseProvider):
     - GET /api/container/button?... 执行签到
     """
 
+    name = "mweibo"
+    # 签到 scheme 与已签状态按天变化, 不缓存
+    cacheable = False
     GETINDEX_URL = "https://m.weibo.cn/api/container/getIndex"
     BASE_URL = "https://m.weibo.cn"
 
-    def __init__(self, sub: str, subp: str, twm: str = ""):
-        super().__init__(sub, subp, twm)
+    def __init__(self, sub: str, subp: str, twm: str = "", account_id: int = 0):
+        super().__init__(sub, subp, twm, account_id)
         self.headers.update(
             {
                 "Referer": "https://m.weibo.cn/p/index?containerid=100803_-_followsuper",
@@ -343,76 +674,81 @@ class MWeiboProvider(BaseProvider):
             }
         )
 
-    async def get_topics(self) -> List[Topic]:
-        topics: List[Topic] = []
+    async def _iter_topics(self) -> AsyncIterator[Topic]:
+        count = 0
         since_id = ""
 
-        async with httpx.AsyncClient(timeout=15, headers=self.headers) as client:
-            while True:
-                params = {"containerid": "100803_-_followsuper"}
+        while True:
+            params = {"containerid": "100803_-_followsuper"}
+            if since_id:
+                params["since_id"] = since_id
+
+            try:
+                resp = await self._request_page("GET", self.GETINDEX_URL, params=params)
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                logger.error(f"MWeiboProvider 获取超话列表失败: {e}")
+                raise TopicListIncomplete(f"翻页失败 (已获取 {count} 个): {e}") from e
+
+            if data.get("ok") != 1:
+                logger.info(
+                    "MWeiboProvider: 接口返回非ok, "
+                    f"ok={data.get('ok')}, msg={data.get('msg', '')}"
+                )
                 if since_id:
-                    params["since_id"] = since_id
-
-                try:
-                    resp = await client.get(self.GETINDEX_URL, params=params)
-                    resp.raise_for_status()
-                    data = resp.json()
-                except Exception as e:
-                    logger.error(f"MWeiboProvider 获取超话列表失败: {e}")
-                    break
-
-                if data.get("ok") != 1:
-                    logger.info(
-                        "MWeiboProvider: 接口返回非ok, "
-                        f"ok={data.get('ok')}, msg={data.get('msg', '')}"
-                    )
-                    break
-
-                payload = data.get("data", {})
-                cards = payload.get("cards", [])
-                logger.info(f"MWeiboProvider: cards数量={len(cards)}")
-                if not cards:
-                    break
-
-                for card in cards:
-                    card_group = card.get("card_group", [])
-                    if card_group:
-                        for item in card_group:
-                            topic = self._parse_topic_item(item)
-                            if topic:
-                                topics.append(topic)
-                    else:
-                        topic = self._parse_topic_item(card)
+                    # 翻页途中返回错误, 已获取的列表不完整
+                    raise TopicListIncomplete(f"翻页返回 ok={data.get('ok')} (已获取 {count} 个)")
+                break
+
+            payload = data.get("data", {})
+            cards = payload.get("cards", [])
+            logger.info(f"MWeiboProvider: cards数量={len(cards)}")
+            if not cards:
+                break
+
+            for card in cards:
+                card_group = card.get("card_group", [])
+                if card_group:
+                    for item in card_group:
+                        topic = self._parse_topic_item(item)
                         if topic:
-                            topics.append(topic)
+                            count += 1
+                            yield topic
+                else:
+                    topic = self._parse_topic_item(card)
+                    if topic:
+                        count += 1
+                        yield topic
 
-                new_since_id = payload.get("cardlistInfo", {}).get("since_id", "")
-                if not new_since_id or new_since_id == since_id:
-                    break
-                since_id = new_since_id
+            new_since_id = payload.get("cardlistInfo", {}).get("since_id", "")
+            if not new_since_id or new_since_id == since_id:
+                break
+            since_id = new_since_id
 
-        logger.info(f"MWeiboProvider: 获取到 {len(topics)} 个超话")
-        return topics
+        logger.info(f"MWeiboProvider: 获取到 {count} 个超话")
 
-    def _parse_topic_item(self, item: dict) -> Optional[Topic]:
-        title = item.get("title_sub") or item.get("title") or "未知超话"
-        buttons = item.get("buttons", []) or []
+    @staticmethod
+    def _parse_topic_item(item: dict) -> Optional[Topic]:
+        buttons = item.get("buttons") or []
         if not buttons:
             return None
 
-        # 优先找可签到按钮
+        # 优先找可签到按钮; 无可签到按钮但存在“已签/明日再来”等状态时，保留为已签到项
+        signed = False
         for b in buttons:
             name = str(b.get("name", "")).strip()
-            scheme = b.get("scheme", "")
-            if name == "签到" and scheme:
-                return Topic(title=title, container_id="", scheme=scheme)
-
-        # 无可签到按钮但存在“已签/明日再来”等状态时，保留为已签到项
-        for b in buttons:
-            name = str(b.get("name", "")).strip()
-            if name in ("已签", "已签到", "明日再来"):
-                return Topic(title=title, container_id="", scheme="")
-
+            if name == "签到":
+                scheme = b.get("scheme", "")
+                if scheme:
+                    title = item.get("title_sub") or item.get("title") or "未知超话"
+                    return Topic(title=title, container_id="", scheme=scheme)
+            elif name in SIGNED_BUTTON_NAMES:
+                signed = True
+
+        if signed:
+            title = item.get("title_sub") or item.get("title") or "未知超话"
+            return Topic(title=title, container_id="", scheme="", signed=True)
         return None
 
     async def checkin(self, topic: Topic) -> CheckinResult:
@@ -423,12 +759,13 @@ class MWeiboProvider(BaseProvider):
         sign_url = topic.scheme
         if sign_url.startswith("/"):
             sign_url = f"{self.BASE_URL}{sign_url}"
+        elif not sign_url.startswith(("http://", "https://")):
+            return failed_result(topic.title, f"无效的签到链接: {sign_url[:60]}", retry.PERMANENT)
 
         try:
-            async with httpx.AsyncClient(timeout=10, headers=self.headers) as client:
-                resp = await client.get(sign_url)
-                resp.raise_for_status()
-                data = resp.json()
+            resp = await self._request("GET", sign_url)
+            resp.raise_for_status()
+            data = resp.json()
 
             ok = data.get("ok")
             msg = str((data.get("data") or {}).get("msg") or data.get("msg") or "")
@@ -439,20 +776,31 @@ class MWeiboProvider(BaseProvider):
             if ok == 1 and ("成功" in msg or "签到" in msg or msg == ""):
                 return CheckinResult(topic_title=topic.title, status="success", detail=msg or "签到成功")
 
-            return CheckinResult(topic_title=topic.title, status="failed", detail=msg or str(data))
+            return failed_result(topic.title, msg or str(data))
 
         except Exception as e:
             logger.error(f"MWeiboProvider 签到失败 [{topic.title}]: {e}")
-            return CheckinResult(topic_title=topic.title, status="failed", detail=str(e))
+            return failed_result(topic.title, str(e), classify_exception(e))
+
+
+def default_retry_policy(retry_count: int) -> RetryPolicy:
+    """按账号 retry_count 与全局退避配置构造签到重试策略"""
+    return RetryPolicy(
+        max_attempts=max(retry_count, 1),
+        base_delay=settings.CHECKIN_RETRY_BASE_DELAY,
+        max_delay=settings.CHECKIN_RETRY_MAX_DELAY,
+    )
 
 
-def get_provider(sub: str, subp: str, twm: str = "", provider_name: str = "") -> BaseProvider:
+def get_provider(
+    sub: str, subp: str, twm: str = "", provider_name: str = "", account_id: int = 0
+) -> BaseProvider:
     """工厂函数: 获取签到策略 Provider"""
     name = provider_name or settings.CHECKIN_PROVIDER
 
     if name == "topicsub":
-        return TopicsubProvider(sub, subp, twm)
+        return TopicsubProvider(sub, subp, twm, account_id)
     if name == "mweibo":
-        return MWeiboProvider(sub, subp, twm)
+        return MWeiboProvider(sub, subp, twm, account_id)
     else:
-        return CardlistProvider(sub, subp, twm)
+        return CardlistProvider(sub, subp, twm, account_id)
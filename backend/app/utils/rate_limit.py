@@ -0,0 +1,35 @@
+"""限速工具: 异步令牌桶"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    异步令牌桶
+
+    - rate: 每秒补充的令牌数, <= 0 表示不限速
+    - capacity: 桶容量, 即允许的瞬时突发请求数
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """取一个令牌, 桶空时等待补充"""
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
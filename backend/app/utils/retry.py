@@ -0,0 +1,44 @@
+"""重试策略: 按失败类型决定是否重试, 指数退避 + 抖动"""
+
+import random
+from dataclasses import dataclass
+
+# 失败类型 (CheckinResult.failure)
+TRANSIENT = "transient"        # 超时 / 连接失败 / 5xx
+RATE_LIMITED = "rate_limited"  # 429 / 操作频繁
+AUTH = "auth"                  # Cookie 失效 / 未登录
+PERMANENT = "permanent"        # 未关注 / 参数错误等, 重试不会成功
+UNKNOWN = "unknown"            # 无法识别的失败信息
+CIRCUIT_OPEN = "circuit_open"  # 上游熔断中, 请求未发出; 熔断期间重试只会再次快速失败
+
+FAILURE_CLASSES = (TRANSIENT, RATE_LIMITED, AUTH, PERMANENT, UNKNOWN, CIRCUIT_OPEN)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    重试策略
+
+    - max_attempts: 含首次在内的最大尝试次数
+    - 第 n 次重试前等待 base_delay * multiplier^(n-1), 上限 max_delay;
+      限流类失败额外乘以 rate_limited_factor
+    - 采用 equal jitter: 实际等待在 [d/2, d] 内随机, 避免多个账号同时重试
+    """
+    max_attempts: int = 1
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    rate_limited_factor: float = 4.0
+    retryable: frozenset = frozenset((TRANSIENT, RATE_LIMITED, UNKNOWN))
+
+    def should_retry(self, failure: str, attempt: int) -> bool:
+        """attempt 为已完成的尝试次数 (从 1 开始)"""
+        return attempt < self.max_attempts and (failure or UNKNOWN) in self.retryable
+
+    def delay(self, failure: str, attempt: int) -> float:
+        """第 attempt 次尝试失败后, 下一次重试前的等待秒数"""
+        d = self.base_delay * self.multiplier ** max(attempt - 1, 0)
+        if failure == RATE_LIMITED:
+            d *= self.rate_limited_factor
+        d = min(d, self.max_delay)
+        return d / 2 + random.uniform(0, d / 2)
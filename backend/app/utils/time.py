@@ -8,6 +8,11 @@ from zoneinfo import ZoneInfo
 from app.config import settings
 
 
+def local_date_str(tz_name: str | None = None) -> str:
+    """当前本地日期 (默认 settings.TZ), 格式 YYYY-MM-DD。"""
+    return datetime.now(ZoneInfo(tz_name or settings.TZ)).date().isoformat()
+
+
 def to_tz_iso(dt: datetime | None, tz_name: str | None = None) -> str:
     """将 datetime 统一序列化为带时区的 ISO 字符串。
 
@@ -0,0 +1 @@
+"""性能工具: 本地上游替身、压测与基准 (不随应用部署)"""
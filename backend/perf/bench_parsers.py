@@ -0,0 +1,258 @@
+"""Provider 响应解析微基准
+
+用法 (在 backend/ 目录下):
+
+    python -m perf.bench_parsers --sizes 10,100,500,2000 --repeat 5
+
+语料由 perf.fake_upstream 的 payload 构造函数生成 (与线上响应结构一致), 外加一组边界 scheme。
+对每个解析函数分别计时:
+- baseline:  改造前的实现 (urlparse/parse_qs + 正则兜底), 原样保留在本文件作为对照
+- optimized: weibo_client 当前实现, 分冷缓存 (首次解析) 与热缓存 (次日再次解析同一关注列表) 两种情况
+并逐项校验两者结果一致, 不一致时以非零状态码退出。
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+from app.services import weibo_client
+from app.services.weibo_client import (
+    CardlistProvider,
+    MWeiboProvider,
+    Topic,
+    TopicsubProvider,
+    extract_containerid,
+    extract_request_url,
+)
+from perf import fake_upstream
+
+ACCOUNT = "bench"
+
+# 线上出现过的非常规 scheme, 用于校验优化实现的兼容性
+EDGE_SCHEMES = [
+    "sinaweibo://pageinfo?containerid=1008081234567890abcdef&extparam=%E8%B6%85%E8%AF%9D",
+    "sinaweibo://pageinfo#containerid=1008081234567890abcdef",
+    "https://m.weibo.cn/p/index?extparam=a&containerid=100808abc%5F-%5Fsuper",
+    "sinaweibo://pageinfo?luicode=10000011&containerid=100808a+b",
+    "sinaweibo://cardlist?fid=xx&lfid=containerid=100808nested",
+    "sinaweibo://pageinfo?pageid=100808nope",
+    "",
+]
+
+EDGE_ACTIONS = [
+    "/2/page/button?request_url=http%3A%2F%2Fi.huati.weibo.com%2Fmobile%2Fsuper%2Factive_fcheckin%3Fpageid%3D100808a",
+    "/2/page/button?fid=232478&request_url=http%253A%252F%252Fi.huati.weibo.com%252Fx%253Fa%253D1",
+    "http://i.huati.weibo.com/mobile/super/active_fcheckin?pageid=100808a",
+    "",
+]
+
+
+# ─── 改造前的实现 (对照组, 勿修改) ───
+
+def baseline_extract_containerid(scheme: str) -> Optional[str]:
+    try:
+        parsed = urlparse(scheme)
+        qs = parse_qs(parsed.query)
+        cid_list = qs.get("containerid", [])
+        if cid_list:
+            return cid_list[0]
+        if parsed.fragment:
+            qs2 = parse_qs(parsed.fragment)
+            cid_list2 = qs2.get("containerid", [])
+            if cid_list2:
+                return cid_list2[0]
+        match = re.search(r"containerid=([^&]+)", scheme)
+        if match:
+            return match.group(1)
+    except Exception:
+        pass
+    return None
+
+
+def baseline_extract_request_url(action: str) -> str:
+    if not action:
+        return ""
+    try:
+        parsed = urlparse(action)
+        qs = parse_qs(parsed.query)
+        req = (qs.get("request_url") or [""])[0]
+        if req:
+            return unquote(req)
+    except Exception:
+        pass
+    return action
+
+
+def baseline_parse_topic_item(item: dict):
+    title = item.get("title_sub") or item.get("title") or "未知超话"
+    buttons = item.get("buttons", []) or []
+    if not buttons:
+        return None
+    for b in buttons:
+        name = str(b.get("name", "")).strip()
+        scheme = b.get("scheme", "")
+        if name == "签到" and scheme:
+            return Topic(title=title, container_id="", scheme=scheme)
+    for b in buttons:
+        name = str(b.get("name", "")).strip()
+        if name in ("已签", "已签到", "明日再来"):
+            # 与 MWeiboProvider 一致标记为已签 (缓存与统计据此跳过签到)
+            return Topic(title=title, container_id="", scheme="", signed=True)
+    return None
+
+
+# ─── 语料 ───
+
+def build_corpus(size: int) -> dict:
+    """生成 size 个超话的单页响应 (约 1/3 已签), 以及序列化后的原始字节"""
+    signed = frozenset(fake_upstream.topic_container_id(ACCOUNT, i) for i in range(0, size, 3))
+    payloads = {
+        "cardlist": fake_upstream.cardlist_payload(ACCOUNT, size, page_size=size, signed=signed),
+        "topicsub": fake_upstream.topicsub_payload(ACCOUNT, size, page_size=size, signed=signed),
+        "getindex": fake_upstream.getindex_payload(ACCOUNT, size, page_size=size, signed=signed),
+    }
+    raw = {name: json.dumps(data, ensure_ascii=False).encode("utf-8") for name, data in payloads.items()}
+
+    cardlist_items = payloads["cardlist"]["cards"][0]["card_group"] if size else []
+    topicsub_items = [item["data"] for item in payloads["topicsub"]["items"][0]["items"]] if size else []
+    getindex_items = payloads["getindex"]["data"]["cards"][0]["card_group"] if size else []
+
+    results = [fake_upstream.checkin_payload(i % 4 == 0) for i in range(size)]
+    results += [{"result": 0, "msg": "请先关注该超话", "errno": "382003"}] * (size // 10)
+
+    return {
+        "raw": raw,
+        "schemes": [item["scheme"] for item in cardlist_items] + EDGE_SCHEMES,
+        "actions": [btn["action"] for item in topicsub_items for btn in item["buttons"]] + EDGE_ACTIONS,
+        "topicsub_items": topicsub_items,
+        "getindex_items": getindex_items,
+        "results": results,
+    }
+
+
+# ─── 计时 ───
+
+def _time_per_item(fn: Callable, inputs: list, repeat: int, setup: Optional[Callable] = None) -> float:
+    """返回单项耗时 (微秒) 的 repeat 次中位数; setup 在每轮计时前执行 (如清空缓存)"""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for value in inputs:
+            fn(value)
+        samples.append((time.perf_counter() - start) / max(len(inputs), 1) * 1e6)
+    return statistics.median(samples)
+
+
+def _clear_caches():
+    weibo_client.extract_containerid.cache_clear()
+    weibo_client.extract_request_url.cache_clear()
+
+
+def _check(name: str, baseline: Callable, optimized: Callable, inputs: list) -> list[str]:
+    mismatches = []
+    for value in inputs:
+        expected, actual = baseline(value), optimized(value)
+        if expected != actual:
+            mismatches.append(f"{name}: {value!r} -> baseline={expected!r}, optimized={actual!r}")
+    return mismatches
+
+
+def bench_size(size: int, repeat: int) -> tuple[list[dict], list[str]]:
+    corpus = build_corpus(size)
+
+    def extract_container_id(item_data):
+        for btn in item_data["buttons"]:
+            TopicsubProvider._extract_container_id(item_data, btn)
+
+    def parse_result(data):
+        CardlistProvider._parse_result("bench", data)
+
+    cases = [
+        ("extract_containerid", corpus["schemes"], baseline_extract_containerid, extract_containerid),
+        ("extract_request_url", corpus["actions"], baseline_extract_request_url, extract_request_url),
+        ("mweibo_parse_topic_item", corpus["getindex_items"], baseline_parse_topic_item, MWeiboProvider._parse_topic_item),
+    ]
+
+    rows, mismatches = [], []
+    for name, inputs, baseline, optimized in cases:
+        mismatches += _check(name, baseline, optimized, inputs)
+        base_us = _time_per_item(baseline, inputs, repeat)
+        cold_us = _time_per_item(optimized, inputs, repeat, setup=_clear_caches)
+        warm_us = _time_per_item(optimized, inputs, repeat)
+        rows.append({
+            "size": size, "parser": name, "items": len(inputs),
+            "baseline_us": round(base_us, 3), "cold_us": round(cold_us, 3), "warm_us": round(warm_us, 3),
+            "speedup_cold": round(base_us / cold_us, 2) if cold_us else None,
+            "speedup_warm": round(base_us / warm_us, 2) if warm_us else None,
+        })
+
+    # 无对照实现的解析, 只记录当前耗时
+    for name, inputs, fn in (
+        ("topicsub_extract_container_id", corpus["topicsub_items"], extract_container_id),
+        ("parse_result", corpus["results"], parse_result),
+    ):
+        us = _time_per_item(fn, inputs, repeat)
+        rows.append({"size": size, "parser": name, "items": len(inputs),
+                     "baseline_us": None, "cold_us": round(us, 3), "warm_us": None,
+                     "speedup_cold": None, "speedup_warm": None})
+
+    # 响应体 JSON 解码 (resp.json()), 作为解析开销的参照量级
+    for provider, raw in corpus["raw"].items():
+        us = _time_per_item(json.loads, [raw], repeat) / max(size, 1)
+        rows.append({"size": size, "parser": f"json_decode[{provider}]", "items": size,
+                     "baseline_us": None, "cold_us": round(us, 3), "warm_us": None,
+                     "speedup_cold": None, "speedup_warm": None})
+
+    return rows, mismatches
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value}"
+
+
+def _print_rows(rows: list[dict]):
+    header = f"{'size':>5}  {'parser':<32} {'items':>6}  {'baseline':>9}  {'cold':>9}  {'warm':>9}  {'x cold':>7}  {'x warm':>7}"
+    print("单项耗时 (µs/item, 中位数)")
+    print(header)
+    print("─" * len(header))
+    for r in rows:
+        print(
+            f"{r['size']:>5}  {r['parser']:<32} {r['items']:>6}  {_fmt(r['baseline_us']):>9}  "
+            f"{_fmt(r['cold_us']):>9}  {_fmt(r['warm_us']):>9}  {_fmt(r['speedup_cold']):>7}  {_fmt(r['speedup_warm']):>7}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Provider 响应解析微基准")
+    parser.add_argument("--sizes", default="10,100,500,2000", help="每页超话数, 逗号分隔")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", default="", help="同时把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    rows, mismatches = [], []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        size_rows, size_mismatches = bench_size(size, args.repeat)
+        rows += size_rows
+        mismatches += size_mismatches
+
+    _print_rows(rows)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"rows": rows, "mismatches": mismatches}, f, ensure_ascii=False, indent=2)
+
+    if mismatches:
+        print(f"\n解析结果与基线不一致 ({len(mismatches)} 项):", file=sys.stderr)
+        for line in sorted(set(mismatches))[:20]:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
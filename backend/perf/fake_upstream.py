@@ -0,0 +1,244 @@
+"""本地微博 API / Server酱 替身
+
+实现签到链路用到的全部上游接口, 响应结构与线上抓包一致, 可配置延迟、错误率与每账号关注的超话数:
+- api.weibo.cn:  /2/cardlist, /2/statuses/container_timeline_topicsub, /2/page/button
+- m.weibo.cn:    /api/config, /api/container/getIndex, /api/container/button
+- sctapi.ftqq.com: /{sendkey}.send
+
+账号由请求 Cookie 中的 SUB 区分; 同一账号同一超话当天第二次签到返回"已签到"。
+各 payload 构造函数也供 perf.bench_parsers 生成解析语料使用。
+"""
+
+import asyncio
+import random
+import re
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+PAGE_SIZE = 10
+
+_SUB_RE = re.compile(r"(?:^|;\s*)SUB=([^;]+)")
+
+
+@dataclass
+class UpstreamConfig:
+    """替身行为配置"""
+    topics_per_account: int = 30
+    page_size: int = PAGE_SIZE
+    # 每个请求的平均延迟与抖动 (毫秒)
+    latency_ms: float = 100.0
+    latency_jitter_ms: float = 30.0
+    # 返回 HTTP 500 的概率
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class UpstreamStats:
+    requests: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    checkins: int = 0
+    already: int = 0
+    pushes: int = 0
+
+
+# ─── payload 构造 (与线上响应结构一致) ───
+
+def topic_container_id(account: str, idx: int) -> str:
+    return f"100808{zlib.crc32(account.encode()) % 10**8:08d}{idx:05d}"
+
+
+def topic_title(idx: int) -> str:
+    return f"压测超话{idx}"
+
+
+def _page_bounds(total: int, since_id: str, page_size: int) -> tuple[int, int, str]:
+    start = int(since_id) if since_id and since_id.isdigit() else 0
+    end = min(start + page_size, total)
+    next_since = str(end) if end < total else ""
+    return start, end, next_since
+
+
+def cardlist_payload(account: str, total: int, since_id: str = "", page_size: int = PAGE_SIZE,
+                     signed: frozenset = frozenset()) -> dict:
+    start, end, next_since = _page_bounds(total, since_id, page_size)
+    group = []
+    for i in range(start, end):
+        cid = topic_container_id(account, i)
+        group.append({
+            "card_type": 8,
+            "title_sub": topic_title(i),
+            "desc1": "等级 LV.5",
+            "scheme": f"sinaweibo://pageinfo?containerid={cid}&extparam=%E8%B6%85%E8%AF%9D&luicode=10000011",
+            "buttons": [{
+                "type": "link",
+                "name": "已签" if cid in signed else "签到",
+                "scheme": f"sinaweibo://pageinfo?containerid={cid}",
+            }],
+        })
+    return {
+        "cards": [{"card_type": 11, "card_group": group}] if group else [],
+        "cardlistInfo": {"since_id": next_since, "total": total},
+    }
+
+
+def topicsub_payload(account: str, total: int, since_id: str = "", page_size: int = PAGE_SIZE,
+                     signed: frozenset = frozenset()) -> dict:
+    start, end, next_since = _page_bounds(total, since_id, page_size)
+    items = []
+    for i in range(start, end):
+        cid = topic_container_id(account, i)
+        request_url = f"http://i.huati.weibo.com/mobile/super/active_fcheckin?pageid={cid}&container_id={cid}"
+        items.append({
+            "data": {
+                "title_sub": topic_title(i),
+                "container_id": cid,
+                "buttons": [{
+                    "name": "已签" if cid in signed else "签到",
+                    "action": f"/2/page/button?request_url={quote(request_url, safe='')}",
+                    "params": {"container_id": cid, "ext_uid": cid},
+                }],
+            }
+        })
+    return {"items": [{"items": items}] if items else [], "since_id": next_since}
+
+
+def getindex_payload(account: str, total: int, since_id: str = "", page_size: int = PAGE_SIZE,
+                     signed: frozenset = frozenset()) -> dict:
+    start, end, next_since = _page_bounds(total, since_id, page_size)
+    group = []
+    for i in range(start, end):
+        cid = topic_container_id(account, i)
+        if cid in signed:
+            button = {"name": "已签", "scheme": ""}
+        else:
+            request_url = quote(f"http://i.huati.weibo.com/mobile/super/active_checkin?pageid={cid}", safe="")
+            button = {"name": "签到", "scheme": f"/api/container/button?sign=ab12cd&request_url={request_url}&containerid={cid}"}
+        group.append({
+            "card_type": 8,
+            "title_sub": topic_title(i),
+            "scheme": f"https://m.weibo.cn/p/index?containerid={cid}",
+            "buttons": [button],
+        })
+    return {
+        "ok": 1,
+        "data": {
+            "cards": [{"card_type": 11, "card_group": group}] if group else [],
+            "cardlistInfo": {"since_id": next_since},
+        },
+    }
+
+
+def checkin_payload(already: bool) -> dict:
+    if already:
+        return {"result": 0, "msg": "今天已签到", "errno": "382004"}
+    return {"result": 1, "msg": "签到成功", "button": {"name": "已签"}}
+
+
+def mweibo_checkin_payload(already: bool) -> dict:
+    if already:
+        return {"ok": 1, "data": {"msg": "今日已签到,明日再来吧"}}
+    return {"ok": 1, "data": {"msg": "签到成功"}}
+
+
+# ─── ASGI 应用 ───
+
+def create_app(config: Optional[UpstreamConfig] = None) -> FastAPI:
+    """创建替身应用; 统计数据挂在 app.state.stats"""
+    config = config or UpstreamConfig()
+    rng = random.Random(config.seed)
+    stats = UpstreamStats()
+    # {account: set(container_id)} 当天已签到的超话
+    signed: dict[str, set] = {}
+
+    app = FastAPI(title="fake-weibo-upstream")
+    app.state.config = config
+    app.state.stats = stats
+
+    def account_of(request: Request) -> str:
+        match = _SUB_RE.search(request.headers.get("cookie", ""))
+        return match.group(1) if match else "anonymous"
+
+    async def simulate(name: str) -> Optional[JSONResponse]:
+        stats.requests[name] += 1
+        delay = max(0.0, rng.gauss(config.latency_ms, config.latency_jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        if config.error_rate and rng.random() < config.error_rate:
+            stats.errors[name] += 1
+            return JSONResponse({"ok": 0, "msg": "服务繁忙"}, status_code=500)
+        return None
+
+    def sign(account: str, cid: str) -> bool:
+        """返回是否已签过"""
+        account_signed = signed.setdefault(account, set())
+        if cid in account_signed:
+            stats.already += 1
+            return True
+        account_signed.add(cid)
+        stats.checkins += 1
+        return False
+
+    def frozen_signed(account: str) -> frozenset:
+        return frozenset(signed.get(account, ()))
+
+    @app.get("/api/config")
+    async def api_config(request: Request):
+        if error := await simulate("config"):
+            return error
+        account = account_of(request)
+        return {"ok": 1, "data": {"login": True, "uid": str(zlib.crc32(account.encode())),
+                                  "user": {"screen_name": account}}}
+
+    @app.get("/2/cardlist")
+    async def cardlist(request: Request, since_id: str = ""):
+        if error := await simulate("cardlist"):
+            return error
+        account = account_of(request)
+        return cardlist_payload(account, config.topics_per_account, since_id, config.page_size, frozen_signed(account))
+
+    @app.post("/2/statuses/container_timeline_topicsub")
+    async def topicsub(request: Request):
+        if error := await simulate("topicsub"):
+            return error
+        body = await request.json() if await request.body() else {}
+        account = account_of(request)
+        return topicsub_payload(account, config.topics_per_account, str(body.get("since_id", "")),
+                                config.page_size, frozen_signed(account))
+
+    @app.api_route("/2/page/button", methods=["GET", "POST"])
+    async def page_button(request: Request):
+        if error := await simulate("page_button"):
+            return error
+        request_url = request.query_params.get("request_url", "")
+        match = re.search(r"container_id=([^&]+)", request_url)
+        cid = match.group(1) if match else request.query_params.get("ext_uid", "")
+        return checkin_payload(sign(account_of(request), cid))
+
+    @app.get("/api/container/getIndex")
+    async def get_index(request: Request, since_id: str = ""):
+        if error := await simulate("getindex"):
+            return error
+        account = account_of(request)
+        return getindex_payload(account, config.topics_per_account, since_id, config.page_size, frozen_signed(account))
+
+    @app.get("/api/container/button")
+    async def container_button(request: Request, containerid: str = ""):
+        if error := await simulate("mweibo_button"):
+            return error
+        return mweibo_checkin_payload(sign(account_of(request), containerid))
+
+    @app.post("/{sendkey}.send")
+    async def serverchan(sendkey: str):
+        if error := await simulate("push"):
+            return error
+        stats.pushes += 1
+        return {"code": 0, "message": "", "data": {"pushid": str(stats.pushes)}}
+
+    return app
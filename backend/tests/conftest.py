@@ -0,0 +1,104 @@
+"""测试公共夹具: 临时 SQLite 数据库 + perf.fake_upstream 上游替身"""
+
+import os
+import tempfile
+
+# 必须在导入 app 之前设置, app.config / app.database 在导入时读取
+_DB_DIR = tempfile.mkdtemp(prefix="wb-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_DIR}/test.sqlite"
+os.environ.setdefault("DEFAULT_SENDKEY", "")
+
+import httpx
+import pytest
+
+from app.database import Base, async_session, engine
+from app.models.account import Account
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def reset_process_state():
+    """清空各服务的进程内缓存与计分板, 避免测试间相互影响"""
+    from app.services import circuit_breaker, cookie_service, provider_stats, topic_cache_service
+
+    for state in (
+        cookie_service._validation_cache,
+        topic_cache_service._signed_today,
+        topic_cache_service._refreshing,
+        provider_stats._scores,
+        provider_stats._race_results,
+        circuit_breaker._breakers,
+    ):
+        state.clear()
+    yield
+
+
+@pytest.fixture
+async def db_schema():
+    """每个测试使用空表"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    await engine.dispose()
+
+
+@pytest.fixture
+async def upstream():
+    """用 fake_upstream 接管共享 HTTP 客户端的全部上游请求, 返回替身应用 (统计见 app.state.stats)"""
+    from app.services import weibo_client
+    from perf.fake_upstream import UpstreamConfig, create_app
+
+    app = create_app(UpstreamConfig(topics_per_account=25, latency_ms=0, latency_jitter_ms=0, seed=1))
+    await weibo_client.set_http_transport(httpx.ASGITransport(app=app))
+    yield app
+    await weibo_client.set_http_transport(None)
+
+
+@pytest.fixture
+async def account(db_schema) -> Account:
+    """一个 Cookie 有效、启用定时的账号 (SUB 即替身中的账号标识)"""
+    async with async_session() as db:
+        acc = Account(
+            account_name="tester",
+            cookie_sub="tester",
+            cookie_subp="subp",
+            request_interval=0.0,
+            checkin_concurrency=4,
+            retry_count=0,
+            schedule_enabled=True,
+            schedule_time="08:00",
+            schedule_random_delay=0,
+        )
+        db.add(acc)
+        await db.commit()
+        await db.refresh(acc)
+        return acc
+
+
+class _FailingPagesTransport(httpx.AsyncBaseTransport):
+    """超话列表的后续页 (带 since_id) 请求超时, 其余请求交给替身应用"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path in ("/2/cardlist", "/api/container/getIndex") and request.url.params.get("since_id"):
+            raise httpx.ReadTimeout("翻页超时", request=request)
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.fixture
+async def paged_timeout_upstream():
+    """25 个超话、每页 10 个, 第 2 页起请求超时 (翻页中途失败)"""
+    from app.services import weibo_client
+    from perf.fake_upstream import UpstreamConfig, create_app
+
+    app = create_app(UpstreamConfig(topics_per_account=25, page_size=10, latency_ms=0, latency_jitter_ms=0, seed=1))
+    await weibo_client.set_http_transport(_FailingPagesTransport(httpx.ASGITransport(app=app)))
+    yield app
+    await weibo_client.set_http_transport(None)
@@ -0,0 +1,56 @@
+"""BaseProvider.checkin_many: 流水线签到与 worker 异常时的退出"""
+
+import asyncio
+
+import pytest
+
+from app.services.weibo_client import get_provider
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_checkin_many_pipelined_returns_in_order(upstream):
+    provider = get_provider("tester", "subp", provider_name="cardlist")
+
+    pairs = await provider.checkin_many(provider.iter_topics(), concurrency=3, retry_count=0)
+
+    assert len(pairs) == 25
+    assert [t.title for t, _ in pairs] == [f"压测超话{i}" for i in range(25)]
+    assert all(r.status == "success" for _, r in pairs)
+
+
+async def test_checkin_many_fails_instead_of_hanging_when_on_result_raises(upstream):
+    provider = get_provider("tester", "subp", provider_name="cardlist")
+    seen = []
+
+    async def on_result(idx, topic, result):
+        seen.append(idx)
+        if len(seen) == 2:
+            raise RuntimeError("checkpoint flush failed")
+
+    # concurrency=1 时队列容量为 2, worker 退出后生产者很快会被满队列阻塞;
+    # 用 asyncio.wait 而非 wait_for, 回归时测试失败而不是一起挂起
+    task = asyncio.create_task(
+        provider.checkin_many(provider.iter_topics(), concurrency=1, retry_count=0, on_result=on_result)
+    )
+    done, _ = await asyncio.wait({task}, timeout=5)
+    assert task in done, "checkin_many 在 on_result 异常后挂起"
+    with pytest.raises(ExceptionGroup) as excinfo:
+        task.result()
+    assert excinfo.group_contains(RuntimeError, match="checkpoint flush failed")
+
+
+async def test_latency_excludes_rate_limiter_wait(upstream):
+    from app.utils.rate_limit import TokenBucket
+
+    provider = get_provider("tester", "subp", provider_name="cardlist")
+    topics = [t async for t in provider.iter_topics()][:3]
+    # 每秒 5 个令牌: 后两个超话各需排队约 200ms, 替身本身无延迟
+    limiter = TokenBucket(5, capacity=1)
+
+    pairs = await provider.checkin_many(topics, concurrency=3, limiter=limiter, retry_count=0)
+
+    waited = max(r.elapsed_ms for _, r in pairs)
+    assert waited >= 300
+    assert all(r.latency_ms < 150 for _, r in pairs)
+    assert all(r.elapsed_ms >= r.latency_ms for _, r in pairs)
@@ -0,0 +1,66 @@
+"""中断续签: _start_run 续用 run_id, 只签剩余超话, 超话缓存保留完整列表"""
+
+import pytest
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models.account import Account
+from app.models.account_topic import AccountTopic
+from app.models.checkin_result import CheckinRecord
+from app.models.checkin_run import CheckinRun
+from app.services import checkin_service
+from app.utils.time import local_date_str
+from perf.fake_upstream import topic_container_id, topic_title
+
+pytestmark = pytest.mark.anyio
+
+
+async def _interrupted_run(account: Account, signed: int) -> str:
+    """构造一个当天中断的运行, 前 signed 个超话已签到"""
+    async with async_session() as db:
+        run = CheckinRun(id="r" * 32, account_id=account.id, run_date=local_date_str(),
+                         status=checkin_service.RUN_INTERRUPTED, source="schedule")
+        db.add(run)
+        for i in range(signed):
+            db.add(CheckinRecord(run_id=run.id, account_id=account.id, status="success",
+                                 container_id=topic_container_id("tester", i), topic_title=topic_title(i)))
+        await db.commit()
+        return run.id
+
+
+async def test_start_run_resumes_interrupted_run(account):
+    run_id = await _interrupted_run(account, signed=3)
+    async with async_session() as db:
+        acc = await db.get(Account, account.id)
+        run, done = await checkin_service._start_run(db, acc, "resume")
+    assert run.id == run_id
+    assert run.status == checkin_service.RUN_RUNNING
+    assert run.resumes == 1
+    assert [t.container_id for t, _ in done] == [topic_container_id("tester", i) for i in range(3)]
+
+
+async def test_start_run_creates_new_run_without_interrupted(account):
+    async with async_session() as db:
+        acc = await db.get(Account, account.id)
+        run, done = await checkin_service._start_run(db, acc, "manual")
+    assert done == []
+    assert run.status == checkin_service.RUN_RUNNING
+
+
+async def test_resumed_run_signs_remaining_and_keeps_full_topic_cache(account, upstream):
+    run_id = await _interrupted_run(account, signed=10)
+
+    stats = await checkin_service._run_account(account.id, "resume")
+
+    assert stats["run_id"] == run_id
+    assert stats["total"] == 25
+    assert stats["resumed"] == 10
+    assert upstream.state.stats.requests["page_button"] == 15
+    async with async_session() as db:
+        run = await db.get(CheckinRun, run_id)
+        cached = (await db.execute(
+            select(AccountTopic.container_id).where(AccountTopic.account_id == account.id)
+        )).scalars().all()
+    assert run.status == checkin_service.RUN_COMPLETED
+    # 中断前已签的超话也必须留在缓存中
+    assert sorted(cached) == sorted(topic_container_id("tester", i) for i in range(25))
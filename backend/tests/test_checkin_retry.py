@@ -0,0 +1,36 @@
+"""BaseProvider.checkin_with_retry: 熔断打开时不重试"""
+
+import pytest
+
+from app.services import circuit_breaker, provider_stats, weibo_client
+from app.services.weibo_client import get_provider
+from app.utils import retry
+from app.utils.retry import RetryPolicy
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_open_circuit_is_not_retried(upstream, monkeypatch):
+    provider = get_provider("tester", "subp", provider_name="cardlist")
+    topic = [t async for t in provider.iter_topics()][0]
+    # 列表请求已为上游 host 建好熔断器, 直接打开
+    assert circuit_breaker._breakers
+    for breaker in circuit_breaker._breakers.values():
+        breaker._trip("test")
+
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(weibo_client.asyncio, "sleep", fake_sleep)
+
+    result = await provider.checkin_with_retry(topic, policy=RetryPolicy(max_attempts=3))
+
+    assert result.status == "failed"
+    assert result.failure == retry.CIRCUIT_OPEN
+    assert result.attempts == 1
+    assert sleeps == []
+    # 请求未发出, 不计入 Provider 健康度
+    samples = provider_stats._scores[("cardlist", provider.account_id)].samples
+    assert [s.op for s in samples] == ["get_topics"]
@@ -0,0 +1,48 @@
+"""Cookie 校验: 上游不可达时不得把账号标记为 Cookie 失效"""
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models.account import Account
+from app.models.task_log import TaskLog
+from app.services import checkin_service, cookie_service, weibo_client
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def unreachable_upstream():
+    def handler(request: httpx.Request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    await weibo_client.set_http_transport(httpx.MockTransport(handler))
+    yield
+    await weibo_client.set_http_transport(None)
+
+
+async def test_validate_cookie_unreachable_is_unknown_and_not_cached(db_schema, unreachable_upstream):
+    is_valid, info = await cookie_service.validate_cookie("tester", "subp")
+
+    assert is_valid is None and info is None
+    assert cookie_service._get_cached(cookie_service._cache_key("tester", "subp")) is None
+
+
+async def test_checkin_aborts_without_marking_cookie_invalid(account, unreachable_upstream):
+    with pytest.raises(cookie_service.CookieCheckUnavailable):
+        await checkin_service._run_account(account.id, "schedule")
+
+    async with async_session() as db:
+        acc = await db.get(Account, account.id)
+        events = (await db.execute(select(TaskLog.event_type))).scalars().all()
+    assert acc.last_checkin_status is None
+    assert "cookie_invalid" not in events
+    assert not any(e.startswith("push_") for e in events)
+
+
+async def test_validate_cookie_valid(db_schema, upstream):
+    is_valid, info = await cookie_service.validate_cookie("tester", "subp", use_cache=False)
+
+    assert is_valid is True
+    assert info["nick"] == "tester"
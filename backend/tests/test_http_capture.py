@@ -0,0 +1,44 @@
+"""HTTP 录制: 语料中不含 Cookie、Set-Cookie 与账号标识, 回放仍可用"""
+
+import gzip
+
+import httpx
+import pytest
+
+from app.services.http_capture import RecordingTransport, ReplayTransport
+
+pytestmark = pytest.mark.anyio
+
+_CONFIG_BODY = (
+    '{"ok":1,"data":{"login":true,"st":"st-secret","uid":"5512345678",'
+    '"user":{"screen_name":"nick-secret"},"scheme":"sinaweibo://x?gsid=gsid-secret&luicode=1"}}'
+)
+
+
+async def test_recording_redacts_credentials_and_replays(tmp_path):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, text=_CONFIG_BODY,
+            headers={"content-type": "application/json", "set-cookie": "SUB=cookie-secret; path=/"},
+        )
+
+    path = str(tmp_path / "capture.jsonl.gz")
+    recorder = RecordingTransport(httpx.MockTransport(handler), path)
+    async with httpx.AsyncClient(transport=recorder) as client:
+        resp = await client.get(
+            "https://m.weibo.cn/api/config?uid=5512345678&gsid=gsid-secret",
+            headers={"Cookie": "SUB=cookie-secret"},
+        )
+    # 调用方拿到的仍是原始响应
+    assert resp.json()["data"]["st"] == "st-secret"
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        corpus = f.read()
+    for secret in ("st-secret", "5512345678", "nick-secret", "gsid-secret", "cookie-secret"):
+        assert secret not in corpus
+
+    async with httpx.AsyncClient(transport=ReplayTransport(path, latency_scale=0)) as client:
+        replayed = await client.get("https://m.weibo.cn/api/config?uid=1&gsid=other")
+    data = replayed.json()["data"]
+    assert data["login"] is True
+    assert data["uid"] == "***"
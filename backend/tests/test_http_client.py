@@ -0,0 +1,27 @@
+"""共享 HTTP 客户端: HTTP2_ENABLED 在缺少 h2 时回退到 HTTP/1.1"""
+
+import logging
+import sys
+
+import pytest
+
+from app.config import settings
+from app.services import weibo_client
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_http2_falls_back_without_h2(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "HTTP2_ENABLED", True)
+    monkeypatch.setattr(settings, "HTTP_CAPTURE_MODE", "off")
+    monkeypatch.setattr(settings, "CIRCUIT_BREAKER_ENABLED", False)
+    # 模拟未安装 h2
+    monkeypatch.setitem(sys.modules, "h2", None)
+
+    with caplog.at_level(logging.WARNING, logger=weibo_client.__name__):
+        client = weibo_client._build_http_client()
+    try:
+        assert client._transport._pool._http2 is False
+        assert "回退到 HTTP/1.1" in caplog.text
+    finally:
+        await client.aclose()
@@ -0,0 +1,75 @@
+"""后台签到任务: 其他副本 (或创建进程重启后) 按数据库还原任务进度"""
+
+import asyncio
+
+import pytest
+
+from app.database import async_session
+from app.models.checkin_job import CheckinJob
+from app.models.checkin_result import CheckinRecord
+from app.models.checkin_run import CheckinRun
+from app.services import checkin_service, job_service
+from app.utils.time import local_date_str
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs():
+    job_service._jobs.clear()
+    yield
+    job_service._jobs.clear()
+
+
+async def test_finished_job_readable_from_another_replica(account, upstream):
+    job = await job_service.create_job("checkin", [(account.id, account.account_name)])
+    for _ in range(200):
+        if job["status"] == job_service.JOB_COMPLETED and not job_service._pending_writes:
+            break
+        await asyncio.sleep(0.05)
+    local = await job_service.get_job(job["id"])
+    assert local["live"] is True
+
+    # 查询落到没有该任务内存状态的副本
+    job_service._jobs.clear()
+    remote = await job_service.get_job(job["id"])
+
+    assert remote["live"] is False
+    assert remote["status"] == job_service.JOB_COMPLETED
+    for key in ("success", "already", "failed", "accounts_finished", "topics_done"):
+        assert remote[key] == local[key]
+    assert remote["accounts"][0]["topics_next"] == 25
+    assert [t["name"] for t in remote["accounts"][0]["topics"]] == [
+        t["name"] for t in local["accounts"][0]["topics"]
+    ]
+    assert [j["id"] for j in await job_service.list_jobs()] == [job["id"]]
+
+
+async def test_running_job_progress_rebuilt_from_checkpoints(account):
+    async with async_session() as db:
+        row = CheckinJob(
+            id="j" * 32, kind="checkin", source="manual", owner="other:1",
+            accounts=[{"account_id": account.id, "account_name": "tester", "status": "queued",
+                       "error": None, "result": None}],
+        )
+        db.add(row)
+        await db.flush()
+        db.add(CheckinRun(id="r" * 32, account_id=account.id, run_date=local_date_str(),
+                          status=checkin_service.RUN_RUNNING, source="manual"))
+        for i, status in enumerate(("success", "success", "already")):
+            db.add(CheckinRecord(run_id="r" * 32, account_id=account.id, status=status,
+                                 container_id=f"c{i}", topic_title=f"t{i}"))
+        await db.commit()
+
+    job = await job_service.get_job("j" * 32, since=1)
+
+    assert job["status"] == job_service.JOB_RUNNING
+    acc = job["accounts"][0]
+    assert acc["status"] == job_service.ACCOUNT_RUNNING
+    assert (acc["done"], acc["success"], acc["already"]) == (3, 2, 1)
+    assert [t["name"] for t in acc["topics"]] == ["t1", "t2"]
+    assert acc["topics_next"] == 3
+
+
+async def test_unknown_job_returns_none(db_schema):
+    assert await job_service.get_job("0" * 32) is None
@@ -0,0 +1,45 @@
+"""恢复中断的签到: 只标记已无进程执行的运行, 本进程仍在执行的不受影响"""
+
+import pytest
+
+from app.database import async_session
+from app.models.account import Account
+from app.models.checkin_run import CheckinRun
+from app.services import checkin_service
+from app.utils.time import local_date_str
+
+pytestmark = pytest.mark.anyio
+
+
+class StubEngine:
+    def __init__(self, active: set):
+        self.active = active
+        self.submitted = []
+
+    def is_active(self, account_id: int) -> bool:
+        return account_id in self.active
+
+    def submit_background(self, account_id: int, source: str):
+        self.submitted.append((account_id, source))
+
+
+async def test_recover_skips_runs_still_executing(account, monkeypatch):
+    async with async_session() as db:
+        other = Account(account_name="busy", cookie_sub="busy", cookie_subp="subp")
+        db.add(other)
+        await db.flush()
+        for run_id, account_id in (("a" * 32, account.id), ("b" * 32, other.id)):
+            db.add(CheckinRun(id=run_id, account_id=account_id, run_date=local_date_str(),
+                              status=checkin_service.RUN_RUNNING, source="schedule"))
+        await db.commit()
+        other_id = other.id
+
+    engine = StubEngine(active={other_id})
+    monkeypatch.setattr(checkin_service, "run_engine", engine)
+
+    assert await checkin_service.recover_interrupted_runs() == 1
+
+    assert engine.submitted == [(account.id, "resume")]
+    async with async_session() as db:
+        assert (await db.get(CheckinRun, "a" * 32)).status == checkin_service.RUN_INTERRUPTED
+        assert (await db.get(CheckinRun, "b" * 32)).status == checkin_service.RUN_RUNNING
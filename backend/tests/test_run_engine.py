@@ -0,0 +1,51 @@
+"""执行引擎调度: 手动/外部触发优先, 批量来源之间轮转"""
+
+import asyncio
+
+import pytest
+
+from app.services import checkin_service
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    """替换实际签到, 记录执行顺序"""
+    order = []
+
+    async def fake_run(account_id, source, sendkey):
+        order.append(account_id)
+        await asyncio.sleep(0)
+        return {"account_id": account_id, "source": source}
+
+    monkeypatch.setattr(checkin_service, "_run_account_exclusive", fake_run)
+    return order
+
+
+async def test_priority_and_round_robin(executed):
+    engine = checkin_service.RunEngine(1)
+    try:
+        futures = [engine.submit(a, source="schedule") for a in (1, 2, 3)]
+        futures += [engine.submit(a, source="manual-all") for a in (10, 11)]
+        futures.append(engine.submit(99, source="manual"))
+        await asyncio.gather(*futures)
+    finally:
+        await engine.shutdown()
+    assert executed == [99, 1, 10, 2, 11, 3]
+
+
+async def test_manual_trigger_promotes_queued_batch_account(executed):
+    engine = checkin_service.RunEngine(1)
+    try:
+        first = engine.submit(1, source="schedule")
+        queued = engine.submit(2, source="schedule")
+        manual = engine.submit(2, source="manual")
+        assert manual is queued
+        assert engine.status()["queued_by_source"] == {"schedule": 1, "manual": 1}
+        result = await manual
+        await first
+    finally:
+        await engine.shutdown()
+    assert executed == [2, 1]
+    assert result["source"] == "manual"
@@ -0,0 +1,162 @@
+"""持久化签到队列: 认领、租约过期重新投递、结果回写与退出时释放租约
+
+认领 SQL 直接在测试用 SQLite 上执行 (FOR UPDATE SKIP LOCKED 在 SQLite 下忽略, 并发互斥需 PostgreSQL 验证)。
+"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import async_session
+from app.models.checkin_queue import CheckinQueueItem
+from app.services.run_queue import DONE, FAILED, LEASED, QUEUED, QueueConsumer, utcnow
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeEngine:
+    """只记录提交的执行引擎, 由测试决定何时完成"""
+
+    def __init__(self, slots: int = 8):
+        self.slots = slots
+        self.futures: dict[int, asyncio.Future] = {}
+
+    def free_slots(self) -> int:
+        return self.slots
+
+    def submit(self, account_id: int, source: str = "manual"):
+        future = asyncio.get_running_loop().create_future()
+        self.futures[account_id] = future
+        return future
+
+
+async def _add(account_id: int, **fields) -> int:
+    async with async_session() as db:
+        item = CheckinQueueItem(**{"source": "schedule", "run_at": utcnow(), "attempts": 0, **fields},
+                                account_id=account_id)
+        db.add(item)
+        await db.commit()
+        return item.id
+
+
+async def _get(item_id: int) -> CheckinQueueItem:
+    async with async_session() as db:
+        return (await db.execute(select(CheckinQueueItem).where(CheckinQueueItem.id == item_id))).scalar_one()
+
+
+async def _flush(consumer: QueueConsumer):
+    await asyncio.gather(*consumer._pending_writes)
+
+
+async def test_claim_due_and_expired_leases_only(account):
+    now = utcnow()
+    due = await _add(account.id, status=QUEUED)
+    future = await _add(account.id, status=QUEUED, dedupe_key="later", run_at=now + timedelta(hours=1))
+    expired = await _add(account.id, status=LEASED, dedupe_key="expired", lease_owner="dead:1",
+                         lease_expires_at=now - timedelta(seconds=1), attempts=1)
+    held = await _add(account.id, status=LEASED, dedupe_key="held", lease_owner="alive:1",
+                      lease_expires_at=now + timedelta(minutes=5), attempts=1)
+    exhausted = await _add(account.id, status=LEASED, dedupe_key="exhausted", lease_owner="dead:1",
+                           lease_expires_at=now - timedelta(seconds=1), attempts=settings.RUN_QUEUE_MAX_ATTEMPTS)
+
+    consumer = QueueConsumer(FakeEngine())
+    rows = await consumer._claim(10)
+
+    assert sorted(r[0] for r in rows) == sorted([due, expired])
+    assert {r[0]: r[3] for r in rows}[expired] == 2
+    for item_id in (due, expired):
+        item = await _get(item_id)
+        assert item.status == LEASED and item.lease_owner == consumer.worker_id
+    assert (await _get(held)).lease_owner == "alive:1"
+    assert (await _get(future)).status == QUEUED
+    assert (await _get(exhausted)).status == FAILED
+
+
+async def test_claim_respects_limit(account):
+    for i in range(3):
+        await _add(account.id, status=QUEUED, dedupe_key=f"k{i}")
+    assert len(await QueueConsumer(FakeEngine())._claim(2)) == 2
+
+
+async def test_results_written_back(account):
+    engine = FakeEngine()
+    consumer = QueueConsumer(engine)
+    item_id = await _add(account.id, status=QUEUED)
+    (row,) = await consumer._claim(1)
+    consumer._dispatch(*row)
+
+    engine.futures[account.id].set_result({"run_id": "r" * 32})
+    await asyncio.sleep(0)
+    await _flush(consumer)
+
+    item = await _get(item_id)
+    assert (item.status, item.run_id) == (DONE, "r" * 32)
+    assert consumer._inflight == {}
+    assert consumer.completed == 1
+
+
+async def test_failed_run_requeued_then_failed(account, monkeypatch):
+    monkeypatch.setattr(settings, "RUN_QUEUE_MAX_ATTEMPTS", 2)
+    engine = FakeEngine()
+    consumer = QueueConsumer(engine)
+    item_id = await _add(account.id, status=QUEUED)
+
+    (row,) = await consumer._claim(1)
+    consumer._dispatch(*row)
+    engine.futures[account.id].set_exception(RuntimeError("boom"))
+    await asyncio.sleep(0)
+    await _flush(consumer)
+    item = await _get(item_id)
+    assert item.status == QUEUED and item.lease_owner is None and item.run_at > utcnow()
+
+    # 到期后再次认领, 达到最大次数仍失败时标记为 failed
+    async with async_session() as db:
+        (await db.get(CheckinQueueItem, item_id)).run_at = utcnow()
+        await db.commit()
+    (row,) = await consumer._claim(1)
+    assert row[3] == 2
+    consumer._dispatch(*row)
+    engine.futures[account.id].set_exception(RuntimeError("boom"))
+    await asyncio.sleep(0)
+    await _flush(consumer)
+    assert (await _get(item_id)).status == FAILED
+    assert consumer.redelivered == 1
+
+
+async def test_result_not_written_after_lease_taken_over(account):
+    engine = FakeEngine()
+    consumer = QueueConsumer(engine)
+    item_id = await _add(account.id, status=QUEUED)
+    (row,) = await consumer._claim(1)
+    consumer._dispatch(*row)
+
+    # 租约过期后被其他进程接手
+    async with async_session() as db:
+        (await db.get(CheckinQueueItem, item_id)).lease_owner = "other:1"
+        await db.commit()
+    engine.futures[account.id].set_result({"run_id": "r" * 32})
+    await asyncio.sleep(0)
+    await _flush(consumer)
+
+    item = await _get(item_id)
+    assert (item.status, item.lease_owner) == (LEASED, "other:1")
+
+
+async def test_stop_releases_inflight_leases(account):
+    engine = FakeEngine()
+    consumer = QueueConsumer(engine)
+    item_id = await _add(account.id, status=QUEUED)
+    (row,) = await consumer._claim(1)
+    consumer._dispatch(*row)
+
+    await consumer.stop()
+
+    item = await _get(item_id)
+    assert (item.status, item.lease_owner) == (QUEUED, None)
+    # 退出时执行引擎取消的运行不再回写
+    engine.futures[account.id].cancel()
+    await asyncio.sleep(0)
+    assert not consumer._pending_writes
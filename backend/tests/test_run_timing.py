@@ -0,0 +1,20 @@
+"""run_timing: 阶段计数与后台缓存刷新的隔离"""
+
+import pytest
+
+from app.services import run_timing, topic_cache_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_background_topic_refresh_not_counted_in_run(db_schema, upstream):
+    with run_timing.record() as timings:
+        with run_timing.phase("checkin"):
+            topic_cache_service.schedule_refresh(1, "cardlist", "tester", "subp")
+            task = topic_cache_service._refreshing[(1, "cardlist")]
+        await task
+
+    assert upstream.state.stats.requests["cardlist"] == 3
+    result = timings.as_dict()
+    assert result["requests"] == 0
+    assert result["pages"] == []
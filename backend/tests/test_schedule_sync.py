@@ -0,0 +1,116 @@
+"""定时索引: 全量对账与按 schedule_updated_at 增量同步"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.database import async_session
+from app.models.account import Account
+from app.schemas.account import AccountUpdate
+from app.services import account_service, scheduler_service
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def clean_index(monkeypatch):
+    scheduler_service._buckets.clear()
+    scheduler_service._account_minute.clear()
+    scheduler_service._edited.clear()
+    monkeypatch.setattr(scheduler_service, "_synced_until", None)
+    yield
+    scheduler_service._buckets.clear()
+    scheduler_service._account_minute.clear()
+    scheduler_service._edited.clear()
+
+
+async def _update(account_id: int, **fields):
+    """经 account_service 修改 (模拟其他副本的修改), 定时变化时更新 schedule_updated_at"""
+    async with async_session() as db:
+        await account_service.update_account(db, account_id, AccountUpdate(**fields))
+
+
+async def test_first_sync_runs_full_reconcile(account):
+    await scheduler_service.sync_schedule_changes()
+    assert scheduler_service._account_minute == {account.id: 8 * 60}
+    assert scheduler_service.last_reconcile()["added"] == 1
+
+
+async def test_incremental_sync_moves_and_removes(account):
+    await scheduler_service.apply_all_schedules()
+
+    await _update(account.id, schedule_time="21:30")
+    changes = await scheduler_service.sync_schedule_changes()
+    assert changes["moved"] == 1
+    assert scheduler_service._account_minute[account.id] == 21 * 60 + 30
+    assert scheduler_service._buckets == {21 * 60 + 30: {account.id}}
+
+    await _update(account.id, schedule_enabled=False)
+    changes = await scheduler_service.sync_schedule_changes()
+    assert changes["removed"] == 1
+    assert scheduler_service._account_minute == {}
+
+    # 没有新的修改时不做改动
+    assert not any((await scheduler_service.sync_schedule_changes()).values())
+
+
+async def test_deleted_account_triggers_full_reconcile(account):
+    await scheduler_service.apply_all_schedules()
+    async with async_session() as db:
+        await db.execute(delete(Account).where(Account.id == account.id))
+        await db.commit()
+
+    result = await scheduler_service.sync_schedule_changes()
+
+    assert result["removed"] == 1
+    assert scheduler_service._account_minute == {}
+
+
+def test_local_edit_during_sync_not_overwritten():
+    scheduler_service._index_add(1, 8 * 60)
+    start_seq = scheduler_service._edit_seq
+    # 同步读库之后, 本进程单独更新了该账号
+    scheduler_service._mark_edited(1)
+    scheduler_service._index_set(1, True, "09:00")
+
+    changes = scheduler_service._apply_diff([(1, True, "08:00")], start_seq)
+
+    assert not any(changes.values())
+    assert scheduler_service._account_minute[1] == 9 * 60
+
+
+async def test_checkin_writeback_does_not_enter_sync(account, monkeypatch):
+    # 定时早已设置, 不在增量同步的回看窗口内
+    old = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=1)
+    async with async_session() as db:
+        await db.execute(update(Account).where(Account.id == account.id).values(schedule_updated_at=old))
+        await db.commit()
+    # 其他账号刚修改过定时, 同步水位在此之后
+    async with async_session() as db:
+        other = Account(account_name="other", cookie_sub="other", cookie_subp="subp", schedule_enabled=True)
+        db.add(other)
+        await db.commit()
+    await scheduler_service.apply_all_schedules()
+
+    # 签到写回最近签到状态 (updated_at 随之更新)
+    async with async_session() as db:
+        acc = await db.get(Account, account.id)
+        acc.last_checkin_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        acc.last_checkin_status = "success"
+        await db.commit()
+
+    diffed = []
+    original = scheduler_service._apply_diff
+    monkeypatch.setattr(
+        scheduler_service, "_apply_diff", lambda rows, start_seq: (diffed.extend(rows), original(rows, start_seq))[1]
+    )
+    await scheduler_service.sync_schedule_changes()
+
+    assert account.id not in [row[0] for row in diffed]
+
+    # 修改定时后重新进入同步
+    await _update(account.id, schedule_time="10:00")
+    await scheduler_service.sync_schedule_changes()
+    assert account.id in [row[0] for row in diffed]
+    assert scheduler_service._account_minute[account.id] == 10 * 60
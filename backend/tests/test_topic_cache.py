@@ -0,0 +1,78 @@
+"""超话列表缓存: 翻页中途失败时 (后台刷新与流水线签到) 都不写入截断的列表"""
+
+from datetime import timedelta
+
+import pytest
+
+from app.database import async_session
+from app.models.account_topic import AccountTopic
+from app.services import checkin_service, topic_cache_service
+from app.services.weibo_client import TopicListIncomplete, get_provider
+from perf.fake_upstream import topic_container_id, topic_title
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed_cache(account, count: int, age_hours: float):
+    """写入 count 个超话的缓存, 刷新时间为 age_hours 小时前"""
+    seen = topic_cache_service._utcnow() - timedelta(hours=age_hours)
+    async with async_session() as db:
+        for i in range(count):
+            db.add(AccountTopic(account_id=account.id, provider="cardlist", container_id=topic_container_id("tester", i),
+                                title=topic_title(i), last_seen=seen))
+        await db.commit()
+    return seen
+
+
+async def _cached(account):
+    async with async_session() as db:
+        return await topic_cache_service.load_topics(db, account.id, "cardlist")
+
+
+async def test_partial_listing_raises(account, paged_timeout_upstream):
+    provider = get_provider("tester", "subp", provider_name="cardlist", account_id=account.id)
+    with pytest.raises(TopicListIncomplete):
+        await provider.get_topics()
+
+    streamed = []
+    with pytest.raises(TopicListIncomplete):
+        async for topic in provider.iter_topics():
+            streamed.append(topic)
+    # 已获取的第 1 页仍可签到, 但列表不完整
+    assert len(streamed) == 10
+    assert provider.listing_complete is False
+
+
+async def test_refresh_keeps_cache_when_listing_is_partial(account, paged_timeout_upstream):
+    seen = await _seed_cache(account, 25, age_hours=48)
+
+    await topic_cache_service._refresh(account.id, "cardlist", "tester", "subp", "")
+
+    topics, refreshed_at = await _cached(account)
+    assert len(topics) == 25
+    assert refreshed_at == seen
+    assert not topic_cache_service.is_fresh(refreshed_at)
+
+
+async def test_refresh_saves_complete_listing(account, upstream):
+    await _seed_cache(account, 3, age_hours=48)
+    async with async_session() as db:
+        db.add(AccountTopic(account_id=account.id, provider="cardlist", container_id="unfollowed", title="x",
+                            last_seen=topic_cache_service._utcnow() - timedelta(hours=48)))
+        await db.commit()
+
+    await topic_cache_service._refresh(account.id, "cardlist", "tester", "subp", "")
+
+    topics, refreshed_at = await _cached(account)
+    assert len(topics) == 25
+    assert "unfollowed" not in {t.container_id for t in topics}
+    assert topic_cache_service.is_fresh(refreshed_at)
+
+
+async def test_pipelined_run_does_not_cache_partial_listing(account, paged_timeout_upstream):
+    stats = await checkin_service._run_account(account.id, "manual")
+
+    # 第 1 页的超话照常签到
+    assert stats["success"] == 10
+    topics, refreshed_at = await _cached(account)
+    assert topics == [] and refreshed_at is None
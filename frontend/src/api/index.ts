@@ -78,6 +78,21 @@ export const taskApi = {
   schedulerStatus: () => api.get('/admin/tasks/scheduler-status'),
   logs: (params?: { account_id?: number; event_type?: string; status?: string; skip?: number; limit?: number }) =>
     api.get('/admin/tasks/logs', { params }),
+  logResults: (id: number) => api.get(`/admin/tasks/logs/${id}/results`),
+  jobs: (limit = 20) => api.get('/admin/tasks/jobs', { params: { limit } }),
+  job: (jobId: string, params?: { account_id?: number; since?: number }) =>
+    api.get(`/admin/tasks/jobs/${jobId}`, { params }),
+}
+
+// 轮询后台签到任务直到完成, 每次轮询后回调最新进度
+export async function waitForJob(jobId: string, onProgress?: (job: any) => void, interval = 2000) {
+  for (;;) {
+    const res = await taskApi.job(jobId)
+    const job = res.data.job
+    onProgress?.(job)
+    if (job.status === 'completed') return job
+    await new Promise((resolve) => setTimeout(resolve, interval))
+  }
 }
 
 // ========================
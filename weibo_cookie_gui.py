@@ -923,6 +923,74 @@ class CookieApp:
         ok = 200 <= status_code < 300 and bool(data.get("ok", False))
         return ok, status_code, data
 
+    def _api_post_ndjson(self, server_url: str, path: str, payload: dict, member_key: str, on_line) -> tuple:
+        """
+        POST 并逐行读取 NDJSON 流式响应, 每读到一行回调 on_line(dict)
+
+        返回 (ok, status_code, data), data 为最后一行 (type=summary);
+        服务端不支持流式 (返回普通 JSON) 时按整体 JSON 处理。
+        """
+        url = f"{server_url}{path}"
+        body = json.dumps(payload or {}, ensure_ascii=False).encode("utf-8")
+        req = urllib_request.Request(
+            url=url,
+            data=body,
+            method="POST",
+            headers={
+                "Content-Type": "application/json; charset=utf-8",
+                "Accept": "application/x-ndjson",
+                "X-Member-Key": member_key,
+                "X-Access-Key": member_key,
+            },
+        )
+        data = {}
+        try:
+            # 超时针对每次读取: 服务端无新结果时每 5 秒发送心跳行
+            with urllib_request.urlopen(req, timeout=30) as resp:
+                status_code = int(resp.status)
+                if "ndjson" not in (resp.headers.get("Content-Type") or ""):
+                    text = resp.read().decode("utf-8", errors="replace")
+                    try:
+                        data = json.loads(text) if text else {}
+                    except Exception:
+                        data = {"ok": False, "message": text or "Invalid response"}
+                else:
+                    for raw in resp:
+                        line = raw.decode("utf-8", errors="replace").strip()
+                        if not line:
+                            continue
+                        try:
+                            item = json.loads(line)
+                        except Exception:
+                            continue
+                        on_line(item)
+                        if item.get("type") == "summary":
+                            data = item
+                    if not data:
+                        data = {"ok": False, "message": "连接中断，未收到签到汇总（服务器可能仍在签到）"}
+        except urllib_error.HTTPError as http_err:
+            status_code = int(getattr(http_err, "code", 500) or 500)
+            text = http_err.read().decode("utf-8", errors="replace")
+            try:
+                data = json.loads(text) if text else {}
+            except Exception:
+                data = {"ok": False, "message": text or "Invalid response"}
+        except urllib_error.URLError as url_err:
+            reason = str(url_err.reason)
+            if "WinError 10061" in reason or "Connection refused" in reason:
+                msg = f"连接被拒绝 (10061)\n请检查服务器是否已启动，且地址 {server_url} 正确。"
+            elif "timed out" in reason:
+                msg = "连接超时，请检查网络或防火墙设置。"
+            else:
+                msg = f"无法连接服务器：\n{reason}"
+            return False, 0, {"ok": False, "message": msg}
+        except Exception as exc:
+            # 读取过程中超时/断开: 签到仍在服务器上继续
+            return False, 0, {"ok": False, "message": f"读取签到进度中断：{exc}\n服务器上的签到不受影响。"}
+
+        ok = 200 <= status_code < 300 and bool(data.get("ok", False))
+        return ok, status_code, data
+
     def _verify_member_key(self):
         if self.is_syncing:
             return
@@ -1034,17 +1102,36 @@ class CookieApp:
             payload["account_name"] = opts["account_name"]
         if sendkey:
             payload["sendkey"] = sendkey
+        # 流式返回: 服务器逐个超话推送签到结果
+        payload["stream"] = True
 
         self._set_sync_busy(True)
         self._set_status("⏳ 正在执行远程签到，可能需要较长时间…", ACCENT)
         threading.Thread(target=self._checkin_worker, args=(opts, payload), daemon=True).start()
 
     def _checkin_worker(self, opts: dict, payload: dict):
-        ok, status_code, data = self._api_post_json(
+        counts = {"success": 0, "already": 0, "failed": 0}
+
+        def _on_line(item: dict):
+            kind = item.get("type")
+            if kind == "topic":
+                status = item.get("status")
+                counts[status] = counts.get(status, 0) + 1
+                icon = {"success": "✅", "already": "☑️", "failed": "❌"}.get(status, "?")
+                msg = (
+                    f"⏳ 签到中 {item.get('index')}：{icon} {item.get('name', '')}  "
+                    f"(成功 {counts['success']} / 已签 {counts['already']} / 失败 {counts['failed']})"
+                )
+                self.root.after(0, lambda m=msg: self._set_status(m, ACCENT))
+            elif kind == "progress" and item.get("phase") == "topics":
+                self.root.after(0, lambda: self._set_status("⏳ 正在获取关注的超话列表…", ACCENT))
+
+        ok, status_code, data = self._api_post_ndjson(
             server_url=opts["server_url"],
             path="/api/external/checkin/trigger",
             payload=payload,
             member_key=opts["member_key"],
+            on_line=_on_line,
         )
 
         def _finish():